@@ -0,0 +1,15 @@
+from django.core.cache import cache
+
+
+def get_version(key):
+    """读取缓存版本号，未设置时为 0；版本号拼入缓存键，递增后旧缓存自然失效"""
+    return cache.get(key) or 0
+
+
+def bump_version(key):
+    """递增缓存版本号，使按该版本号缓存的结果全部失效"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # 版本号不存在时初始化
+        cache.set(key, 1, None)
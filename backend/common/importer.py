@@ -0,0 +1,146 @@
+from xml.etree.ElementTree import iterparse
+import csv
+import io
+import os
+import re
+import zipfile
+
+_SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_REF = re.compile(r'([A-Z]+)')
+
+
+class ImportFileError(Exception):
+    """导入文件无法读取或格式不正确"""
+    pass
+
+
+class TabularReader:
+    """
+    CSV/XLSX 逐行读取
+
+    两种格式都按行流式解析，逐行返回字符串列表，不把整个表格读入内存。
+    CSV 自动识别 UTF-8（含 BOM）和 GB18030 编码；
+    XLSX 直接解析压缩包内第一个工作表的 XML，不依赖第三方库。
+    """
+
+    FILE_TYPES = ('csv', 'xlsx')
+    # 编码探测读取的字节数
+    SNIFF_SIZE = 64 * 1024
+
+    @classmethod
+    def infer_file_type(cls, filename, file_type=None):
+        """优先使用显式指定的格式，否则按扩展名判断"""
+        file_type = (file_type or os.path.splitext(filename or '')[1].lstrip('.')).lower()
+        if file_type not in cls.FILE_TYPES:
+            raise ImportFileError("仅支持 csv 或 xlsx 文件")
+        return file_type
+
+    @classmethod
+    def iter_rows(cls, file, file_type):
+        if file_type == 'csv':
+            return cls.iter_csv(file)
+        return cls.iter_xlsx(file)
+
+    @classmethod
+    def detect_encoding(cls, file):
+        sample = file.read(cls.SNIFF_SIZE)
+        file.seek(0)
+        try:
+            sample.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # 采样末尾可能截断了一个多字节字符
+            if e.start < len(sample) - 3:
+                return 'gb18030'
+        return 'utf-8-sig'
+
+    @classmethod
+    def iter_csv(cls, file):
+        text = io.TextIOWrapper(file, encoding=cls.detect_encoding(file), newline='')
+        try:
+            yield from csv.reader(text)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ImportFileError(f"CSV 文件解析失败: {e}")
+        finally:
+            # 避免关闭 TextIOWrapper 时连带关闭上传文件
+            text.detach()
+
+    @classmethod
+    def iter_xlsx(cls, file):
+        try:
+            archive = zipfile.ZipFile(file)
+        except zipfile.BadZipFile:
+            raise ImportFileError("XLSX 文件格式不正确")
+
+        with archive:
+            names = archive.namelist()
+            sheets = sorted(
+                (name for name in names if re.fullmatch(r'xl/worksheets/sheet\d+\.xml', name)),
+                key=lambda name: int(re.search(r'\d+', name.rsplit('/', 1)[1]).group()),
+            )
+            if not sheets:
+                raise ImportFileError("XLSX 文件中没有工作表")
+
+            shared_strings = []
+            if 'xl/sharedStrings.xml' in names:
+                with archive.open('xl/sharedStrings.xml') as f:
+                    shared_strings = cls._read_shared_strings(f)
+
+            with archive.open(sheets[0]) as f:
+                yield from cls._read_sheet(f, shared_strings)
+
+    @classmethod
+    def _read_shared_strings(cls, f):
+        strings = []
+        for _, element in iterparse(f):
+            if element.tag == f'{_SHEET_NS}si':
+                strings.append(''.join(t.text or '' for t in element.iter(f'{_SHEET_NS}t')))
+                element.clear()
+        return strings
+
+    @classmethod
+    def _read_sheet(cls, f, shared_strings):
+        sheet_data = None
+        for event, element in iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == f'{_SHEET_NS}sheetData':
+                    sheet_data = element
+                continue
+            if element.tag != f'{_SHEET_NS}row':
+                continue
+
+            row = []
+            for cell in element.iter(f'{_SHEET_NS}c'):
+                ref = cell.get('r')
+                if ref:
+                    # 空单元格不会出现在 XML 中，按单元格坐标补齐
+                    index = cls._column_index(_CELL_REF.match(ref).group(1))
+                    row.extend([''] * (index - len(row)))
+                row.append(cls._cell_value(cell, shared_strings))
+            # 已处理的行从树上移除，内存占用与行数无关
+            if sheet_data is not None:
+                sheet_data.clear()
+            yield row
+
+    @classmethod
+    def _cell_value(cls, cell, shared_strings):
+        cell_type = cell.get('t')
+        if cell_type == 'inlineStr':
+            return ''.join(t.text or '' for t in cell.iter(f'{_SHEET_NS}t'))
+
+        value = cell.find(f'{_SHEET_NS}v')
+        if value is None or value.text is None:
+            return ''
+        if cell_type == 's':
+            return shared_strings[int(value.text)]
+        if cell_type is None or cell_type == 'n':
+            # Excel 把整数存成 "101.0" 之类的浮点文本
+            text = value.text
+            return text[:-2] if text.endswith('.0') else text
+        return value.text
+
+    @classmethod
+    def _column_index(cls, letters):
+        index = 0
+        for letter in letters:
+            index = index * 26 + ord(letter) - ord('A') + 1
+        return index - 1
@@ -0,0 +1,70 @@
+"""
+门禁日志分区维护与数据保留
+使用方法: python manage.py access_log_retention --keep-months 12 [--archive] [--dry-run]
+
+MySQL 下：按 --ahead 预建未来月份分区，并对保留期之前的月份分区执行 DROP PARTITION，
+--archive 时先用 EXCHANGE PARTITION 换出到 property_accesslog_archive_pYYYYMM 归档表。
+非 MySQL 数据库没有分区，退化为分批删除过期记录。建议每天通过定时任务执行一次。
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from property.access_log_service import AccessLogPartitionService
+
+
+class Command(BaseCommand):
+    help = '门禁日志按月分区维护：预建分区、清理或归档过期分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=12,
+            help='保留最近多少个月的数据（含当月，默认: 12）',
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help='预建未来多少个月的分区 (默认: 3)',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='过期分区换出到归档表而不是直接删除',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只显示将要清理的分区，不实际执行',
+        )
+
+    def handle(self, *args, **options):
+        keep_months = options['keep_months']
+        if keep_months < 1:
+            raise CommandError('--keep-months 必须大于 0')
+
+        service = AccessLogPartitionService
+        current = service.month_start(timezone.localdate())
+        before_month = service.add_months(current, 1 - keep_months)
+
+        if service.is_supported() and not options['dry_run']:
+            created = service.ensure_future_partitions(options['ahead'])
+            if created:
+                self.stdout.write(f"新增分区: {', '.join(created)}")
+
+        try:
+            results = service.expire(before_month, archive=options['archive'], dry_run=options['dry_run'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        action = '将清理' if options['dry_run'] else '已清理'
+        for item in results:
+            target = item['partition'] or '过期记录'
+            suffix = f" -> {item['archive_table']}" if item['archive_table'] else ''
+            self.stdout.write(f"{action} {target}: {item['rows']} 条{suffix}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"门禁日志保留 {before_month:%Y-%m} 起的数据，处理 {len(results)} 个分区/批次"
+        ))
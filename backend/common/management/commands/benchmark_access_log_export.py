@@ -0,0 +1,111 @@
+"""
+门禁日志流式导出内存基准测试
+使用方法: python manage.py benchmark_access_log_export --rows 1000000 --file-type csv
+
+在独立事务中批量写入 rows 条门禁日志，消费一次导出接口使用的字节流（丢弃输出），
+期间采样进程常驻内存 (RSS)，结束后整体回滚。RSS 增量应与导出行数无关。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import resource
+import time
+
+from property.models import AccessLog
+from property.export_service import AccessLogExportService
+from common.export import StreamingExporter
+
+
+class _Rollback(Exception):
+    """用于回滚基准测试数据"""
+    pass
+
+
+def current_rss_mb():
+    """当前进程常驻内存 (MB)，无 /proc 时退化为峰值 RSS"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = '门禁日志流式导出内存基准测试（数据自动回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='导出的门禁日志条数 (默认: 1000000)',
+        )
+        parser.add_argument(
+            '--file-type',
+            choices=['csv', 'xlsx'],
+            default='csv',
+            help='导出格式 (默认: csv)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='写入测试数据的批大小 (默认: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'写入 {rows} 条测试数据...')
+                self.build_fixture(rows, options['batch_size'])
+                self.run_export(rows, options['file_type'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def build_fixture(self, rows, batch_size):
+        started = timezone.now()
+        for offset in range(0, rows, batch_size):
+            AccessLog.objects.bulk_create([
+                AccessLog(
+                    person_name=f'bench{i}',
+                    method='card',
+                    direction='in',
+                    location='南大门',
+                    person_type='resident',
+                    timestamp=started - timedelta(seconds=i),
+                    device_id='bench',
+                    success=True,
+                )
+                for i in range(offset, min(offset + batch_size, rows))
+            ])
+
+    def run_export(self, rows, file_type):
+        queryset = AccessLog.objects.filter(device_id='bench')
+        response = AccessLogExportService.response(queryset, file_type)
+
+        baseline = current_rss_mb()
+        peak = baseline
+        total_bytes = 0
+        chunk_count = 0
+        started = time.perf_counter()
+
+        for chunk in response.streaming_content:
+            total_bytes += len(chunk)
+            chunk_count += 1
+            if chunk_count % 200 == 0:
+                peak = max(peak, current_rss_mb())
+        peak = max(peak, current_rss_mb())
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'导出格式: {file_type}，分块大小: {StreamingExporter.CHUNK_SIZE} 行')
+        self.stdout.write(f'导出 {rows} 行，{total_bytes / 1024 / 1024:.1f} MB，耗时 {elapsed:.1f} 秒')
+        self.stdout.write(self.style.SUCCESS(
+            f'RSS 起始 {baseline:.1f} MB，峰值 {peak:.1f} MB，增量 {peak - baseline:.1f} MB'
+        ))
@@ -0,0 +1,89 @@
+"""
+房屋批量导入性能基准测试
+使用方法: python manage.py benchmark_asset_import --rows 100000 --file-type csv
+
+生成 rows 行房屋导入文件，在独立事务中导入两遍（第一遍全部新增，第二遍全部按唯一键更新），
+输出耗时和 SQL 条数后整体回滚，不会在数据库中留下任何数据。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import tempfile
+import time
+import uuid
+
+from common.export import StreamingExporter
+from property.import_service import HouseImportService
+
+
+class _Rollback(Exception):
+    """用于回滚基准测试数据"""
+    pass
+
+
+class Command(BaseCommand):
+    help = '房屋批量导入性能基准测试（数据自动回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100000,
+            help='导入的房屋行数 (默认: 100000)',
+        )
+        parser.add_argument(
+            '--file-type',
+            choices=['csv', 'xlsx'],
+            default='csv',
+            help='导入文件格式 (默认: csv)',
+        )
+        parser.add_argument(
+            '--houses-per-building',
+            type=int,
+            default=500,
+            help='每栋楼的房屋数量 (默认: 500)',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        file_type = options['file_type']
+
+        with tempfile.TemporaryFile() as f:
+            self.stdout.write(f'生成 {rows} 行 {file_type} 导入文件...')
+            self.build_file(f, rows, file_type, options['houses_per_building'])
+            self.stdout.write(f'文件大小 {f.tell() / 1024 / 1024:.1f} MB')
+
+            try:
+                with transaction.atomic():
+                    for label in ('新增', '更新'):
+                        f.seek(0)
+                        self.run_once(label, f, file_type, rows)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def build_file(self, f, rows, file_type, per_building):
+        prefix = uuid.uuid4().hex[:6]
+        headers = ['楼栋', '单元', '楼层', '房号', '面积', '状态']
+        data = (
+            [f'bench-{prefix}-{i // per_building}', f'{i % 4 + 1}单元', i % 30 + 1, f'{i % per_building:04d}', '89.50', 3]
+            for i in range(rows)
+        )
+        stream = StreamingExporter.stream_csv if file_type == 'csv' else StreamingExporter.stream_xlsx
+        for chunk in stream(headers, data):
+            f.write(chunk)
+
+    def run_once(self, label, f, file_type, rows):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            summary = HouseImportService.run(f, file_type)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label}: {summary['created']} 新增 / {summary['updated']} 更新 / {summary['failed']} 失败，"
+            f"SQL {len(queries)} 条"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}耗时 {elapsed:.1f} 秒，{rows / elapsed:.0f} 行/秒"
+        ))
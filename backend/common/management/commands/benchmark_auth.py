@@ -0,0 +1,76 @@
+"""
+接口认证开销基准测试
+使用方法: python manage.py benchmark_auth --requests 20000
+
+对同一个签名 token 重复执行 CustomTokenAuthentication.authenticate，分别统计
+未命中缓存（每次清空两级缓存）、只命中共享缓存（每次清空进程内缓存）和命中进程内缓存
+三种情况下每个请求的平均耗时和 SQL 条数。测试用户在事务中创建，结束后回滚。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+import time
+import uuid
+
+from users.authentication import CustomTokenAuthentication
+from users.models import User
+from users.token_service import TokenService, AuthUserCache
+
+
+class _Rollback(Exception):
+    """用于回滚基准测试数据"""
+    pass
+
+
+class Command(BaseCommand):
+    help = '接口认证开销基准测试（数据自动回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20000,
+            help='每种情况模拟的请求数 (默认: 20000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                suffix = uuid.uuid4().hex[:8]
+                user = User.objects.create(username=f'bench_{suffix}', phone=f'199{suffix[:8]}')
+                request = RequestFactory().get(
+                    '/', HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(user, "sms")}'
+                )
+                self.run(user, request, options['requests'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def run(self, user, request, count):
+        authenticator = CustomTokenAuthentication()
+
+        def clear_all():
+            AuthUserCache.invalidate(user.id)
+
+        cases = [
+            ('未命中缓存', clear_all),
+            ('命中共享缓存', AuthUserCache.clear_local),
+            ('命中进程内缓存', None),
+        ]
+
+        self.stdout.write(f"{'情况':<12} {'每请求(us)':>12} {'每请求SQL':>10}")
+        for label, before_each in cases:
+            authenticator.authenticate(request)
+            elapsed = 0.0
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(count):
+                    if before_each:
+                        before_each()
+                    started = time.perf_counter()
+                    authenticator.authenticate(request)
+                    elapsed += time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<12} {elapsed / count * 1e6:>12.1f} {len(queries) / count:>10.2f}"
+            )
@@ -0,0 +1,146 @@
+"""
+账单批量生成性能基准测试
+使用方法: python manage.py benchmark_bill_generation --sizes 1000,5000,10000,50000
+
+每个规模在独立事务中构造 楼栋/用户/房屋/业主绑定 数据，执行一次批量生成后整体回滚，
+不会在数据库中留下任何数据。输出耗时、SQL 条数和每户平均耗时，用于验证生成耗时随房屋数线性增长。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+import time
+import uuid
+
+from property.models import Building, House, HouseBindingApplication, HouseUserBinding, FeeStandard
+from property.billing_service import BillGenerationService
+from users.models import User
+
+
+class _Rollback(Exception):
+    """用于回滚基准测试数据"""
+    pass
+
+
+class Command(BaseCommand):
+    help = '账单批量生成性能基准测试（数据自动回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='1000,5000,10000,50000',
+            help='房屋数量规模，逗号分隔 (默认: 1000,5000,10000,50000)',
+        )
+        parser.add_argument(
+            '--houses-per-building',
+            type=int,
+            default=200,
+            help='每栋楼的房屋数量 (默认: 200)',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        per_building = options['houses_per_building']
+
+        self.stdout.write(f"{'房屋数':>8} {'耗时(s)':>10} {'SQL条数':>8} {'每户(ms)':>10}")
+        results = []
+        for size in sizes:
+            elapsed, query_count = self.run_once(size, per_building)
+            results.append((size, elapsed))
+            self.stdout.write(f"{size:>8} {elapsed:>10.3f} {query_count:>8} {elapsed / size * 1000:>10.4f}")
+
+        if len(results) >= 2:
+            (small_size, small_time), (large_size, large_time) = results[0], results[-1]
+            ratio = (large_time / small_time) / (large_size / small_size) if small_time else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"规模放大 {large_size / small_size:.0f} 倍，单户耗时比 {ratio:.2f}（接近 1 表示线性）"
+            ))
+
+    def run_once(self, size, per_building):
+        """构造 size 套房屋并执行一次生成，返回 (耗时, SQL条数)"""
+        tag = uuid.uuid4().hex[:8]
+        elapsed = 0
+        query_count = 0
+
+        try:
+            with transaction.atomic():
+                fee_standard, building_names = self.build_fixture(size, per_building, tag)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    result = BillGenerationService.generate(
+                        fee_standard, 'property', 2030, 1, building_names
+                    )
+                    elapsed = time.perf_counter() - started
+                query_count = len(ctx.captured_queries)
+
+                assert result['generated_count'] == size, result['generated_count']
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        return elapsed, query_count
+
+    def build_fixture(self, size, per_building, tag):
+        """批量写入基准测试数据，返回 (收费标准, 楼栋名称列表)
+
+        bulk_create 在 MySQL 上不回填主键，所以按标记回查。
+        """
+        building_count = (size + per_building - 1) // per_building
+        Building.objects.bulk_create([
+            Building(name=f"bench-{tag}-{i}") for i in range(building_count)
+        ])
+        buildings = list(Building.objects.filter(name__startswith=f"bench-{tag}-").order_by('id'))
+
+        User.objects.bulk_create([
+            User(username=f"bench_{tag}_{i}", nickname=f"业主{i}", password='!') for i in range(size)
+        ], batch_size=1000)
+        user_ids = list(User.objects.filter(username__startswith=f"bench_{tag}_").order_by('id').values_list('id', flat=True))
+
+        House.objects.bulk_create([
+            House(
+                building=buildings[i // per_building],
+                unit='1单元',
+                floor=i % per_building // 4 + 1,
+                room_number=str(i % per_building),
+                area=Decimal('88.50')
+            ) for i in range(size)
+        ], batch_size=1000)
+        house_ids = list(House.objects.filter(building__in=buildings).order_by('id').values_list('id', flat=True))
+
+        HouseBindingApplication.objects.bulk_create([
+            HouseBindingApplication(
+                user_id=user_ids[i],
+                applicant_name=f"业主{i}",
+                applicant_phone='13800000000',
+                id_card_number=tag,
+                building_name='bench',
+                unit_name='1单元',
+                room_number=str(i),
+                identity=1,
+                status=1
+            ) for i in range(size)
+        ], batch_size=1000)
+        application_ids = list(HouseBindingApplication.objects.filter(
+            id_card_number=tag
+        ).order_by('id').values_list('id', flat=True))
+
+        HouseUserBinding.objects.bulk_create([
+            HouseUserBinding(
+                user_id=user_ids[i],
+                house_id=house_ids[i],
+                application_id=application_ids[i],
+                identity=1,
+                status=1
+            ) for i in range(size)
+        ], batch_size=1000)
+
+        fee_standard = FeeStandard.objects.create(
+            name=f"bench-{tag}",
+            fee_type='property',
+            unit_price=Decimal('2.50'),
+            billing_unit='per_sqm_month'
+        )
+        return fee_standard, [building.name for building in buildings]
@@ -0,0 +1,94 @@
+"""
+门禁日志写后缓冲入库进程
+使用方法: python manage.py flush_access_logs
+         python manage.py flush_access_logs --once   # 清空当前缓冲后退出
+
+从 Redis Stream 消费组批量读取设备上报事件写入 AccessLog，同时导入 Redis 故障期间写下的本地暂存文件。
+可以启动多个进程（--consumer 不同）并行消费。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import os
+import socket
+import time
+
+from property.access_log_buffer import AccessLogBufferService
+
+
+class Command(BaseCommand):
+    help = '运行门禁日志缓冲入库进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='缓冲为空时退出，而不是继续等待',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每批从 Stream 读取的事件数 (默认: 5000)',
+        )
+        parser.add_argument(
+            '--block-ms',
+            type=int,
+            default=1000,
+            help='Stream 为空时阻塞等待的毫秒数 (默认: 1000)',
+        )
+        parser.add_argument(
+            '--consumer',
+            type=str,
+            default=f'{socket.gethostname()}-{os.getpid()}',
+            help='消费者名称，多进程消费时需各不相同 (默认: 主机名-进程号)',
+        )
+        parser.add_argument(
+            '--metrics-interval',
+            type=float,
+            default=60.0,
+            help='输出积压指标的间隔秒数 (默认: 60)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"门禁日志入库进程已启动: {options['consumer']}")
+        last_metrics = 0
+
+        while True:
+            close_old_connections()
+            flushed = 0
+
+            result = AccessLogBufferService.flush_spool(include_current=options['once'])
+            flushed += result['created'] + result['duplicates']
+
+            try:
+                result = AccessLogBufferService.flush_stream(
+                    options['consumer'], options['batch_size'], 0 if options['once'] else options['block_ms']
+                )
+            except Exception as e:
+                # Redis 连接失败或入库失败时消息未确认，稍后会被重新投递
+                self.stderr.write(f'读取门禁事件失败: {e}')
+                result = None
+            if result is None:
+                # Redis 不可用，只能处理暂存文件
+                if not options['once']:
+                    time.sleep(options['block_ms'] / 1000)
+            else:
+                flushed += result['created'] + result['duplicates']
+                if result['created'] or result['duplicates']:
+                    self.stdout.write(
+                        f"入库 {result['created']} 条，重复 {result['duplicates']} 条，丢弃 {result['invalid']} 条"
+                    )
+
+            if time.time() - last_metrics >= options['metrics_interval']:
+                metrics = AccessLogBufferService.get_metrics()
+                self.stdout.write(
+                    f"积压 {metrics['stream_length']} 条，未确认 {metrics['pending']} 条，"
+                    f"最早滞留 {metrics['oldest_lag_seconds']} 秒，暂存文件 {metrics['spool_files']} 个"
+                )
+                last_metrics = time.time()
+
+            if options['once'] and not flushed:
+                break
+
+        self.stdout.write('缓冲已清空，入库进程退出')
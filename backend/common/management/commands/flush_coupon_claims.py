@@ -0,0 +1,71 @@
+"""
+优惠券领取记录入库进程
+使用方法: python manage.py flush_coupon_claims
+         python manage.py flush_coupon_claims --once   # 清空当前积压后退出
+
+从 Redis Stream 消费组批量读取领券记录写入 UserCoupon，并累加优惠券的已领数量。
+可以启动多个进程（--consumer 不同）并行消费。
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import os
+import socket
+import time
+
+from merchant.coupon_claim_service import CouponClaimService
+
+
+class Command(BaseCommand):
+    help = '运行优惠券领取记录入库进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='积压为空时退出，而不是继续等待',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='每批从 Stream 读取的记录数 (默认: 1000)',
+        )
+        parser.add_argument(
+            '--block-ms',
+            type=int,
+            default=1000,
+            help='Stream 为空时阻塞等待的毫秒数 (默认: 1000)',
+        )
+        parser.add_argument(
+            '--consumer',
+            type=str,
+            default=f'{socket.gethostname()}-{os.getpid()}',
+            help='消费者名称，多进程消费时需各不相同 (默认: 主机名-进程号)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"领券记录入库进程已启动: {options['consumer']}")
+
+        while True:
+            close_old_connections()
+            try:
+                result = CouponClaimService.flush(
+                    options['consumer'], options['batch_size'], 0 if options['once'] else options['block_ms']
+                )
+            except Exception as e:
+                # Redis 连接失败或入库失败时消息未确认，稍后会被重新投递
+                self.stderr.write(f'读取领券记录失败: {e}')
+                if options['once']:
+                    break
+                time.sleep(options['block_ms'] / 1000)
+                continue
+
+            if result['created'] or result['duplicates']:
+                self.stdout.write(
+                    f"入库 {result['created']} 条，重复 {result['duplicates']} 条，丢弃 {result['invalid']} 条"
+                )
+            elif options['once'] and not result['invalid']:
+                break
+
+        self.stdout.write('积压已清空，入库进程退出')
@@ -10,7 +10,8 @@ from datetime import datetime, timedelta
 import random
 from faker import Faker
 
-from property.models import AccessLog
+from property.models import AccessLog, AccessLogCounter
+from property.access_log_service import AccessLogService, AccessLogCounterService
 from users.models import User
 
 fake = Faker('zh_CN')  # 使用中文生成器
@@ -42,6 +43,7 @@ class Command(BaseCommand):
         if options['clear']:
             self.stdout.write('清除现有门禁日志数据...')
             AccessLog.objects.all().delete()
+            AccessLogCounter.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('数据清除完成'))
 
         count = options['count']
@@ -145,12 +147,12 @@ class Command(BaseCommand):
 
         # 批量创建
         AccessLog.objects.bulk_create(logs_to_create)
+        AccessLogCounterService.record(logs_to_create)
 
         # 统计信息
         total_count = AccessLog.objects.count()
-        today_count = AccessLog.objects.filter(
-            timestamp__date=timezone.now().date()
-        ).count()
+        today = timezone.localdate()
+        today_count = AccessLogService.filter_by_date(AccessLog.objects.all(), today, today).count()
 
         # 按开门方式统计
         method_stats = AccessLog.objects.values('method').annotate(
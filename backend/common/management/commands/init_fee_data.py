@@ -12,6 +12,7 @@ import random
 from property.models import Building, House, FeeStandard, Bill
 from users.models import User, Notification
 from property.models import HouseUserBinding, HouseBindingApplication
+from property.billing_service import BillStatsService
 
 
 class Command(BaseCommand):
@@ -30,6 +31,8 @@ class Command(BaseCommand):
             Bill.objects.all().delete()
             FeeStandard.objects.all().delete()
             Notification.objects.filter(notification_type='bill_reminder').delete()
+            # 批量删除不会经过 Bill.delete，需要重建统计汇总表
+            BillStatsService.rebuild()
             self.stdout.write(self.style.SUCCESS('数据清除完成'))
 
         self.stdout.write('开始创建缴费系统测试数据...')
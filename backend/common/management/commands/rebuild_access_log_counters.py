@@ -0,0 +1,36 @@
+"""
+重建门禁通行小时汇总表
+使用方法: python manage.py rebuild_access_log_counters
+         python manage.py rebuild_access_log_counters --start-date 2025-01-01 --end-date 2025-01-31
+
+门禁日志写入时会增量更新汇总表；初次上线、直接用 SQL 导入日志或修正历史数据后，
+运行本命令按天从门禁日志重建指定范围（默认全部）的汇总数据。
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from property.access_log_service import AccessLogCounterService
+
+
+class Command(BaseCommand):
+    help = '从门禁日志重建门禁通行小时汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='开始日期 YYYY-MM-DD（默认: 最早的日志）',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='结束日期 YYYY-MM-DD（默认: 最新的日志）',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始重建门禁通行汇总表...')
+        try:
+            row_count = AccessLogCounterService.rebuild(options['start_date'], options['end_date'])
+        except ValueError as e:
+            raise CommandError(f'日期格式错误: {e}')
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共 {row_count} 行汇总数据'))
@@ -0,0 +1,20 @@
+"""
+重建账单统计汇总表
+使用方法: python manage.py rebuild_bill_stats
+
+账单保存、支付和批量生成时会增量更新汇总表；直接用 QuerySet.update/delete
+批量修改账单后（如 init_fee_data --clear），需要运行本命令从账单表全量重建。
+"""
+
+from django.core.management.base import BaseCommand
+
+from property.billing_service import BillStatsService
+
+
+class Command(BaseCommand):
+    help = '从账单表全量重建账单统计汇总表'
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始重建账单统计汇总表...')
+        row_count = BillStatsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共 {row_count} 行汇总数据'))
@@ -0,0 +1,29 @@
+"""
+重建商户日销售汇总表
+使用方法: python manage.py rebuild_merchant_sales
+         python manage.py rebuild_merchant_sales --merchant 3   # 只重建一个商户
+
+订单完成时会增量更新汇总表；直接修改订单表（如导入历史订单、手工修正金额）后，
+需要运行本命令从已完成订单全量重建。重建期间锁定涉及的商户，这些商户的订单完成会等待重建结束。
+"""
+
+from django.core.management.base import BaseCommand
+
+from merchant.sales_stats_service import MerchantSalesService
+
+
+class Command(BaseCommand):
+    help = '从已完成订单全量重建商户日销售汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--merchant',
+            type=int,
+            default=None,
+            help='只重建指定商户ID的汇总',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始重建商户日销售汇总表...')
+        row_count = MerchantSalesService.rebuild(options['merchant'])
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共 {row_count} 行汇总数据'))
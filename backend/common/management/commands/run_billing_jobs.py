@@ -0,0 +1,48 @@
+"""
+缴费后台任务工作进程（批量生成账单、批量催缴）
+使用方法: python manage.py run_billing_jobs
+         python manage.py run_billing_jobs --once   # 处理完当前队列后退出
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from property.billing_job_service import BillingJobService
+
+
+class Command(BaseCommand):
+    help = '运行缴费后台任务工作进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='队列为空时退出，而不是继续轮询',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='队列为空时的轮询间隔秒数 (默认: 2)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('缴费任务工作进程已启动')
+
+        while True:
+            close_old_connections()
+            job = BillingJobService.claim_next()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'开始执行任务 {job.id}: {job.get_job_type_display()}')
+            BillingJobService.run(job)
+            style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+            self.stdout.write(style(f'任务 {job.id} 执行结束: {job.get_status_display()}'))
+
+        self.stdout.write('队列已清空，工作进程退出')
@@ -1,3 +1,15 @@
 from django.db import models
 
-# Create your models here.
+
+class Sequence(models.Model):
+    """通用序列号计数器（账单号、工单号等按名称分段递增）"""
+    name = models.CharField(max_length=64, primary_key=True, verbose_name="序列名称")  # 如 "bill:20251218"
+    value = models.BigIntegerField(default=0, verbose_name="当前值")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "序列号计数器"
+        verbose_name_plural = "序列号计数器"
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
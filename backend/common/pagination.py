@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """分页游标无法解析"""
+    pass
+
+
+class ListPaginator:
+    """
+    列表接口分页工具
+
+    默认沿用 page/page_size 页码分页，返回结构保持不变；
+    传入 cursor 参数（首页传空值）时切换为游标分页，按 (排序时间字段, id) 倒序做范围查询，
+    翻页开销与页码深度无关。total 统计可通过 with_total=false 关闭，游标模式默认不统计。
+    """
+
+    MAX_PAGE_SIZE = 200
+
+    @classmethod
+    def encode_cursor(cls, value, pk):
+        """将 (时间, id) 编码为不透明的游标字符串"""
+        payload = json.dumps([value.isoformat(), pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        """解析游标字符串，返回 (时间, id)"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise InvalidCursor("无效的分页游标")
+
+    @classmethod
+    def get_page_size(cls, request, default):
+        page_size = int(request.GET.get('page_size', default))
+        return max(1, min(page_size, cls.MAX_PAGE_SIZE))
+
+    @classmethod
+    def wants_total(cls, request, default):
+        value = request.GET.get('with_total')
+        if value is None:
+            return default
+        return value.lower() in ('1', 'true', 'yes')
+
+    @classmethod
+    def paginate(cls, request, queryset, order_field, default_page_size=20):
+        """
+        对已过滤的 queryset 分页，返回 (当前页对象列表, 分页信息字典)
+
+        order_field 为倒序排序使用的时间字段（如 created_at、timestamp），id 作为并列时的次序。
+        """
+        page_size = cls.get_page_size(request, default_page_size)
+        queryset = queryset.order_by(f'-{order_field}', '-id')
+
+        if 'cursor' in request.GET:
+            return cls._paginate_by_cursor(request, queryset, order_field, page_size)
+        return cls._paginate_by_page(request, queryset, page_size)
+
+    @classmethod
+    def paginate_pages(cls, request, queryset, default_page_size=20):
+        """对已排序的 queryset 做页码分页，用于没有时间排序字段的列表（如房屋、车位）"""
+        return cls._paginate_by_page(request, queryset, cls.get_page_size(request, default_page_size))
+
+    @classmethod
+    def _paginate_by_page(cls, request, queryset, page_size):
+        page = max(1, int(request.GET.get('page', 1)))
+        start = (page - 1) * page_size
+
+        # 多取一条用于判断是否还有下一页，不统计总数时也能翻页
+        items = list(queryset[start:start + page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+
+        meta = {
+            'page': page,
+            'page_size': page_size,
+            'has_more': has_more,
+            'total': None,
+            'total_pages': None,
+        }
+        if cls.wants_total(request, True):
+            total = queryset.count()
+            meta['total'] = total
+            meta['total_pages'] = (total + page_size - 1) // page_size
+        return items, meta
+
+    @classmethod
+    def _paginate_by_cursor(cls, request, queryset, order_field, page_size):
+        cursor = request.GET.get('cursor', '').strip()
+        total = queryset.count() if cls.wants_total(request, False) else None
+
+        if cursor:
+            value, pk = cls.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{order_field}__lt': value}) |
+                Q(**{order_field: value, 'id__lt': pk})
+            )
+
+        items = list(queryset[:page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+
+        next_cursor = None
+        if has_more:
+            last = items[-1]
+            next_cursor = cls.encode_cursor(getattr(last, order_field), last.pk)
+
+        return items, {
+            'page_size': page_size,
+            'has_more': has_more,
+            'next_cursor': next_cursor,
+            'total': total,
+        }
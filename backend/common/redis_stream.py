@@ -0,0 +1,77 @@
+def get_redis_client():
+    """获取原生 Redis 连接，缓存后端不是 Redis 时返回 None"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+class StreamConsumer:
+    """
+    Redis Stream 消费组读取和确认
+
+    每条消息的内容保存在单个字段中。读取时先认领其他消费者超过 claim_idle_ms 未确认的消息，
+    不足一批再读取新消息；调用方处理成功后 ack，确认前退出的消息会被重新投递（至少一次）。
+    """
+
+    def __init__(self, client, stream, group, field='e', claim_idle_ms=60000):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.field = field
+        self.claim_idle_ms = claim_idle_ms
+
+    def ensure_group(self):
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def read(self, consumer, count, block_ms):
+        """读取一批消息，返回 [(消息ID, 内容)]"""
+        self.ensure_group()
+        claimed = self.client.xautoclaim(
+            self.stream, self.group, consumer, min_idle_time=self.claim_idle_ms, start_id='0-0', count=count
+        )
+        # 已被删除的消息认领结果为空
+        entries = [entry for entry in claimed[1] if entry[1]]
+        if len(entries) < count:
+            response = self.client.xreadgroup(
+                self.group, consumer, {self.stream: '>'}, count=count - len(entries), block=block_ms or None
+            ) or []
+            for _, messages in response:
+                entries.extend(messages)
+        return [
+            (message_id, fields.get(self.field.encode()) or fields.get(self.field))
+            for message_id, fields in entries
+        ]
+
+    def ack(self, ids):
+        """确认并删除已处理的消息"""
+        if ids:
+            self.client.xack(self.stream, self.group, *ids)
+            self.client.xdel(self.stream, *ids)
+
+    def scan(self, batch=1000):
+        """按顺序遍历 Stream 中全部消息（含未确认的），逐条返回 (消息ID, 内容)"""
+        start = '-'
+        while True:
+            entries = self.client.xrange(self.stream, min=start, max='+', count=batch)
+            for message_id, fields in entries:
+                yield message_id, fields.get(self.field.encode()) or fields.get(self.field)
+            if len(entries) < batch:
+                return
+            last_id = entries[-1][0]
+            start = '(' + (last_id.decode() if isinstance(last_id, bytes) else last_id)
+
+    def length(self):
+        return self.client.xlen(self.stream)
+
+    def pending(self):
+        """已读取未确认的消息数，消费组尚未创建时返回 0"""
+        try:
+            return self.client.xpending(self.stream, self.group)['pending']
+        except Exception:
+            return 0
@@ -0,0 +1,151 @@
+from datetime import date
+from django.db import transaction
+from django.db.models import F
+import logging
+
+from .models import Sequence
+from .redis_stream import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# 当前号段未用完时直接递增；号段用完或键不存在时返回 nil，由调用方从数据库预留新号段
+_TAKE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+local limit = tonumber(redis.call('GET', KEYS[2]) or '-1')
+local count = tonumber(ARGV[1])
+if current >= 0 and current + count <= limit then
+    return redis.call('INCRBY', KEYS[1], count)
+end
+return nil
+"""
+
+# 安装新号段：其他进程已装入可用号段时改用其号段；新号段不比现有号段新时返回 nil 重试
+_REFILL_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+local limit = tonumber(redis.call('GET', KEYS[2]) or '-1')
+local count = tonumber(ARGV[1])
+local first = tonumber(ARGV[2])
+local last = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+if current >= 0 and current + count <= limit then
+    return redis.call('INCRBY', KEYS[1], count)
+end
+if first <= limit then
+    return nil
+end
+redis.call('SET', KEYS[1], first - 1 + count, 'EX', ttl)
+redis.call('SET', KEYS[2], last, 'EX', ttl)
+return first - 1 + count
+"""
+
+
+class SequenceService:
+    """
+    序列号服务：号码单调递增且不重复，可一次预留连续号段供批量写入使用
+
+    有 Redis 时在 Redis 中原子递增，数据库计数器只按 BLOCK_SIZE 预留号段，
+    单号分配不占用数据库行锁，也不受调用方外层事务时长影响；
+    数据库计数器始终不小于已发出的最大号码，Redis 数据丢失后从数据库重新预留，不会发重号；
+    在调用方事务内补充号段时，号段等事务提交后才装入 Redis，事务回滚不会造成重号。
+    Redis 不可用时直接在数据库计数器行上原子递增（切换期间只保证不重复）。号码可能有空号。
+    """
+
+    # Redis 每次从数据库预留的号段大小
+    BLOCK_SIZE = 100
+    # Redis 计数器键的有效期（秒），按日分段的序列过期后自动清理
+    REDIS_TTL = 3 * 24 * 60 * 60
+    REDIS_KEY = 'sequence:{name}'
+    REFILL_RETRIES = 3
+
+    @classmethod
+    def get_client(cls):
+        return get_redis_client()
+
+    @classmethod
+    def reserve(cls, name, count=1, seed=None):
+        """
+        预留 count 个连续序号，返回 (first, last)
+
+        seed 为可选的回调，序列首次使用时返回初始值（用于接续历史数据中已有的最大序号）。
+        """
+        if count < 1:
+            raise ValueError("count 必须大于 0")
+
+        client = cls.get_client()
+        if client is not None:
+            try:
+                last = cls._reserve_redis(client, name, count, seed)
+                if last is not None:
+                    return last - count + 1, last
+            except Exception as e:
+                logger.warning(f"Redis 序列号分配失败，改用数据库计数器: {name}: {e}")
+
+        return cls._reserve_db(name, count, seed)
+
+    @classmethod
+    def next_value(cls, name, seed=None):
+        """获取下一个序号"""
+        first, _ = cls.reserve(name, 1, seed)
+        return first
+
+    @classmethod
+    def daily_numbers(cls, key, prefix, width, count=1, day=None, seed=None):
+        """
+        按日分段的编号：{prefix}{YYYYMMDD}{序号}，序号补零到 width 位，超出时自然增长
+
+        seed(date_str) 返回当日已有的最大序号，仅在当日序列首次使用时调用。
+        """
+        day = day or date.today()
+        date_str = day.strftime('%Y%m%d')
+        first, last = cls.reserve(
+            f'{key}:{date_str}', count, (lambda: seed(date_str)) if seed else None
+        )
+        return [f'{prefix}{date_str}{seq:0{width}d}' for seq in range(first, last + 1)]
+
+    @classmethod
+    def _reserve_db(cls, name, count, seed=None):
+        """
+        在数据库计数器行上原子递增，返回 (first, last)
+
+        计数器行在当前事务内被 UPDATE 加锁，并发调用会排队而不会拿到重复号段。
+        在调用方事务内调用时行锁保持到外层事务结束，批量写入应在开启事务前预留号码。
+        """
+        # defaults 中的回调只在计数器行不存在时调用
+        Sequence.objects.get_or_create(name=name, defaults={'value': seed or 0})
+        with transaction.atomic():
+            Sequence.objects.filter(name=name).update(value=F('value') + count)
+            last = Sequence.objects.filter(name=name).values_list('value', flat=True).get()
+
+        return last - count + 1, last
+
+    @classmethod
+    def _reserve_redis(cls, client, name, count, seed=None):
+        """从 Redis 当前号段中取号，号段不足时从数据库预留新号段，返回本次最后一个序号"""
+        keys = [cls.REDIS_KEY.format(name=name), cls.REDIS_KEY.format(name=name) + ':limit']
+
+        last = client.register_script(_TAKE_SCRIPT)(keys=keys, args=[count])
+        if last is not None:
+            return int(last)
+
+        for _ in range(cls.REFILL_RETRIES):
+            first, block_last = cls._reserve_db(name, max(count, cls.BLOCK_SIZE), seed)
+            if transaction.get_connection().in_atomic_block:
+                # 调用方事务回滚时数据库计数器会一并回退，号段不能先装入 Redis，否则会再次发出；
+                # 本次直接使用号段开头，剩余部分等事务提交后再装入
+                if block_last >= first + count:
+                    transaction.on_commit(lambda: cls._install_block(client, keys, first + count, block_last))
+                return first + count - 1
+            last = client.register_script(_REFILL_SCRIPT)(
+                keys=keys, args=[count, first, block_last, cls.REDIS_TTL]
+            )
+            if last is not None:
+                return int(last)
+        return None
+
+    @classmethod
+    def _install_block(cls, client, keys, first, last):
+        """把已提交的号段装入 Redis；已有可用号段或号段不比现有的新时丢弃（只产生空号）"""
+        try:
+            client.register_script(_REFILL_SCRIPT)(keys=keys, args=[0, first, last, cls.REDIS_TTL])
+        except Exception as e:
+            logger.warning(f"Redis 序列号段装入失败，下次从数据库重新预留: {keys[0]}: {e}")
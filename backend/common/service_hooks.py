@@ -0,0 +1,23 @@
+class RequiredHooks:
+    """
+    服务基类的钩子检查
+
+    服务类只通过类方法调用、不会实例化，abc.abstractmethod 不起作用。
+    基类在 required_hooks 中列出子类必须覆盖的钩子，定义子类时即检查，缺少时抛出 TypeError。
+    """
+
+    required_hooks = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 直接继承 RequiredHooks 的是声明钩子的基类本身，不检查
+        if RequiredHooks in cls.__bases__:
+            return
+        missing = [name for name in cls.required_hooks if RequiredHooks in cls.defining_class(name).__bases__]
+        if missing:
+            raise TypeError(f"{cls.__name__} 未实现钩子: {', '.join(missing)}")
+
+    @classmethod
+    def defining_class(cls, name):
+        """沿 MRO 找到定义该属性的类"""
+        return next(klass for klass in cls.__mro__ if name in vars(klass))
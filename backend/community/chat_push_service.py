@@ -0,0 +1,82 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from contextlib import asynccontextmanager
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ChatPushService:
+    """
+    私聊消息实时推送
+
+    每个用户对应 channel layer 中的一个组，WebSocket 连接和长轮询请求都加入该组；
+    发送消息后在事务提交时向接收者的组广播，在线客户端不再需要轮询数据库。
+    生产环境使用 Redis channel layer，多进程共享；测试使用内存 channel layer。
+    """
+
+    GROUP_NAME = 'chat.user.{user_id}'
+    EVENT_TYPE = 'chat.message'
+
+    @classmethod
+    def group_name(cls, user_id):
+        return cls.GROUP_NAME.format(user_id=user_id)
+
+    @classmethod
+    def publish_message(cls, receiver_id, conversation_id, message_data):
+        """事务提交后把新消息推送给接收者，推送失败不影响消息发送"""
+        event = {
+            'type': cls.EVENT_TYPE,
+            'conversation_id': conversation_id,
+            # channel layer 只能传输基础类型
+            'message': json.loads(json.dumps(message_data, cls=DjangoJSONEncoder)),
+        }
+        transaction.on_commit(lambda: cls.send_event(receiver_id, event))
+
+    @classmethod
+    def send_event(cls, user_id, event):
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        try:
+            async_to_sync(layer.group_send)(cls.group_name(user_id), event)
+        except Exception as e:
+            logger.warning(f"聊天消息推送失败: user={user_id}: {e}")
+
+    @classmethod
+    @asynccontextmanager
+    async def subscribe(cls, user_id):
+        """
+        临时加入用户的组，返回接收通道名，退出时离开该组
+
+        长轮询应先订阅再查询数据库，避免查询和开始等待之间到达的消息被漏掉。
+        """
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        group = cls.group_name(user_id)
+        await layer.group_add(group, channel)
+        try:
+            yield channel
+        finally:
+            await layer.group_discard(group, channel)
+
+    @classmethod
+    async def wait_for_message(cls, channel, conversation_id, timeout):
+        """等待指定会话的新消息推送，收到返回 True，超时返回 False；其他会话的推送被忽略"""
+        layer = get_channel_layer()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                event = await asyncio.wait_for(layer.receive(channel), remaining)
+            except asyncio.TimeoutError:
+                return False
+            if event.get('conversation_id') == conversation_id:
+                return True
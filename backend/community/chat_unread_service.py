@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+
+from .models import ChatConversation
+
+
+class ChatUnreadService:
+    """
+    私聊未读计数
+
+    会话上的未读数只用单列 F() 表达式 UPDATE 修改，并发发送不会丢失计数；
+    标记已读只在未读数大于 0 时写库。每个用户的未读总数缓存在 Redis 中：
+    新消息提交后原子加一，标记已读后删除缓存，下次读取时用一条聚合查询重算。
+    缓存缺失时的加一会被忽略（重算结果已包含该消息），CACHE_TTL 限定极端并发下的误差时长。
+    """
+
+    CACHE_KEY = 'chat:unread:{user_id}'
+    CACHE_TTL = 300
+
+    @classmethod
+    def get_cache_key(cls, user_id):
+        return cls.CACHE_KEY.format(user_id=user_id)
+
+    @classmethod
+    def unread_field(cls, conversation, user_id):
+        """返回指定用户在会话中的未读数字段名"""
+        return 'unread_count_p1' if user_id == conversation.participant1_id else 'unread_count_p2'
+
+    @classmethod
+    def record_message(cls, conversation, message):
+        """新消息写入后更新会话的最后消息和接收者未读数，事务提交后接收者未读总数加一"""
+        field = cls.unread_field(conversation, message.receiver_id)
+        ChatConversation.objects.filter(pk=conversation.pk).update(
+            last_message_id=message.id,
+            last_message_time=message.created_at,
+            updated_at=timezone.now(),
+            **{field: F(field) + 1},
+        )
+        conversation.last_message_id = message.id
+        conversation.last_message_time = message.created_at
+        transaction.on_commit(lambda: cls.incr_total(message.receiver_id))
+
+    @classmethod
+    def mark_read(cls, conversation, user_id):
+        """把会话标记为该用户已读，没有未读消息时不写库；返回是否有变更"""
+        field = cls.unread_field(conversation, user_id)
+        updated = ChatConversation.objects.filter(
+            pk=conversation.pk, **{f'{field}__gt': 0}
+        ).update(**{field: 0})
+        setattr(conversation, field, 0)
+        if updated:
+            transaction.on_commit(lambda: cache.delete(cls.get_cache_key(user_id)))
+        return bool(updated)
+
+    @classmethod
+    def incr_total(cls, user_id):
+        try:
+            cache.incr(cls.get_cache_key(user_id))
+        except ValueError:
+            # 缓存中没有该用户的总数，下次读取时重算
+            pass
+
+    @classmethod
+    def get_total(cls, user_id):
+        """获取用户所有会话的未读总数"""
+        key = cls.get_cache_key(user_id)
+        total = cache.get(key)
+        if total is None:
+            total = ChatConversation.objects.filter(
+                Q(participant1_id=user_id) | Q(participant2_id=user_id)
+            ).aggregate(total=Sum(Case(
+                When(participant1_id=user_id, then=F('unread_count_p1')),
+                default=F('unread_count_p2'),
+            )))['total'] or 0
+            cache.add(key, total, cls.CACHE_TTL)
+        return total
@@ -0,0 +1,42 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .chat_push_service import ChatPushService
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    私聊消息推送 WebSocket：ws/chat/?token=<登录token>
+
+    连接建立后加入当前用户的组，收到新消息时推送
+    {"type": "message", "conversation_id": ..., "message": {...}}，
+    消息格式与发送消息接口的返回值一致。发送消息仍走 HTTP 接口。
+    """
+
+    # token 无效或未登录时的关闭码
+    UNAUTHORIZED_CLOSE_CODE = 4401
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=self.UNAUTHORIZED_CLOSE_CODE)
+            return
+
+        self.group_name = ChatPushService.group_name(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # 客户端心跳
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def chat_message(self, event):
+        await self.send_json({
+            'type': 'message',
+            'conversation_id': event['conversation_id'],
+            'message': event['message'],
+        })
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_message_conversation(apps, schema_editor):
+    """按会话双方和关联商品回填已有消息的所属会话"""
+    ChatConversation = apps.get_model('community', 'ChatConversation')
+    ChatMessage = apps.get_model('community', 'ChatMessage')
+
+    conversations = ChatConversation.objects.order_by('id').values_list(
+        'id', 'participant1_id', 'participant2_id', 'market_item_id'
+    )
+    for conversation_id, participant1_id, participant2_id, market_item_id in conversations.iterator():
+        ChatMessage.objects.filter(
+            Q(sender_id=participant1_id, receiver_id=participant2_id) |
+            Q(sender_id=participant2_id, receiver_id=participant1_id),
+            market_item_id=market_item_id,
+            conversation__isnull=True,
+        ).update(conversation_id=conversation_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_activity_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='conversation',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='community.chatconversation', verbose_name='所属会话'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='chat_msg_conv_created_idx'),
+        ),
+        migrations.RunPython(backfill_message_conversation, migrations.RunPython.noop),
+    ]
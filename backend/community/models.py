@@ -180,6 +180,11 @@ class ChatMessage(models.Model):
                                    null=True, blank=True, related_name='chat_messages',
                                    verbose_name="关联商品")
     
+    # 所属会话（索引由下方 (conversation, created_at, id) 组合索引覆盖）
+    conversation = models.ForeignKey('ChatConversation', on_delete=models.CASCADE,
+                                    null=True, blank=True, db_index=False,
+                                    related_name='messages', verbose_name="所属会话")
+    
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
                               related_name='sent_messages', verbose_name="发送者")
     receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
@@ -201,6 +206,10 @@ class ChatMessage(models.Model):
         ordering = ['created_at']
         verbose_name = "私聊消息"
         verbose_name_plural = "私聊消息管理"
+        indexes = [
+            # 会话消息按时间顺序分页（游标翻页）
+            models.Index(fields=['conversation', 'created_at', 'id'], name='chat_msg_conv_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.display_name} -> {self.receiver.display_name}: {self.content[:30]}"
@@ -252,11 +261,9 @@ class ChatConversation(models.Model):
     
     def mark_as_read(self, user):
         """将指定用户的消息标记为已读"""
-        if user == self.participant1:
-            self.unread_count_p1 = 0
-        elif user == self.participant2:
-            self.unread_count_p2 = 0
-        self.save()
+        from .chat_unread_service import ChatUnreadService
+        if user.id in (self.participant1_id, self.participant2_id):
+            ChatUnreadService.mark_read(self, user.id)
 
 
 class MarketItemFavorite(models.Model):
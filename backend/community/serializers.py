@@ -261,18 +261,16 @@ class ChatConversationSerializer(serializers.ModelSerializer):
         ]
 
     def get_unread_count(self, obj):
-        # 从 context 中获取用户，优先使用 cached_user
         request = self.context.get('request')
-        user = getattr(request, 'cached_user', None) if request else None
+        user = request.user if request else None
         if user and user.is_authenticated:
             return obj.get_unread_count(user)
         return 0
 
     def get_other_user(self, obj):
-        # 从 context 中获取用户，优先使用 cached_user
         request = self.context.get('request')
-        user = getattr(request, 'cached_user', None) if request else None
-        if user:
+        user = request.user if request else None
+        if user and user.is_authenticated:
             if obj.participant1_id == user.id:
                 return UserSimpleSerializer(obj.participant2).data
             else:
@@ -0,0 +1,348 @@
+"""
+Community 模块视图测试
+测试聊天接口的认证和实时推送
+"""
+import asyncio
+import pytest
+import time
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from community.chat_unread_service import ChatUnreadService
+from community.models import ChatConversation, ChatMessage
+from community.tests.fixtures import ChatConversationFactory
+from users.auth_metrics import AuthQueryMetrics
+from users.tests.fixtures import UserFactory
+from users.token_service import TokenService, AuthUserCache
+
+
+class TestChatAuthentication:
+    """聊天接口认证测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_cache(self, settings):
+        settings.AUTH_QUERY_METRICS = True
+        cache.clear()
+        AuthUserCache.clear_local()
+
+    @pytest.mark.django_db
+    def test_chat_requests_skip_auth_queries_when_cached(self, api_client):
+        """测试发送和轮询消息时，缓存命中后认证阶段不查库"""
+        conversation = ChatConversationFactory()
+        sender = conversation.participant1
+        token = TokenService.issue(sender, 'wechat')
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        url = f'/api/community/conversations/{conversation.id}/send/'
+        response = api_client.post(url, {'content': '你好'}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response['X-Auth-Queries'] == '1'
+
+        response = api_client.post(url, {'content': '在吗'}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response['X-Auth-Queries'] == '0'
+
+        response = api_client.get(
+            f'/api/community/conversations/{conversation.id}/poll/',
+            {'since': '2000-01-01T00:00:00+00:00'},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Auth-Queries'] == '0'
+        assert len(response.data) == 2
+        assert ChatMessage.objects.filter(sender=sender).count() == 2
+
+    @pytest.mark.django_db
+    def test_chat_requires_authentication(self, api_client):
+        """测试未登录或 token 无效时聊天接口返回 401"""
+        conversation = ChatConversationFactory()
+
+        response = api_client.get('/api/community/conversations/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer sms_token_1_abc123')
+        response = api_client.post(
+            f'/api/community/conversations/{conversation.id}/send/', {'content': '你好'}, format='json'
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert not ChatMessage.objects.exists()
+
+    @pytest.mark.django_db
+    def test_conversation_list_uses_request_user(self, api_client):
+        """测试会话列表按当前用户返回对方信息"""
+        conversation = ChatConversationFactory(unread_count_p2=3)
+        user = conversation.participant2
+        UserFactory()
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(user, "sms")}')
+
+        AuthQueryMetrics.reset()
+        response = api_client.get('/api/community/conversations/')
+        assert response.status_code == status.HTTP_200_OK
+        item = response.data['results'][0]
+        assert item['unread_count'] == 3
+        assert item['other_user']['id'] == conversation.participant1_id
+        assert AuthQueryMetrics.snapshot()['requests'] == 1
+
+
+class TestChatPush:
+    """聊天消息实时推送测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_cache(self):
+        cache.clear()
+        AuthUserCache.clear_local()
+
+    def send(self, user, conversation, content):
+        """通过发送接口发消息，并执行事务提交回调（推送）"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(user, "sms")}')
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f'/api/community/conversations/{conversation.id}/send/', {'content': content}, format='json'
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.data
+
+    @pytest.mark.django_db
+    def test_websocket_receives_sent_message(self):
+        """测试接收者的 WebSocket 连接收到新消息推送"""
+        from smart_community.asgi import application
+
+        conversation = ChatConversationFactory()
+        sender, receiver = conversation.participant1, conversation.participant2
+        token = TokenService.issue(receiver, 'wechat')
+
+        async def scenario():
+            communicator = WebsocketCommunicator(application, f'/ws/chat/?token={token}')
+            connected, _ = await communicator.connect()
+            assert connected
+            sent = await sync_to_async(self.send)(sender, conversation, '你好')
+            pushed = await communicator.receive_json_from(timeout=2)
+            await communicator.send_json_to({'type': 'ping'})
+            pong = await communicator.receive_json_from(timeout=2)
+            await communicator.disconnect()
+            return sent, pushed, pong
+
+        sent, pushed, pong = async_to_sync(scenario)()
+        assert pushed['type'] == 'message'
+        assert pushed['conversation_id'] == conversation.id
+        assert pushed['message']['id'] == sent['id']
+        assert pushed['message']['content'] == '你好'
+        assert pong == {'type': 'pong'}
+
+    @pytest.mark.django_db
+    def test_websocket_rejects_invalid_token(self):
+        """测试 token 无效时拒绝 WebSocket 连接"""
+        from smart_community.asgi import application
+
+        async def scenario():
+            communicator = WebsocketCommunicator(application, '/ws/chat/?token=invalid')
+            connected, code = await communicator.connect()
+            return connected, code
+
+        connected, code = async_to_sync(scenario)()
+        assert connected is False
+        assert code == 4401
+
+    @pytest.mark.django_db
+    def test_long_poll_wakes_on_new_message(self):
+        """测试长轮询挂起等待，新消息到达后立即返回"""
+        conversation = ChatConversationFactory()
+        sender, receiver = conversation.participant1, conversation.participant2
+        token = TokenService.issue(receiver, 'sms')
+        url = f'/api/community/conversations/{conversation.id}/poll/wait/'
+
+        async def scenario():
+            poll = asyncio.ensure_future(AsyncClient().get(
+                url, {'since': '2000-01-01T00:00:00+00:00', 'wait': 10},
+                headers={'Authorization': f'Bearer {token}'},
+            ))
+            await asyncio.sleep(0.3)
+            assert not poll.done()
+            started = time.monotonic()
+            await sync_to_async(self.send)(sender, conversation, '在吗')
+            response = await poll
+            return response, time.monotonic() - started
+
+        response, elapsed = async_to_sync(scenario)()
+        assert response.status_code == status.HTTP_200_OK
+        assert [m['content'] for m in response.json()] == ['在吗']
+        assert elapsed < 5
+
+        conversation.refresh_from_db()
+        assert conversation.unread_count_p2 == 0
+
+    @pytest.mark.django_db
+    def test_long_poll_timeout_and_permissions(self, client):
+        """测试长轮询超时返回空列表，非会话成员和未登录被拒绝"""
+        conversation = ChatConversationFactory()
+        url = f'/api/community/conversations/{conversation.id}/poll/wait/'
+        params = {'since': '2000-01-01T00:00:00+00:00', 'wait': 0.2}
+
+        token = TokenService.issue(conversation.participant1, 'sms')
+        response = client.get(url, params, HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+        token = TokenService.issue(UserFactory(), 'sms')
+        response = client.get(url, params, HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = client.get(url, {'since': 'bad'}, HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestConversationMessages:
+    """会话消息游标翻页测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_cache(self):
+        cache.clear()
+        AuthUserCache.clear_local()
+
+    def create_messages(self, conversation, count):
+        return [
+            ChatMessage.objects.create(
+                conversation=conversation, sender=conversation.participant1,
+                receiver=conversation.participant2, content=f'消息{i}',
+            )
+            for i in range(count)
+        ]
+
+    @pytest.mark.django_db
+    def test_seek_before_and_after(self, api_client):
+        """测试按消息ID向前、向后翻页"""
+        conversation = ChatConversationFactory()
+        messages = self.create_messages(conversation, 7)
+        self.create_messages(ChatConversationFactory(participant1=conversation.participant1), 3)
+        url = f'/api/community/conversations/{conversation.id}/messages/'
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(conversation.participant2, "sms")}')
+
+        response = api_client.get(url, {'limit': 3})
+        assert response.status_code == status.HTTP_200_OK
+        assert [m['id'] for m in response.data['results']] == [m.id for m in messages[4:]]
+        assert response.data['has_more'] is True
+
+        response = api_client.get(url, {'before': messages[4].id, 'limit': 3})
+        assert [m['id'] for m in response.data['results']] == [m.id for m in messages[1:4]]
+        assert response.data['has_more'] is True
+
+        response = api_client.get(url, {'before': messages[1].id, 'limit': 3})
+        assert [m['id'] for m in response.data['results']] == [messages[0].id]
+        assert response.data['has_more'] is False
+
+        response = api_client.get(url, {'after': messages[2].id, 'limit': 4})
+        assert [m['id'] for m in response.data['results']] == [m.id for m in messages[3:]]
+        assert response.data['has_more'] is False
+
+        # 页码分页保持兼容
+        response = api_client.get(url)
+        assert response.data['count'] == 7
+
+    @pytest.mark.django_db
+    def test_seek_rejects_foreign_anchor(self, api_client):
+        """测试游标消息不属于该会话时返回 404"""
+        conversation = ChatConversationFactory()
+        other = self.create_messages(ChatConversationFactory(), 1)[0]
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(conversation.participant1, "sms")}')
+
+        url = f'/api/community/conversations/{conversation.id}/messages/'
+        assert api_client.get(url, {'before': other.id}).status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get(url, {'before': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_backfill_links_existing_messages(self):
+        """测试数据迁移按会话双方和关联商品回填消息所属会话"""
+        import importlib
+        from django.apps import apps
+        migration = importlib.import_module('community.migrations.0006_chatmessage_conversation')
+
+        conversation = ChatConversationFactory()
+        p1, p2 = conversation.participant1, conversation.participant2
+        linked = [
+            ChatMessage.objects.create(sender=p1, receiver=p2, content='a'),
+            ChatMessage.objects.create(sender=p2, receiver=p1, content='b'),
+        ]
+        unrelated = ChatMessage.objects.create(sender=p1, receiver=UserFactory(), content='c')
+
+        migration.backfill_message_conversation(apps, None)
+
+        assert {m.id for m in conversation.messages.all()} == {m.id for m in linked}
+        unrelated.refresh_from_db()
+        assert unrelated.conversation_id is None
+
+
+class TestChatUnread:
+    """聊天未读计数测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_cache(self):
+        cache.clear()
+        AuthUserCache.clear_local()
+
+    def send(self, client, conversation, content='你好'):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f'/api/community/conversations/{conversation.id}/send/', {'content': content}, format='json'
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response
+
+    @pytest.mark.django_db
+    def test_stale_conversation_does_not_lose_increments(self):
+        """测试基于旧的会话对象记录消息时未读数不会被覆盖"""
+        conversation = ChatConversationFactory()
+        stale = ChatConversation.objects.get(pk=conversation.pk)
+        for _ in range(3):
+            message = ChatMessage.objects.create(
+                conversation=conversation, sender=conversation.participant1,
+                receiver=conversation.participant2, content='hi',
+            )
+            ChatUnreadService.record_message(stale, message)
+
+        conversation.refresh_from_db()
+        assert conversation.unread_count_p2 == 3
+        assert conversation.unread_count_p1 == 0
+        assert conversation.last_message_id == message.id
+
+    @pytest.mark.django_db
+    def test_mark_read_skips_write_when_nothing_unread(self, django_assert_num_queries):
+        """测试没有未读消息时标记已读不写库"""
+        conversation = ChatConversationFactory(unread_count_p1=2)
+        with django_assert_num_queries(1):
+            assert ChatUnreadService.mark_read(conversation, conversation.participant1_id) is True
+        with django_assert_num_queries(1):
+            assert ChatUnreadService.mark_read(conversation, conversation.participant1_id) is False
+
+        conversation.refresh_from_db()
+        assert conversation.unread_count_p1 == 0
+
+    @pytest.mark.django_db
+    def test_total_unread_count(self, api_client, django_assert_num_queries):
+        """测试未读总数：缓存命中不查库，新消息加一，已读后重算"""
+        receiver = UserFactory()
+        first = ChatConversationFactory(participant2=receiver, unread_count_p2=2)
+        ChatConversationFactory(participant1=receiver, unread_count_p1=3)
+        ChatConversationFactory(unread_count_p1=5)
+
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(receiver, "sms")}')
+        url = '/api/community/conversations/unread-count/'
+        assert api_client.get(url).data == {'total_unread': 5}
+        with django_assert_num_queries(0):
+            assert ChatUnreadService.get_total(receiver.id) == 5
+
+        sender = APIClient()
+        sender.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenService.issue(first.participant1, "sms")}')
+        self.send(sender, first)
+        with django_assert_num_queries(0):
+            assert ChatUnreadService.get_total(receiver.id) == 6
+
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            response = api_client.get(f'/api/community/conversations/{first.id}/messages/')
+        assert response.status_code == status.HTTP_200_OK
+        assert api_client.get(url).data == {'total_unread': 3}
@@ -9,7 +9,7 @@ from .views import (
 
     # 私聊相关
     ConversationListView, ConversationMessagesView,
-    send_message, start_conversation, poll_messages,
+    send_message, start_conversation, poll_messages, wait_messages, unread_message_count,
 
     # 社区活动相关
     ActivityListCreateView, ActivityDetailView, register_activity,
@@ -59,6 +59,9 @@ urlpatterns = [
     # 会话列表
     path('conversations/', ConversationListView.as_view(), name='conversations'),
     
+    # 未读消息总数
+    path('conversations/unread-count/', unread_message_count, name='unread_message_count'),
+    
     # 开始新会话
     path('conversations/start/', start_conversation, name='start_conversation'),
     
@@ -70,6 +73,9 @@ urlpatterns = [
     
     # 轮询新消息
     path('conversations/<int:conversation_id>/poll/', poll_messages, name='poll_messages'),
+
+    # 长轮询新消息（WebSocket 不可用时使用）
+    path('conversations/<int:conversation_id>/poll/wait/', wait_messages, name='wait_messages'),
     
     # =============================================================================
     # 社区活动相关路由
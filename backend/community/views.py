@@ -1,4 +1,8 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Q, F
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -7,7 +11,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, AuthenticationFailed
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
@@ -16,6 +20,9 @@ from .models import (
     HelpResponse, ChatMessage, ChatConversation,
     Activity, ActivityRegistration
 )
+from users.authentication import CustomTokenAuthentication
+from .chat_push_service import ChatPushService
+from .chat_unread_service import ChatUnreadService
 from .serializers import (
     MarketItemListSerializer, MarketItemDetailSerializer,
     NeighborHelpPostListSerializer, NeighborHelpPostDetailSerializer,
@@ -313,14 +320,11 @@ class HelpPostDetailView(generics.RetrieveUpdateDestroyAPIView):
     description="对指定求助帖进行回复"
 )
 @api_view(['POST'])
-@permission_classes([])
+@permission_classes([IsAuthenticated])
 def create_help_response(request, pk):
     """回复求助帖"""
 
-    # 获取当前用户
-    user = get_user_from_token(request)
-    if not user:
-        return Response({'error': '未授权访问'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = request.user
 
     help_post = get_object_or_404(NeighborHelpPost, pk=pk, is_active=True)
 
@@ -393,18 +397,11 @@ class ConversationListView(generics.ListAPIView):
     """聊天会话列表"""
 
     serializer_class = ChatConversationSerializer
-    permission_classes = []
+    permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        # 从 Authorization header 获取用户
-        user = get_user_from_token(self.request)
-        if not user:
-            return ChatConversation.objects.none()
-
-        # 保存用户到 context，供序列化器使用
-        self.request.cached_user = user
-
+        user = self.request.user
         return ChatConversation.objects.filter(
             Q(participant1_id=user.id) | Q(participant2_id=user.id)
         ).select_related(
@@ -420,20 +417,28 @@ class ConversationListView(generics.ListAPIView):
 
 
 class ConversationMessagesView(generics.ListAPIView):
-    """聊天消息列表"""
+    """
+    聊天消息列表
+
+    默认按页码分页；传入 before / after（消息ID）或 limit 时改为游标翻页：
+    before 返回该消息之前的 limit 条，after 返回之后的 limit 条，都不传返回最新的 limit 条，
+    结果按时间正序，附带 has_more。游标翻页走 (conversation, created_at, id) 索引，
+    耗时只与每页条数有关，与会话历史长度无关。
+    """
 
     serializer_class = ChatMessageSerializer
-    permission_classes = []  # 临时禁用
+    permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
 
+    SEEK_PARAMS = ('before', 'after', 'limit')
+    SEEK_DEFAULT_LIMIT = 30
+    SEEK_MAX_LIMIT = 100
+
     def get_queryset(self):
         conversation_id = self.kwargs['conversation_id']
         conversation = get_object_or_404(ChatConversation, pk=conversation_id)
 
-        # 获取当前用户ID
-        user_id = self.get_user_id_from_token()
-        if not user_id:
-            return ChatMessage.objects.none()
+        user_id = self.request.user.id
 
         # 检查权限
         if user_id not in [conversation.participant1_id, conversation.participant2_id]:
@@ -443,107 +448,82 @@ class ConversationMessagesView(generics.ListAPIView):
         self.mark_conversation_as_read(conversation, user_id)
 
         return ChatMessage.objects.filter(
-            Q(sender_id=conversation.participant1_id, receiver_id=conversation.participant2_id) |
-            Q(sender_id=conversation.participant2_id, receiver_id=conversation.participant1_id)
-        ).filter(
-            market_item=conversation.market_item
-        ).select_related('sender', 'receiver').order_by('created_at')
-
-    def get_user_id_from_token(self):
-        """从token获取用户ID"""
-        import re
-        auth_header = self.request.META.get('HTTP_AUTHORIZATION', '')
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-
-            # Token格式匹配
-            wechat_pattern = r'^wechat_token_(\d+)_xyz789$'
-            sms_pattern = r'^sms_token_(\d+)_abc123$'
-            merchant_pattern = r'^merchant_token_(\d+)_verified$'
-
-            user_id = None
-            wechat_match = re.match(wechat_pattern, token)
-            if wechat_match:
-                user_id = wechat_match.group(1)
-            else:
-                sms_match = re.match(sms_pattern, token)
-                if sms_match:
-                    user_id = sms_match.group(1)
-                else:
-                    merchant_match = re.match(merchant_pattern, token)
-                    if merchant_match:
-                        user_id = merchant_match.group(1)
-
-            if user_id:
-                return int(user_id)
-        return None
+            conversation=conversation
+        ).select_related('sender', 'receiver').order_by('created_at', 'id')
 
     def mark_conversation_as_read(self, conversation, user_id):
         """标记会话为已读"""
-        if user_id == conversation.participant1_id:
-            conversation.unread_count_p1 = 0
+        ChatUnreadService.mark_read(conversation, user_id)
+
+    def list(self, request, *args, **kwargs):
+        if not any(param in request.query_params for param in self.SEEK_PARAMS):
+            return super().list(request, *args, **kwargs)
+
+        try:
+            before = request.query_params.get('before')
+            after = request.query_params.get('after')
+            before = int(before) if before else None
+            after = int(after) if after else None
+            limit = int(request.query_params.get('limit', self.SEEK_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': '参数格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+        if before and after:
+            return Response({'error': 'before 和 after 不能同时使用'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.SEEK_MAX_LIMIT))
+
+        queryset = self.get_queryset()
+        anchor_id = before or after
+        if anchor_id:
+            anchor = queryset.filter(id=anchor_id).values('created_at', 'id').first()
+            if anchor is None:
+                return Response({'error': '消息不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        if after:
+            queryset = queryset.filter(
+                Q(created_at__gt=anchor['created_at']) |
+                Q(created_at=anchor['created_at'], id__gt=anchor['id'])
+            )
+            messages = list(queryset[:limit + 1])
+            has_more = len(messages) > limit
+            messages = messages[:limit]
         else:
-            conversation.unread_count_p2 = 0
-        conversation.save()
+            if before:
+                queryset = queryset.filter(
+                    Q(created_at__lt=anchor['created_at']) |
+                    Q(created_at=anchor['created_at'], id__lt=anchor['id'])
+                )
+            messages = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+            has_more = len(messages) > limit
+            messages = messages[:limit][::-1]
+
+        serializer = self.get_serializer(messages, many=True)
+        return Response({'results': serializer.data, 'has_more': has_more})
 
     @extend_schema(
         summary="获取会话消息列表",
-        description="获取指定会话的消息记录"
+        description="获取指定会话的消息记录，支持 before / after / limit 游标翻页",
+        parameters=[
+            OpenApiParameter('before', OpenApiTypes.INT, description='返回该消息ID之前的消息'),
+            OpenApiParameter('after', OpenApiTypes.INT, description='返回该消息ID之后的消息'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='游标翻页每页条数（默认30，最多100）'),
+        ]
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-# 辅助函数：从请求中获取用户
-def get_user_from_token(request):
-    """从token获取用户（临时方案）"""
-    import re
-    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-    if auth_header.startswith('Bearer '):
-        token = auth_header[7:]
-        User = get_user_model()
-
-        # Token格式匹配
-        wechat_pattern = r'^wechat_token_(\d+)_xyz789$'
-        sms_pattern = r'^sms_token_(\d+)_abc123$'
-        merchant_pattern = r'^merchant_token_(\d+)_verified$'
-
-        user_id = None
-        wechat_match = re.match(wechat_pattern, token)
-        if wechat_match:
-            user_id = wechat_match.group(1)
-        else:
-            sms_match = re.match(sms_pattern, token)
-            if sms_match:
-                user_id = sms_match.group(1)
-            else:
-                merchant_match = re.match(merchant_pattern, token)
-                if merchant_match:
-                    user_id = merchant_match.group(1)
-
-        if user_id:
-            try:
-                return User.objects.get(id=user_id, is_active=True)
-            except User.DoesNotExist:
-                pass
-    return None
-
-
 @extend_schema(
     summary="发送消息",
     description="在指定会话中发送消息"
 )
 @api_view(['POST'])
-@permission_classes([])
+@permission_classes([IsAuthenticated])
 def send_message(request, conversation_id):
     """发送消息"""
 
     conversation = get_object_or_404(ChatConversation, pk=conversation_id)
 
-    # 获取当前用户
-    user = get_user_from_token(request)
-    if not user:
-        return Response({'error': '未授权访问'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = request.user
 
     # 检查权限
     if user.id not in [conversation.participant1_id, conversation.participant2_id]:
@@ -561,19 +541,13 @@ def send_message(request, conversation_id):
     serializer = ChatMessageSerializer(data=data, context={'request': request, 'sender_user': user})
 
     if serializer.is_valid():
-        message = serializer.save()
+        with transaction.atomic():
+            message = serializer.save(conversation=conversation)
+            # 更新会话最后消息和接收者未读数
+            ChatUnreadService.record_message(conversation, message)
 
-        # 更新会话信息
-        conversation.last_message_id = message.id
-        conversation.last_message_time = message.created_at
-
-        # 更新未读计数
-        if receiver_id == conversation.participant1_id:
-            conversation.unread_count_p1 += 1
-        else:
-            conversation.unread_count_p2 += 1
-
-        conversation.save()
+        # 推送给接收者的 WebSocket / 长轮询连接
+        ChatPushService.publish_message(receiver_id, conversation.id, serializer.data)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -585,13 +559,11 @@ def send_message(request, conversation_id):
     description="开始与指定用户的新聊天会话"
 )
 @api_view(['POST'])
-@permission_classes([])
+@permission_classes([IsAuthenticated])
 def start_conversation(request):
     """开始新会话"""
 
-    user = get_user_from_token(request)
-    if not user:
-        return Response({'error': '未授权访问'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = request.user
 
     User = get_user_model()
 
@@ -630,21 +602,51 @@ def start_conversation(request):
     return Response(serializer.data)
 
 
+def parse_since(since):
+    """解析轮询参数 since（ISO 格式时间），格式错误抛出 ValueError"""
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(since.replace('Z', '+00:00'))
+    except (AttributeError, TypeError):
+        raise ValueError(since)
+
+
+def get_new_messages(conversation, user, since_time):
+    """返回会话中 since_time 之后的消息，有新消息时把会话标记为已读"""
+    messages = list(ChatMessage.objects.filter(
+        conversation=conversation,
+        created_at__gt=since_time
+    ).select_related('sender', 'receiver').order_by('created_at', 'id'))
+
+    # 标记为已读
+    if messages:
+        ChatUnreadService.mark_read(conversation, user.id)
+
+    return messages
+
+
+@extend_schema(
+    summary="获取未读消息总数",
+    description="获取当前用户所有会话的未读消息总数（用于消息角标）"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_message_count(request):
+    """获取未读消息总数"""
+    return Response({'total_unread': ChatUnreadService.get_total(request.user.id)})
+
+
 @extend_schema(
     summary="轮询新消息",
-    description="轮询指定会话的新消息"
+    description="轮询指定会话的新消息，立即返回；需要等待新消息时使用 poll/wait/ 长轮询接口"
 )
 @api_view(['GET'])
-@permission_classes([])
+@permission_classes([IsAuthenticated])
 def poll_messages(request, conversation_id):
     """轮询新消息"""
 
     conversation = get_object_or_404(ChatConversation, pk=conversation_id)
-
-    # 获取当前用户
-    user = get_user_from_token(request)
-    if not user:
-        return Response({'error': '未授权访问'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = request.user
 
     # 检查权限
     if user.id not in [conversation.participant1_id, conversation.participant2_id]:
@@ -653,34 +655,70 @@ def poll_messages(request, conversation_id):
 
     # 获取指定时间之后的消息
     since = request.query_params.get('since')
+    messages = []
     if since:
         try:
-            from datetime import datetime
-            since_time = datetime.fromisoformat(since.replace('Z', '+00:00'))
-            messages = ChatMessage.objects.filter(
-                Q(sender_id=conversation.participant1_id, receiver_id=conversation.participant2_id) |
-                Q(sender_id=conversation.participant2_id, receiver_id=conversation.participant1_id),
-                market_item=conversation.market_item,
-                created_at__gt=since_time
-            ).select_related('sender', 'receiver').order_by('created_at')
-        except (ValueError, TypeError):
+            messages = get_new_messages(conversation, user, parse_since(since))
+        except ValueError:
             return Response({'error': '时间格式错误'},
                            status=status.HTTP_400_BAD_REQUEST)
-    else:
-        messages = ChatMessage.objects.none()
-
-    # 标记为已读
-    if messages.exists():
-        if user.id == conversation.participant1_id:
-            conversation.unread_count_p1 = 0
-        else:
-            conversation.unread_count_p2 = 0
-        conversation.save()
 
     serializer = ChatMessageSerializer(messages, many=True, context={'request': request})
     return Response(serializer.data)
 
 
+async def wait_messages(request, conversation_id):
+    """
+    长轮询新消息（WebSocket 不可用时的降级方案）
+
+    GET 参数 since（必填）和 wait（等待秒数，默认且最多 CHAT_LONG_POLL_MAX_WAIT）。
+    没有新消息时请求挂起在 channel layer 上，收到推送或超时后才再次查询，
+    等待期间不占用线程和数据库连接；超时返回空列表，客户端随即发起下一次请求。
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': '不支持的请求方法'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        user = await sync_to_async(authenticate_chat_request)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return JsonResponse({'error': '未授权访问'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        since_time = parse_since(request.GET.get('since'))
+        wait = min(float(request.GET.get('wait', settings.CHAT_LONG_POLL_MAX_WAIT)),
+                   settings.CHAT_LONG_POLL_MAX_WAIT)
+    except ValueError:
+        return JsonResponse({'error': '参数格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+
+    conversation = await ChatConversation.objects.filter(pk=conversation_id).afirst()
+    if conversation is None:
+        return JsonResponse({'error': '会话不存在'}, status=status.HTTP_404_NOT_FOUND)
+    if user.id not in [conversation.participant1_id, conversation.participant2_id]:
+        return JsonResponse({'error': '无权限访问此会话'}, status=status.HTTP_403_FORBIDDEN)
+
+    fetch = sync_to_async(serialize_new_messages)
+    # 先订阅再查询，查询之后到达的消息也会唤醒等待
+    async with ChatPushService.subscribe(user.id) as channel:
+        data = await fetch(conversation, user, since_time, request)
+        if not data and wait > 0 and await ChatPushService.wait_for_message(channel, conversation.id, wait):
+            data = await fetch(conversation, user, since_time, request)
+
+    return JsonResponse(data, safe=False)
+
+
+def authenticate_chat_request(request):
+    """按 DRF 默认认证方式认证普通 Django 请求，未携带 token 时返回 None"""
+    result = CustomTokenAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def serialize_new_messages(conversation, user, since_time, request):
+    messages = get_new_messages(conversation, user, since_time)
+    return ChatMessageSerializer(messages, many=True, context={'request': request}).data
+
+
 # =============================================================================
 # 社区活动相关视图
 # =============================================================================
@@ -106,6 +106,18 @@ def media_storage(settings, tmp_path):
     return settings.MEDIA_ROOT
 
 
+@pytest.fixture(autouse=True)
+def channel_layers(settings):
+    """
+    自动为所有测试使用内存 channel layer
+    避免测试依赖 Redis
+    """
+    settings.CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+    }
+    return settings.CHANNEL_LAYERS
+
+
 @pytest.fixture
 def mock_sms_service(monkeypatch):
     """
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MerchantConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "merchant"
+
+    def ready(self):
+        # 注册优惠券、商户列表、商品目录缓存失效信号
+        from . import signals  # noqa: F401
@@ -0,0 +1,348 @@
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+import itertools
+import json
+import logging
+import threading
+import uuid
+
+from common.redis_stream import StreamConsumer, get_redis_client
+from .models import MerchantCoupon, UserCoupon
+
+logger = logging.getLogger(__name__)
+
+# 领取：已发数量和用户已领数量都未达上限时原子地加一并写入待入库队列
+# 返回 1 成功，0 已领完，-1 用户达到领取上限，-2 计数未初始化
+_CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+if tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0') >= tonumber(ARGV[3]) then
+    return -1
+end
+if tonumber(redis.call('GET', KEYS[1])) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+redis.call('EXPIRE', KEYS[2], redis.call('TTL', KEYS[1]))
+redis.call('XADD', KEYS[3], '*', 'e', ARGV[4])
+return 1
+"""
+
+# 初始化计数：已初始化时不覆盖（多个进程同时初始化只有第一个生效）
+_INIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+if #ARGV > 2 then
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+class RedisClaimStore:
+    """领取计数和待入库队列保存在 Redis 中，多进程共享"""
+
+    ISSUED_KEY = 'merchant:coupon:{coupon_id}:issued'
+    CLAIMS_KEY = 'merchant:coupon:{coupon_id}:claims'
+    STREAM = 'merchant:coupon_claim:stream'
+    GROUP = 'coupon_claim_flusher'
+    FIELD = 'e'
+    CLAIM_IDLE_MS = 60000  # 超过该时间未确认的消息视为消费者已退出
+
+    def __init__(self, client):
+        self.client = client
+        self.stream = StreamConsumer(client, self.STREAM, self.GROUP, self.FIELD, self.CLAIM_IDLE_MS)
+
+    def keys(self, coupon_id):
+        return [
+            self.ISSUED_KEY.format(coupon_id=coupon_id),
+            self.CLAIMS_KEY.format(coupon_id=coupon_id),
+        ]
+
+    def claim(self, coupon_id, user_id, total_count, per_user_limit, payload):
+        result = self.client.register_script(_CLAIM_SCRIPT)(
+            keys=self.keys(coupon_id) + [self.STREAM],
+            args=[user_id, total_count, per_user_limit, payload],
+        )
+        return int(result)
+
+    def init(self, coupon_id, issued, user_counts, ttl):
+        args = [issued, ttl]
+        for user_id, count in user_counts.items():
+            args.extend([user_id, count])
+        self.client.register_script(_INIT_SCRIPT)(keys=self.keys(coupon_id), args=args)
+
+    def reset(self, coupon_id):
+        self.client.delete(*self.keys(coupon_id))
+
+    def read(self, consumer, count, block_ms):
+        """读取一批待入库领取记录，返回 [(消息ID, payload)]"""
+        return self.stream.read(consumer, count, block_ms)
+
+    def ack(self, ids):
+        self.stream.ack(ids)
+
+    def backlog(self):
+        return self.stream.length()
+
+    def queued(self):
+        return (payload for _, payload in self.stream.scan())
+
+
+class LocalClaimStore:
+    """
+    进程内领取计数（没有 Redis 时使用，仅用于开发和测试）
+
+    与 RedisClaimStore 语义相同，用一把锁代替 Lua 脚本的原子性；
+    数据只在当前进程内有效，多进程部署必须使用 Redis。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._issued = {}
+            self._claims = {}
+            self._queue = OrderedDict()
+
+    def claim(self, coupon_id, user_id, total_count, per_user_limit, payload):
+        with self._lock:
+            if coupon_id not in self._issued:
+                return -2
+            claims = self._claims[coupon_id]
+            if claims[user_id] >= per_user_limit:
+                return -1
+            if self._issued[coupon_id] >= total_count:
+                return 0
+            self._issued[coupon_id] += 1
+            claims[user_id] += 1
+            self._queue[next(self._ids)] = payload
+            return 1
+
+    def init(self, coupon_id, issued, user_counts, ttl):
+        with self._lock:
+            if coupon_id not in self._issued:
+                self._issued[coupon_id] = issued
+                self._claims[coupon_id] = Counter({int(k): v for k, v in user_counts.items()})
+
+    def reset(self, coupon_id):
+        with self._lock:
+            self._issued.pop(coupon_id, None)
+            self._claims.pop(coupon_id, None)
+
+    def read(self, consumer, count, block_ms):
+        with self._lock:
+            return list(itertools.islice(self._queue.items(), count))
+
+    def ack(self, ids):
+        with self._lock:
+            for message_id in ids:
+                self._queue.pop(message_id, None)
+
+    def backlog(self):
+        return len(self._queue)
+
+    def queued(self):
+        with self._lock:
+            return list(self._queue.values())
+
+
+class CouponClaimService:
+    """
+    优惠券抢领
+
+    已发数量和每个用户的已领数量保存在 Redis 中，由 Lua 脚本原子地检查上限并加一，
+    领取请求不访问数据库、不锁优惠券行，发放数量和每人限领数量都是精确的。
+    领取成功的记录同时写入 Redis Stream，由 flush_coupon_claims 进程批量写入 UserCoupon
+    并累加 used_count（已发放数量，核销时不再累加）；核销码在领取时生成，重复投递按核销码去重。
+    计数在优惠券首次被领取时从数据库和待入库队列初始化，保留到优惠券结束后 COUNTER_GRACE。
+    """
+
+    META_CACHE_KEY = 'merchant:coupon:meta:{coupon_id}'
+    META_CACHE_TTL = 60
+    COUNTER_GRACE = timedelta(days=7)
+
+    CLAIMED = 'claimed'
+    NOT_FOUND = 'not_found'
+    INVALID = 'invalid'
+    SOLD_OUT = 'sold_out'
+    LIMIT_REACHED = 'limit_reached'
+
+    _local_store = LocalClaimStore()
+
+    @classmethod
+    def get_client(cls):
+        return get_redis_client()
+
+    @classmethod
+    def get_store(cls):
+        client = cls.get_client()
+        return RedisClaimStore(client) if client is not None else cls._local_store
+
+    # ---------- 领取 ----------
+
+    @classmethod
+    def get_meta(cls, coupon_id):
+        """优惠券基本信息（缓存），不存在时返回 None"""
+        key = cls.META_CACHE_KEY.format(coupon_id=coupon_id)
+        meta = cache.get(key)
+        if meta is None:
+            coupon = MerchantCoupon.objects.filter(id=coupon_id).values(
+                'id', 'name', 'status', 'start_date', 'end_date', 'total_count', 'per_user_limit'
+            ).first()
+            meta = coupon or {}
+            cache.set(key, meta, cls.META_CACHE_TTL)
+        return meta or None
+
+    @classmethod
+    def invalidate_meta(cls, coupon_id):
+        cache.delete(cls.META_CACHE_KEY.format(coupon_id=coupon_id))
+
+    @classmethod
+    def is_active(cls, meta, now=None):
+        now = now or timezone.now()
+        return meta['status'] == 'active' and meta['start_date'] <= now <= meta['end_date']
+
+    @classmethod
+    def claim(cls, user_id, coupon_id):
+        """
+        领取优惠券，返回 (结果, 数据)
+
+        成功时数据为领取记录（核销码、领取时间等），失败时为优惠券信息（可能为 None）。
+        """
+        meta = cls.get_meta(coupon_id)
+        if meta is None:
+            return cls.NOT_FOUND, None
+        now = timezone.now()
+        if not cls.is_active(meta, now):
+            return cls.INVALID, meta
+
+        record = {
+            'coupon_id': coupon_id,
+            'user_id': user_id,
+            'verification_code': uuid.uuid4().hex[:12].upper(),
+            'received_at': now.isoformat(),
+        }
+        payload = json.dumps(record, separators=(',', ':'))
+
+        store = cls.get_store()
+        args = (coupon_id, user_id, meta['total_count'], meta['per_user_limit'], payload)
+        result = store.claim(*args)
+        if result == -2:
+            cls.init_counters(store, coupon_id, meta)
+            result = store.claim(*args)
+
+        if result == 1:
+            return cls.CLAIMED, record
+        if result == -1:
+            return cls.LIMIT_REACHED, meta
+        return cls.SOLD_OUT, meta
+
+    @classmethod
+    def init_counters(cls, store, coupon_id, meta):
+        """
+        用已入库和仍在队列中待入库的领取记录初始化计数
+
+        先读队列再读数据库：期间被写入数据库的记录两边都能读到，按核销码去重；
+        计数初始化前该优惠券的领取都返回未初始化，不会有新记录进入队列。
+        """
+        queued = {}
+        for payload in store.queued():
+            try:
+                record = json.loads(payload)
+                if record['coupon_id'] == coupon_id:
+                    queued[record['verification_code']] = record['user_id']
+            except (TypeError, ValueError, KeyError):
+                continue  # 无法解析的记录入库时丢弃
+
+        user_counts = Counter(dict(
+            UserCoupon.objects.filter(coupon_id=coupon_id)
+            .values_list('user_id').annotate(count=Count('id')).order_by()
+        ))
+        stored = set(UserCoupon.objects.filter(
+            verification_code__in=list(queued)
+        ).values_list('verification_code', flat=True))
+        user_counts.update(user_id for code, user_id in queued.items() if code not in stored)
+
+        ttl = int((meta['end_date'] + cls.COUNTER_GRACE - timezone.now()).total_seconds())
+        store.init(coupon_id, sum(user_counts.values()), user_counts, max(ttl, 60))
+
+    # ---------- 入库 ----------
+
+    @classmethod
+    def flush(cls, consumer='default', count=1000, block_ms=0):
+        """
+        把一批领取记录写入 UserCoupon，返回 {'created', 'duplicates', 'invalid'}
+
+        写库成功后才确认消息；中途退出时消息会被重新投递，已入库的记录按核销码跳过。
+        """
+        store = cls.get_store()
+        entries = store.read(consumer, count, block_ms)
+        if not entries:
+            return {'created': 0, 'duplicates': 0, 'invalid': 0}
+
+        records, invalid = [], 0
+        for _, payload in entries:
+            try:
+                record = json.loads(payload)
+                record['received_at'] = datetime.fromisoformat(record['received_at'])
+                records.append(record)
+            except (TypeError, ValueError, KeyError) as e:
+                invalid += 1
+                logger.error(f"丢弃无法解析的领券记录: {payload!r}, {e}")
+
+        with transaction.atomic():
+            existing = set(UserCoupon.objects.filter(
+                verification_code__in=[record['verification_code'] for record in records]
+            ).values_list('verification_code', flat=True))
+            new_records = []
+            for record in records:
+                if record['verification_code'] not in existing:
+                    existing.add(record['verification_code'])
+                    new_records.append(record)
+
+            UserCoupon.objects.bulk_create([
+                UserCoupon(
+                    coupon_id=record['coupon_id'],
+                    user_id=record['user_id'],
+                    verification_code=record['verification_code'],
+                )
+                for record in new_records
+            ], batch_size=1000)
+            # received_at 为 auto_now_add，写入后用一条 UPDATE 改回实际领取时间
+            if new_records:
+                UserCoupon.objects.filter(
+                    verification_code__in=[record['verification_code'] for record in new_records]
+                ).update(received_at=Case(*[
+                    When(verification_code=record['verification_code'], then=Value(record['received_at']))
+                    for record in new_records
+                ]))
+
+            for coupon_id, claimed in Counter(record['coupon_id'] for record in new_records).items():
+                MerchantCoupon.objects.filter(id=coupon_id).update(used_count=F('used_count') + claimed)
+
+        store.ack([message_id for message_id, _ in entries])
+        return {'created': len(new_records), 'duplicates': len(records) - len(new_records), 'invalid': invalid}
+
+    @classmethod
+    def backlog(cls):
+        """待入库的领取记录数"""
+        try:
+            return cls.get_store().backlog()
+        except Exception:
+            return 0
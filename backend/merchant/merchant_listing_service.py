@@ -0,0 +1,64 @@
+from django.core.cache import cache
+import hashlib
+
+from common.cache_version import bump_version, get_version
+from .models import MerchantProfile
+from .serializers import MerchantProfileSerializer
+
+
+class MerchantListingService:
+    """
+    公开商户列表（小程序“街角好店”）
+
+    按分类分页查询启用的商户，每页序列化结果缓存到 Redis。
+    商户档案变更时通过版本号使全部分页失效；订单统计由 UPDATE 累加不触发失效，
+    最多滞后 CACHE_TTL 秒。
+    """
+
+    CACHE_TTL = 60
+    CACHE_VERSION_KEY = 'merchant:list:version'
+    CACHE_KEY = 'merchant:list:{version}:{digest}'
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    @classmethod
+    def invalidate(cls):
+        """商户档案新增、修改、删除后调用，使已缓存的分页失效"""
+        bump_version(cls.CACHE_VERSION_KEY)
+
+    @classmethod
+    def get_cache_key(cls, base_url, category, page, page_size):
+        version = get_version(cls.CACHE_VERSION_KEY)
+        # Logo 地址包含请求域名，不同域名的分页分别缓存
+        digest = hashlib.md5(f'{base_url}|{category}|{page}|{page_size}'.encode('utf-8')).hexdigest()
+        return cls.CACHE_KEY.format(version=version, digest=digest)
+
+    @classmethod
+    def get_page(cls, request, category='', page=1, page_size=DEFAULT_PAGE_SIZE):
+        """返回一页商户及分页信息，优先读缓存"""
+        base_url = f"{request.scheme}://{request.get_host()}"
+        cache_key = cls.get_cache_key(base_url, category, page, page_size)
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = cls.build_page(request, category, page, page_size)
+            cache.set(cache_key, cached, cls.CACHE_TTL)
+        return cached
+
+    @classmethod
+    def build_page(cls, request, category, page, page_size):
+        queryset = MerchantProfile.objects.filter(is_active=True)
+        if category:
+            queryset = queryset.filter(shop_category=category)
+
+        total = queryset.count()
+        start = (page - 1) * page_size
+        merchants = queryset.select_related('user').order_by('-created_at', '-id')[start:start + page_size]
+        serializer = MerchantProfileSerializer(merchants, many=True, context={'request': request})
+        return {
+            'items': list(serializer.data),
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size,
+        }
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_merchant_stats(apps, schema_editor):
+    """按已完成订单回填商户的订单数和收入"""
+    MerchantProfile = apps.get_model('merchant', 'MerchantProfile')
+    MerchantOrder = apps.get_model('merchant', 'MerchantOrder')
+
+    MerchantProfile.objects.update(total_orders=0, total_revenue=0)
+    stats = MerchantOrder.objects.filter(status='completed').values('merchant_id').annotate(
+        orders=Count('id'), revenue=Sum('actual_amount')
+    ).order_by()
+    for row in stats.iterator():
+        MerchantProfile.objects.filter(id=row['merchant_id']).update(
+            total_orders=row['orders'], total_revenue=row['revenue'] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0005_cartitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='merchantprofile',
+            index=models.Index(fields=['is_active', 'created_at'], name='merchant_profile_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='merchantprofile',
+            index=models.Index(fields=['is_active', 'shop_category', 'created_at'], name='merchant_profile_cat_idx'),
+        ),
+        migrations.RunPython(backfill_merchant_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_daily_sales(apps, schema_editor):
+    """根据已完成订单初始化商户日销售汇总表（没有完成时间的订单按下单时间归入当天）"""
+    from decimal import Decimal
+    from django.db.models import Count, Max, Sum
+    from django.db.models.functions import Coalesce, TruncDate
+
+    MerchantOrder = apps.get_model('merchant', 'MerchantOrder')
+    MerchantOrderItem = apps.get_model('merchant', 'MerchantOrderItem')
+    MerchantDailySales = apps.get_model('merchant', 'MerchantDailySales')
+
+    rollups = {}
+    order_rows = MerchantOrder.objects.filter(status='completed').annotate(
+        day=TruncDate(Coalesce('completed_at', 'created_at'))
+    ).values('merchant_id', 'day').annotate(
+        order_count=Count('id'), revenue=Sum('actual_amount')
+    ).order_by()
+    for row in order_rows:
+        rollups[(row['merchant_id'], row['day'])] = MerchantDailySales(
+            merchant_id=row['merchant_id'], day=row['day'],
+            order_count=row['order_count'], revenue=row['revenue'] or 0,
+            items_sold=0, product_sales={},
+        )
+
+    item_rows = MerchantOrderItem.objects.filter(order__status='completed').annotate(
+        day=TruncDate(Coalesce('order__completed_at', 'order__created_at'))
+    ).values('order__merchant_id', 'day', 'product_id').annotate(
+        quantity=Sum('quantity'), revenue=Sum('subtotal'), name=Max('product_name')
+    ).order_by()
+    for row in item_rows:
+        rollup = rollups[(row['order__merchant_id'], row['day'])]
+        rollup.items_sold += row['quantity']
+        rollup.product_sales[str(row['product_id'])] = {
+            'name': row['name'], 'quantity': row['quantity'], 'revenue': str(row['revenue'] or Decimal('0')),
+        }
+
+    MerchantDailySales.objects.bulk_create(rollups.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0006_merchantprofile_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerchantDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='完成订单数')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='营业额')),
+                ('items_sold', models.PositiveIntegerField(default=0, verbose_name='售出件数')),
+                ('product_sales', models.JSONField(blank=True, default=dict, verbose_name='商品销售明细')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('merchant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='merchant.merchantprofile', verbose_name='商户')),
+            ],
+            options={
+                'verbose_name': '商户日销售汇总',
+                'verbose_name_plural': '商户日销售汇总',
+                'db_table': 'merchant_daily_sales',
+                'ordering': ['-day'],
+                'unique_together': {('merchant', 'day')},
+            },
+        ),
+        migrations.RunPython(build_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0007_merchantdailysales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='merchantproduct',
+            index=models.Index(fields=['merchant', 'status', 'created_at'], name='merchant_product_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='merchantproduct',
+            index=models.Index(fields=['merchant', 'status', 'category', 'created_at'], name='merchant_product_catalog_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='merchantproduct',
+            name='merchant_me_merchan_9e7192_idx',
+        ),
+    ]
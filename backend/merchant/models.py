@@ -114,7 +114,7 @@ class MerchantProfile(models.Model):
     # 状态
     is_active = models.BooleanField(default=True, verbose_name="是否启用")
     
-    # 统计信息
+    # 统计信息（订单完成时由 MerchantOrder.complete_order 累加）
     total_orders = models.PositiveIntegerField(default=0, verbose_name="总订单数")
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="总收入")
     
@@ -126,6 +126,10 @@ class MerchantProfile(models.Model):
         verbose_name = "商户档案"
         verbose_name_plural = "商户档案"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'created_at'], name='merchant_profile_active_idx'),
+            models.Index(fields=['is_active', 'shop_category', 'created_at'], name='merchant_profile_cat_idx'),
+        ]
     
     def __str__(self):
         return f"{self.shop_name} ({self.user.username})"
@@ -178,7 +182,9 @@ class MerchantProduct(models.Model):
         verbose_name_plural = "商品/服务"
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['merchant', 'status']),
+            # 公开商品目录：按商户、上架状态（及分类）筛选后按创建时间游标分页
+            models.Index(fields=['merchant', 'status', 'created_at'], name='merchant_product_status_idx'),
+            models.Index(fields=['merchant', 'status', 'category', 'created_at'], name='merchant_product_catalog_idx'),
             models.Index(fields=['category']),
         ]
     
@@ -220,6 +226,7 @@ class MerchantCoupon(models.Model):
     
     # 数量和使用限制
     total_count = models.PositiveIntegerField(verbose_name="发行数量")
+    # 已发放（被领取）的数量，领取入库时累加，核销下单时不变；剩余数量和领取上限都以此计算
     used_count = models.PositiveIntegerField(default=0, verbose_name="已使用数量")
     per_user_limit = models.PositiveIntegerField(default=1, verbose_name="每用户限领数量")
     
@@ -381,12 +388,15 @@ class MerchantOrder(models.Model):
     def __str__(self):
         return f"{self.order_no} - {self.merchant.shop_name}"
     
+    @staticmethod
+    def allocate_order_no():
+        """从当日订单序列中取一个订单号；在事务内下单时应在开启事务前取号"""
+        from common.sequence_service import SequenceService
+        return SequenceService.daily_numbers('merchant_order', 'ORD', 8)[0]
+
     def save(self, *args, **kwargs):
-        import time
         if not self.order_no:
-            timestamp = str(int(time.time()))[-8:]
-            random_num = str(random.randint(100, 999))
-            self.order_no = f"ORD{timestamp}{random_num}"
+            self.order_no = self.allocate_order_no()
 
         if not self.pickup_code and self.status in ['accepted', 'preparing']:
             self.pickup_code = str(random.randint(100000, 999999))
@@ -400,12 +410,61 @@ class MerchantOrder(models.Model):
         self.accepted_at = timezone.now()
         self.save()
     
-    def complete_order(self):
-        """完成订单"""
+    def release_stock(self):
+        """取消订单后退回库存、扣回销量"""
+        from django.db.models import F, Sum
+        from django.db.models.functions import Greatest
+        quantities = self.items.values('product_id').annotate(quantity=Sum('quantity')).order_by()
+        for row in quantities:
+            MerchantProduct.objects.filter(id=row['product_id']).update(
+                stock=F('stock') + row['quantity'],
+                sales_count=Greatest(F('sales_count') - row['quantity'], 0),
+            )
+    
+    def cancel_order(self, from_statuses, reject_reason=None):
+        """
+        取消订单，同时退回库存、扣回销量
+
+        状态用条件 UPDATE 修改，只有仍处于 from_statuses 的订单会被取消，
+        同一订单并发取消时库存只退回一次；返回本次调用是否取消了订单。
+        """
+        from django.db import transaction
+        changes = {'status': 'cancelled'}
+        if reject_reason is not None:
+            changes['reject_reason'] = reject_reason
+        with transaction.atomic():
+            updated = MerchantOrder.objects.filter(pk=self.pk, status__in=from_statuses).update(**changes)
+            if updated:
+                for field, value in changes.items():
+                    setattr(self, field, value)
+                self.release_stock()
+        return bool(updated)
+
+    def complete_order(self, from_statuses=('accepted', 'preparing', 'ready')):
+        """
+        完成订单，同时累加商户的订单数、收入和日销售汇总
+
+        状态用条件 UPDATE 修改，只有仍处于 from_statuses 的订单会被完成：同一订单并发完成时只有一次生效，
+        已取消（库存已退回）的订单不会被完成，商户统计不会重复累加；返回本次调用是否完成了订单。
+        """
+        from django.db import transaction
+        from django.db.models import F
         from django.utils import timezone
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        self.save()
+        from .sales_stats_service import MerchantSalesService
+        completed_at = timezone.now()
+        with transaction.atomic():
+            updated = MerchantOrder.objects.filter(pk=self.pk, status__in=from_statuses).update(
+                status='completed', completed_at=completed_at
+            )
+            if updated:
+                self.status = 'completed'
+                self.completed_at = completed_at
+                MerchantProfile.objects.filter(pk=self.merchant_id).update(
+                    total_orders=F('total_orders') + 1,
+                    total_revenue=F('total_revenue') + self.actual_amount,
+                )
+                MerchantSalesService.record_completed(self)
+        return bool(updated)
 
 
 class MerchantOrderItem(models.Model):
@@ -463,4 +522,29 @@ class CartItem(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.display_name} - {self.product_name}"
\ No newline at end of file
+        return f"{self.user.display_name} - {self.product_name}"
+
+class MerchantDailySales(models.Model):
+    """商户日销售汇总：按 (商户, 完成日期) 维护订单数、营业额、销量和商品明细，供统计接口直接读取"""
+
+    merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE, related_name='daily_sales', verbose_name="商户")
+    day = models.DateField(verbose_name="日期")
+
+    order_count = models.PositiveIntegerField(default=0, verbose_name="完成订单数")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="营业额")
+    items_sold = models.PositiveIntegerField(default=0, verbose_name="售出件数")
+    # {商品ID: {"name": 商品名称, "quantity": 销量, "revenue": 销售额}}
+    product_sales = models.JSONField(default=dict, blank=True, verbose_name="商品销售明细")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        db_table = 'merchant_daily_sales'
+        verbose_name = "商户日销售汇总"
+        verbose_name_plural = "商户日销售汇总"
+        # 唯一索引同时用于按商户查询日期区间
+        unique_together = [['merchant', 'day']]
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.merchant_id} {self.day}: {self.order_count}单 {self.revenue}"
@@ -0,0 +1,154 @@
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import base64
+import hashlib
+import json
+
+from common.cache_version import bump_version, get_version
+from .models import MerchantProduct, MerchantProfile
+from .serializers import MerchantProductSerializer
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+class ProductCatalogService:
+    """
+    公开商品目录（小程序商户页、商品详情页）
+
+    商品列表按 (created_at, id) 倒序游标分页，走 (merchant, status, category, created_at) 索引，
+    不做 COUNT 和 OFFSET。列表和详情的响应体连同 ETag、Last-Modified 缓存到 Redis：
+    列表按商户版本号失效，详情按商品版本号失效，商品新增、修改、上下架和商户档案变更时由信号触发。
+    下单扣库存、累加销量用 UPDATE 完成不触发失效，库存和销量最多滞后 CACHE_TTL 秒（下单时以数据库库存为准）。
+    这类 UPDATE 不更新 updated_at，因此 Last-Modified 取缓存条目的生成时间，与按内容计算的 ETag 同步变化。
+    """
+
+    CACHE_TTL = 60
+    LIST_VERSION_KEY = 'merchant:catalog:{merchant_id}:version'
+    LIST_KEY = 'merchant:catalog:{merchant_id}:{version}:{digest}'
+    DETAIL_VERSION_KEY = 'merchant:catalog:product:{product_id}:version'
+    DETAIL_KEY = 'merchant:catalog:product:{product_id}:{version}:{digest}'
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 100
+
+    # ---------- 失效 ----------
+
+    @classmethod
+    def invalidate_merchant(cls, merchant_id):
+        """使商户的商品列表缓存失效"""
+        bump_version(cls.LIST_VERSION_KEY.format(merchant_id=merchant_id))
+
+    @classmethod
+    def invalidate_product(cls, product_id):
+        """使商品详情缓存失效（详情按域名分别缓存，用版本号一并失效）"""
+        bump_version(cls.DETAIL_VERSION_KEY.format(product_id=product_id))
+
+    @classmethod
+    def invalidate_merchant_products(cls, merchant_id):
+        """商户档案变更（停用、改名）后，使该商户的列表和全部商品详情失效"""
+        cls.invalidate_merchant(merchant_id)
+        for product_id in MerchantProduct.objects.filter(merchant_id=merchant_id).values_list('id', flat=True):
+            cls.invalidate_product(product_id)
+
+    # ---------- 游标 ----------
+
+    @classmethod
+    def encode_cursor(cls, product):
+        raw = json.dumps([product.created_at.isoformat(), product.id])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        try:
+            created_at, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(cursor)
+            return created_at, int(product_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise InvalidCursor(cursor)
+
+    # ---------- 读取 ----------
+
+    @classmethod
+    def get_list(cls, request, merchant_id, category='', status='online', cursor='', page_size=DEFAULT_PAGE_SIZE):
+        """
+        返回一页商品 {'items', 'next_cursor', 'has_more', 'etag', 'last_modified'}，优先读缓存
+
+        商户不存在或已停用时返回 None；游标无效时抛出 InvalidCursor。
+        """
+        if cursor:
+            cls.decode_cursor(cursor)
+        version = get_version(cls.LIST_VERSION_KEY.format(merchant_id=merchant_id))
+        cache_key = cls.LIST_KEY.format(
+            merchant_id=merchant_id,
+            version=version,
+            digest=cls.digest(request, category, status, cursor, page_size),
+        )
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = cls.build_list(request, merchant_id, category, status, cursor, page_size)
+            cache.set(cache_key, cached, cls.CACHE_TTL)
+        return cached or None
+
+    @classmethod
+    def build_list(cls, request, merchant_id, category, status, cursor, page_size):
+        if not MerchantProfile.objects.filter(id=merchant_id, is_active=True).exists():
+            return {}
+
+        queryset = MerchantProduct.objects.filter(merchant_id=merchant_id)
+        if status:
+            queryset = queryset.filter(status=status)
+        if category:
+            queryset = queryset.filter(category=category)
+        if cursor:
+            created_at, product_id = cls.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=product_id))
+
+        products = list(queryset.select_related('merchant').order_by('-created_at', '-id')[:page_size + 1])
+        has_more = len(products) > page_size
+        products = products[:page_size]
+
+        items = MerchantProductSerializer(products, many=True, context={'request': request}).data
+        return cls.with_validators({
+            'items': list(items),
+            'next_cursor': cls.encode_cursor(products[-1]) if has_more else None,
+            'has_more': has_more,
+        })
+
+    @classmethod
+    def get_detail(cls, request, product_id):
+        """返回上架商品详情 {'item', 'etag', 'last_modified'}，优先读缓存；不存在或已下架时返回 None"""
+        version = get_version(cls.DETAIL_VERSION_KEY.format(product_id=product_id))
+        cache_key = cls.DETAIL_KEY.format(product_id=product_id, version=version, digest=cls.digest(request))
+        cached = cache.get(cache_key)
+        if cached is None:
+            product = MerchantProduct.objects.select_related('merchant').filter(
+                id=product_id, status='online', merchant__is_active=True
+            ).first()
+            if product is None:
+                cached = {}
+            else:
+                item = MerchantProductSerializer(product, context={'request': request}).data
+                cached = cls.with_validators({'item': dict(item)})
+            cache.set(cache_key, cached, cls.CACHE_TTL)
+        return cached or None
+
+    @classmethod
+    def digest(cls, request, *parts):
+        # 图片地址包含请求域名，不同域名分别缓存
+        raw = '|'.join([request.build_absolute_uri('/')] + [str(part) for part in parts])
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def with_validators(cls, payload):
+        """附加 ETag（响应内容摘要）和 Last-Modified（缓存条目生成时间，秒级时间戳）"""
+        body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, sort_keys=True)
+        payload['etag'] = f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()[:20]}"'
+        payload['last_modified'] = int(timezone.now().timestamp())
+        return payload
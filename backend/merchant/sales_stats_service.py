@@ -0,0 +1,185 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+import logging
+
+from .models import MerchantDailySales, MerchantOrder, MerchantOrderItem, MerchantProfile
+
+logger = logging.getLogger(__name__)
+
+
+class MerchantSalesService:
+    """
+    商户销售统计：维护 MerchantDailySales 日汇总，并从汇总表生成趋势和商品排行
+
+    订单完成时在同一事务内把订单金额和商品明细累加到完成当天的汇总行（行锁保护 JSON 明细）；
+    统计接口只按 (商户, 日期) 做一次区间查询。
+    """
+
+    TREND_DAYS = (7, 30, 365)
+    TOP_PRODUCTS = 10
+
+    @classmethod
+    def record_completed(cls, order):
+        """把刚完成的订单累加到完成当天的汇总行，需在完成订单的事务内调用"""
+        day = timezone.localdate(order.completed_at)
+        items = list(order.items.values('product_id', 'product_name', 'quantity', 'subtotal'))
+
+        rollup = cls.lock_rollup(order.merchant_id, day)
+        rollup.order_count += 1
+        rollup.revenue += Decimal(str(order.actual_amount))
+        for item in items:
+            rollup.items_sold += item['quantity']
+            cls.add_product(rollup.product_sales, item['product_id'], item['product_name'],
+                            item['quantity'], item['subtotal'])
+        rollup.save(update_fields=['order_count', 'revenue', 'items_sold', 'product_sales', 'updated_at'])
+
+    @classmethod
+    def lock_rollup(cls, merchant_id, day):
+        """锁定 (商户, 日期) 汇总行，不存在时创建"""
+        rollup = MerchantDailySales.objects.select_for_update().filter(merchant_id=merchant_id, day=day).first()
+        if rollup is None:
+            try:
+                with transaction.atomic():
+                    rollup = MerchantDailySales.objects.create(merchant_id=merchant_id, day=day)
+            except IntegrityError:
+                # 并发创建了同一行
+                rollup = MerchantDailySales.objects.select_for_update().get(merchant_id=merchant_id, day=day)
+        return rollup
+
+    @classmethod
+    def add_product(cls, product_sales, product_id, name, quantity, revenue):
+        entry = product_sales.setdefault(str(product_id), {'name': name, 'quantity': 0, 'revenue': '0'})
+        entry['name'] = name
+        entry['quantity'] += quantity
+        # 金额以字符串保存，避免 JSON 浮点误差
+        entry['revenue'] = str(Decimal(entry['revenue']) + Decimal(str(revenue or 0)))
+
+    @classmethod
+    def rebuild(cls, merchant_id=None):
+        """
+        从已完成订单全量重建汇总表（可只重建一个商户），返回汇总行数
+
+        读取订单和替换汇总行在同一事务内，并先锁定涉及的商户：完成订单会更新商户行，
+        重建期间完成的订单等重建提交后再累加到新的汇总行，不会丢失或重复计入。
+        """
+        with transaction.atomic():
+            merchants = MerchantProfile.objects.select_for_update()
+            if merchant_id is not None:
+                merchants = merchants.filter(id=merchant_id)
+            list(merchants.order_by('id').values_list('id', flat=True))
+
+            rollups = cls.build_rollups(merchant_id)
+
+            existing = MerchantDailySales.objects.all()
+            if merchant_id is not None:
+                existing = existing.filter(merchant_id=merchant_id)
+            existing.delete()
+            MerchantDailySales.objects.bulk_create(rollups.values(), batch_size=1000)
+
+        logger.info(f"商户日销售汇总重建完成，共{len(rollups)}行")
+        return len(rollups)
+
+    @classmethod
+    def build_rollups(cls, merchant_id=None):
+        """按已完成订单计算 {(商户, 日期): 汇总行}"""
+        # 历史订单可能没有完成时间，按下单时间归入当天
+        orders = MerchantOrder.objects.filter(status='completed')
+        items = MerchantOrderItem.objects.filter(order__status='completed')
+        if merchant_id is not None:
+            orders = orders.filter(merchant_id=merchant_id)
+            items = items.filter(order__merchant_id=merchant_id)
+
+        rollups = {}
+        order_rows = orders.annotate(
+            day=TruncDate(Coalesce('completed_at', 'created_at'))
+        ).values('merchant_id', 'day').annotate(
+            order_count=Count('id'), revenue=Sum('actual_amount')
+        ).order_by()
+        for row in order_rows.iterator():
+            rollups[(row['merchant_id'], row['day'])] = MerchantDailySales(
+                merchant_id=row['merchant_id'],
+                day=row['day'],
+                order_count=row['order_count'],
+                revenue=row['revenue'] or 0,
+            )
+
+        item_rows = items.annotate(
+            day=TruncDate(Coalesce('order__completed_at', 'order__created_at'))
+        ).values('order__merchant_id', 'day', 'product_id').annotate(
+            quantity=Sum('quantity'), revenue=Sum('subtotal'), name=Max('product_name')
+        ).order_by()
+        for row in item_rows.iterator():
+            rollup = rollups[(row['order__merchant_id'], row['day'])]
+            rollup.items_sold += row['quantity']
+            cls.add_product(rollup.product_sales, row['product_id'], row['name'], row['quantity'], row['revenue'])
+
+        return rollups
+
+    @classmethod
+    def get_stats(cls, merchant_id, days=7, today=None):
+        """
+        一次区间查询得到近 days 天的汇总、趋势和商品排行
+
+        7/30 天按天返回趋势，365 天按月返回。
+        """
+        today = today or timezone.localdate()
+        start = today - timedelta(days=days - 1)
+        rows = MerchantDailySales.objects.filter(
+            merchant_id=merchant_id, day__gte=start, day__lte=today
+        ).values_list('day', 'order_count', 'revenue', 'items_sold', 'product_sales')
+
+        by_day = {}
+        products = defaultdict(lambda: {'name': '', 'quantity': 0, 'revenue': Decimal('0')})
+        summary = {'orders': 0, 'revenue': Decimal('0'), 'items_sold': 0}
+        for day, order_count, revenue, items_sold, product_sales in rows:
+            by_day[day] = revenue
+            summary['orders'] += order_count
+            summary['revenue'] += revenue
+            summary['items_sold'] += items_sold
+            for product_id, entry in product_sales.items():
+                product = products[product_id]
+                product['name'] = entry['name']
+                product['quantity'] += entry['quantity']
+                product['revenue'] += Decimal(entry['revenue'])
+
+        if days > 31:
+            # 按月汇总
+            trend = {}
+            for offset in range(days):
+                day = start + timedelta(days=offset)
+                month = day.strftime('%Y-%m')
+                trend[month] = trend.get(month, Decimal('0')) + by_day.get(day, Decimal('0'))
+            sales_trend = [{'date': month, 'amount': float(amount)} for month, amount in trend.items()]
+        else:
+            sales_trend = [
+                {'date': day.strftime('%m-%d'), 'amount': float(by_day.get(day, 0))}
+                for day in (start + timedelta(days=offset) for offset in range(days))
+            ]
+
+        top_products = sorted(
+            products.items(), key=lambda pair: (-pair[1]['quantity'], -pair[1]['revenue'])
+        )[:cls.TOP_PRODUCTS]
+
+        return {
+            'today_revenue': float(by_day.get(today, 0)),
+            'summary': {
+                'orders': summary['orders'],
+                'revenue': float(summary['revenue']),
+                'items_sold': summary['items_sold'],
+            },
+            'sales_trend': sales_trend,
+            'top_products': [
+                {
+                    'product_id': int(product_id),
+                    'name': product['name'],
+                    'quantity': product['quantity'],
+                    'revenue': float(product['revenue']),
+                }
+                for product_id, product in top_products
+            ],
+        }
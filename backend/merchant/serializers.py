@@ -101,8 +101,7 @@ class MerchantProfileSerializer(serializers.ModelSerializer):
     user_info = serializers.SerializerMethodField()
     category_display = serializers.CharField(source='get_shop_category_display', read_only=True)
     shop_logo_url = serializers.SerializerMethodField()
-    total_orders = serializers.SerializerMethodField()  # 改为实时计算
-    total_revenue = serializers.SerializerMethodField()  # 改为实时计算
+    total_revenue = serializers.FloatField(read_only=True)
     
     class Meta:
         model = MerchantProfile
@@ -112,7 +111,7 @@ class MerchantProfileSerializer(serializers.ModelSerializer):
             'shop_announcement', 'business_hours_start', 'business_hours_end',
             'is_active', 'total_orders', 'total_revenue', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['user']
+        read_only_fields = ['user', 'total_orders']
     
     def get_user_info(self, obj):
         """获取用户信息"""
@@ -145,21 +144,6 @@ class MerchantProfileSerializer(serializers.ModelSerializer):
             return f'/media/{obj.shop_logo}' if obj.shop_logo else None
         return None
 
-    def get_total_orders(self, obj):
-        """实时计算总订单数"""
-        from .models import MerchantOrder
-        return MerchantOrder.objects.filter(merchant=obj).count()
-
-    def get_total_revenue(self, obj):
-        """实时计算总收入"""
-        from .models import MerchantOrder
-        from django.db.models import Sum
-        result = MerchantOrder.objects.filter(
-            merchant=obj,
-            status='completed'
-        ).aggregate(total=Sum('actual_amount'))
-        return float(result['total'] or 0)
-
 
 class MerchantProfileUpdateSerializer(serializers.ModelSerializer):
     """商户档案更新序列化器"""
@@ -422,14 +406,14 @@ class CouponReceiveSerializer(serializers.Serializer):
     coupon_id = serializers.IntegerField()
     
     def validate_coupon_id(self, value):
-        """验证优惠券ID"""
-        try:
-            coupon = MerchantCoupon.objects.get(id=value)
-            if not coupon.is_valid:
-                raise serializers.ValidationError("优惠券已失效或数量不足")
-            return value
-        except MerchantCoupon.DoesNotExist:
+        """验证优惠券ID（读取缓存的优惠券信息，不查询优惠券行）"""
+        from .coupon_claim_service import CouponClaimService
+        meta = CouponClaimService.get_meta(value)
+        if meta is None:
             raise serializers.ValidationError("优惠券不存在")
+        if not CouponClaimService.is_active(meta):
+            raise serializers.ValidationError("优惠券已失效或数量不足")
+        return value
 
 
 class CouponVerifySerializer(serializers.Serializer):
@@ -534,244 +518,159 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         if not order_items:
             raise serializers.ValidationError("订单商品不能为空")
 
-        # 验证商品
+        # 验证商品（价格、名称以服务端商品数据为准，忽略客户端传入的值）
+        normalized = []
         for item in order_items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
+            try:
+                product_id = int(item.get('product_id'))
+                quantity = int(item.get('quantity', 1))
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("商品ID和数量必须有效")
 
-            if not product_id or quantity <= 0:
+            if product_id <= 0 or quantity <= 0:
                 raise serializers.ValidationError("商品ID和数量必须有效")
+            normalized.append({
+                'product_id': product_id,
+                'quantity': quantity,
+                'specifications': item.get('specifications') or {},
+            })
 
+        data['order_items'] = normalized
         return data
 
-    def create(self, validated_data):
-        """创建订单"""
-        print("DEBUG: create方法开始执行")
-
-        try:
-            print(f"DEBUG: validated_data = {validated_data}")
-            print(f"DEBUG: validated_data类型 = {type(validated_data)}")
+    def calculate_discount(self, coupon, total_amount):
+        """按优惠券计算优惠金额（Decimal，保留两位小数，不超过订单金额）"""
+        from decimal import Decimal, ROUND_HALF_UP
 
-            # 尝试弹出order_items
-            try:
-                order_items_data = validated_data.pop('order_items')
-                print(f"DEBUG: 成功获取order_items_data = {order_items_data}")
-            except Exception as e:
-                print(f"DEBUG: 弹出order_items失败: {e}")
-                raise
+        if coupon.coupon_type == 'deduction':
+            discount_amount = coupon.amount
+        elif coupon.coupon_type == 'discount':
+            discount_amount = total_amount * (Decimal('1') - coupon.amount)
+        else:
+            discount_amount = Decimal('0')
+        discount_amount = discount_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return min(max(discount_amount, Decimal('0')), total_amount)
 
-            # 尝试弹出user_coupon_id
-            try:
-                user_coupon_id = validated_data.pop('user_coupon_id', None)
-                print(f"DEBUG: 成功获取user_coupon_id = {user_coupon_id}")
-            except Exception as e:
-                print(f"DEBUG: 弹出user_coupon_id失败: {e}")
-                raise
+    def create(self, validated_data):
+        """
+        创建订单
 
-            # 尝试弹出merchant_id
-            try:
-                merchant_id = validated_data.pop('merchant_id')
-                print(f"DEBUG: 成功获取merchant_id = {merchant_id}")
-            except Exception as e:
-                print(f"DEBUG: 弹出merchant_id失败: {e}")
-                raise
-
-            # 尝试转换为整数
-            if merchant_id is not None:
-                try:
-                    merchant_id = int(merchant_id)
-                    print(f"DEBUG: merchant_id转换为整数 = {merchant_id}")
-                except (ValueError, TypeError) as e:
-                    print(f"DEBUG: merchant_id转换整数失败: {e}")
-                    merchant_id = 0
-            else:
-                merchant_id = 0
-
-            # 获取请求数据
-            try:
-                request = self.context.get('request')
-                print(f"DEBUG: 获取request = {request}")
-                print(f"DEBUG: request类型 = {type(request)}")
-
-                if request:
-                    print(f"DEBUG: request.data = {getattr(request, 'data', 'NO_DATA')}")
-                    print(f"DEBUG: request.user = {getattr(request, 'user', 'NO_USER')}")
-            except Exception as e:
-                print(f"DEBUG: 获取request信息失败: {e}")
-                raise
-
-  
-            # 获取用户
-            user = None
-            print("DEBUG: 开始获取user")
-            if request:
-                try:
-                    user = request.user
-                    print(f"DEBUG: 获取user = {user}")
-                except Exception as e:
-                    print(f"DEBUG: 获取user失败: {e}")
+        整个下单过程在一个事务中完成：一次查询加锁读取全部商品，按服务端价格用 Decimal 计算金额，
+        一次 bulk_create 写入订单项，库存和销量用带条件的 F() 更新扣减，库存不足时整单回滚。
+        """
+        from collections import Counter
+        from decimal import Decimal
+        from django.db import transaction
+        from django.db.models import F
+        from django.utils import timezone
 
-            print(f"DEBUG: 最终结果 - user = {user}, merchant_id = {merchant_id}")
+        order_items_data = validated_data.pop('order_items')
+        user_coupon_id = validated_data.pop('user_coupon_id', None)
+        merchant_id = validated_data.pop('merchant_id')
 
-            # 验证必要的数据
-            if not user:
-                raise serializers.ValidationError("用户未登录")
-            if not merchant_id or merchant_id == 0:
-                raise serializers.ValidationError("商户ID不能为空")
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if not user or not user.is_authenticated:
+            raise serializers.ValidationError("用户未登录")
+        if not merchant_id:
+            raise serializers.ValidationError("商户ID不能为空")
+
+        quantities = Counter()
+        for item_data in order_items_data:
+            quantities[item_data['product_id']] += item_data['quantity']
+
+        # 订单号在事务外预留，事务回滚只留下空号
+        order_no = MerchantOrder.allocate_order_no()
+
+        with transaction.atomic():
+            # 一次查询读取并锁定订单涉及的全部商品，并发下单在商品行上排队
+            products = MerchantProduct.objects.select_for_update().in_bulk(sorted(quantities))
+
+            for product_id, quantity in quantities.items():
+                product = products.get(product_id)
+                if product is None or product.merchant_id != merchant_id:
+                    raise serializers.ValidationError(f"商品ID {product_id} 不存在")
+                if product.status != 'online':
+                    raise serializers.ValidationError(f"商品 {product.name} 已下架")
+                if product.stock < quantity:
+                    raise serializers.ValidationError(f"商品 {product.name} 库存不足")
 
             # 计算订单总金额
-            total_amount = 0
-            try:
-                print(f"DEBUG: 开始计算总金额，order_items_data = {order_items_data}")
-                from decimal import Decimal
-                for item_data in order_items_data:
-                    price = Decimal(str(item_data['price']))
-                    quantity = int(item_data['quantity'])
-                    subtotal = price * quantity
-                    total_amount += float(subtotal)
-                print(f"DEBUG: 计算总金额 = {total_amount}")
-            except Exception as e:
-                print(f"DEBUG: 计算总金额失败: {e}")
-                raise
+            total_amount = sum(
+                (products[item_data['product_id']].price * item_data['quantity'] for item_data in order_items_data),
+                Decimal('0'),
+            )
 
             # 处理优惠券
-            discount_amount = 0
-            actual_amount = total_amount
+            discount_amount = Decimal('0')
             used_coupon = None
-
             if user_coupon_id:
                 try:
-                    print(f"DEBUG: 开始处理优惠券，user_coupon_id = {user_coupon_id}")
-                    from django.utils import timezone
-                    user_coupon = UserCoupon.objects.get(
+                    used_coupon = UserCoupon.objects.select_for_update().select_related('coupon').get(
                         id=user_coupon_id,
                         user=user,
                         status='unused'
                     )
-                    print(f"DEBUG: 找到用户优惠券 = {user_coupon}")
-
-                    # 检查优惠券是否可用
-                    coupon = user_coupon.coupon
-                    now = timezone.now()
-                    if now < coupon.start_date or now > coupon.end_date:
-                        raise serializers.ValidationError("优惠券不在有效期内")
-
-                    if total_amount < coupon.min_amount:
-                        raise serializers.ValidationError(f"订单金额不足，最低需消费{coupon.min_amount}元")
-
-                    # 计算优惠金额
-                    if coupon.coupon_type == 'deduction':
-                        discount_amount = float(coupon.amount)
-                    elif coupon.coupon_type == 'discount':
-                        discount_amount = total_amount * (1 - float(coupon.amount))
-
-                    actual_amount = total_amount - discount_amount
-                    if actual_amount < 0:
-                        actual_amount = 0
-
-                    used_coupon = user_coupon
-                    print(f"DEBUG: 优惠券处理完成，discount_amount = {discount_amount}")
-
                 except UserCoupon.DoesNotExist:
                     raise serializers.ValidationError("优惠券不存在或已使用")
 
-            # 创建订单 - 这里最容易出现问题
-            print("DEBUG: 开始创建订单对象")
-            try:
-                print(f"DEBUG: 准备传入MerchantOrder.create的参数:")
-                print(f"  - merchant_id: {merchant_id}")
-                print(f"  - user: {user}")
-                print(f"  - validated_data: {validated_data}")
-                print(f"  - total_amount: {total_amount}")
-                print(f"  - actual_amount: {actual_amount}")
-                print(f"  - discount_amount: {discount_amount}")
-                print(f"  - used_coupon: {used_coupon}")
-
-                order = MerchantOrder.objects.create(
-                    merchant_id=merchant_id,
-                    user=user,
-                    **validated_data,
-                    total_amount=total_amount,
-                    actual_amount=actual_amount,
-                    discount_amount=discount_amount,
-                    used_coupon=used_coupon,
-                    status='new',
-                    pickup_code=f"{random.randint(100000, 999999)}" if validated_data.get('pickup_type') == 'pickup' else ''
+                # 检查优惠券是否可用
+                coupon = used_coupon.coupon
+                now = timezone.now()
+                if coupon.merchant_id != merchant_id:
+                    raise serializers.ValidationError("优惠券不适用于该商户")
+                if now < coupon.start_date or now > coupon.end_date:
+                    raise serializers.ValidationError("优惠券不在有效期内")
+                if total_amount < coupon.min_amount:
+                    raise serializers.ValidationError(f"订单金额不足，最低需消费{coupon.min_amount}元")
+
+                discount_amount = self.calculate_discount(coupon, total_amount)
+
+            order = MerchantOrder.objects.create(
+                order_no=order_no,
+                merchant_id=merchant_id,
+                user=user,
+                **validated_data,
+                total_amount=total_amount,
+                actual_amount=total_amount - discount_amount,
+                discount_amount=discount_amount,
+                used_coupon=used_coupon,
+                status='new',
+                pickup_code=f"{random.randint(100000, 999999)}" if validated_data.get('pickup_type') == 'pickup' else ''
+            )
+
+            # 订单项保存商品名称和价格快照
+            MerchantOrderItem.objects.bulk_create([
+                MerchantOrderItem(
+                    order=order,
+                    product=products[item_data['product_id']],
+                    product_name=products[item_data['product_id']].name,
+                    product_price=products[item_data['product_id']].price,
+                    quantity=item_data['quantity'],
+                    subtotal=products[item_data['product_id']].price * item_data['quantity'],
+                    specifications=item_data['specifications'],
                 )
-                print(f"DEBUG: 成功创建订单 = {order}")
-            except Exception as e:
-                print(f"DEBUG: 创建订单失败: {e}")
-                print(f"DEBUG: 错误类型 = {type(e)}")
-                import traceback
-                print(f"DEBUG: 错误堆栈: {traceback.format_exc()}")
-                raise
-
-            # 创建订单项
-            try:
-                print(f"DEBUG: 开始创建订单项")
-                for item_data in order_items_data:
-                    # 先验证商品是否存在
-                    product_id = item_data.get('product_id')
-                    print(f"DEBUG: 验证商品ID: {product_id}")
-
-                    try:
-                        product = MerchantProduct.objects.get(id=product_id)
-                        print(f"DEBUG: 找到商品: {product.name}")
-                    except MerchantProduct.DoesNotExist:
-                        print(f"DEBUG: 商品不存在: {product_id}")
-                        raise serializers.ValidationError(f"商品ID {product_id} 不存在")
-
-                    # 如果前端没有提供 product_name，使用数据库中的名称
-                    product_name = item_data.get('product_name') or product.name
-
-                    # 转换价格类型
-                    item_price = Decimal(str(item_data['price']))
-                    item_quantity = int(item_data['quantity'])
-                    item_subtotal = item_price * item_quantity
-
-                    item = MerchantOrderItem.objects.create(
-                        order=order,
-                        product=product,  # 使用 product 对象而不是 product_id
-                        product_name=product_name,
-                        product_price=item_price,
-                        quantity=item_quantity,
-                        subtotal=item_subtotal
-                    )
-                    print(f"DEBUG: 创建订单项 = {item}")
-            except Exception as e:
-                print(f"DEBUG: 创建订单项失败: {e}")
-                import traceback
-                print(f"DEBUG: 错误堆栈: {traceback.format_exc()}")
-                raise
+                for item_data in order_items_data
+            ])
+
+            # 扣减库存、增加销量：只在库存足够时更新，防止超卖
+            for product_id, quantity in quantities.items():
+                updated = MerchantProduct.objects.filter(id=product_id, stock__gte=quantity).update(
+                    stock=F('stock') - quantity,
+                    sales_count=F('sales_count') + quantity,
+                )
+                if not updated:
+                    raise serializers.ValidationError(f"商品 {products[product_id].name} 库存不足")
 
             # 标记优惠券为已使用
             if used_coupon:
-                try:
-                    print(f"DEBUG: 开始标记优惠券为已使用")
-                    from django.utils import timezone
-                    used_coupon.status = 'used'
-                    used_coupon.used_order = order
-                    used_coupon.used_at = timezone.now()
-                    used_coupon.save()
-
-                    # 更新优惠券使用计数
-                    coupon = used_coupon.coupon
-                    coupon.used_count += 1
-                    coupon.save()
-                    print(f"DEBUG: 优惠券标记完成")
-                except Exception as e:
-                    print(f"DEBUG: 标记优惠券失败: {e}")
-                    raise
-
-            print("DEBUG: create方法成功完成")
-            return order
-
-        except Exception as e:
-            print(f"DEBUG: create方法执行失败: {e}")
-            print(f"DEBUG: 错误类型 = {type(e)}")
-            import traceback
-            print(f"DEBUG: 完整错误堆栈: {traceback.format_exc()}")
-            raise
+                used_coupon.status = 'used'
+                used_coupon.used_order = order
+                used_coupon.used_at = timezone.now()
+                used_coupon.save(update_fields=['status', 'used_order', 'used_at'])
+                # 优惠券的 used_count 是已发放数量，领取入库时已累加，核销不再计数
+
+        return order
 
 
 class CartItemSerializer(serializers.ModelSerializer):
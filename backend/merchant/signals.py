@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import MerchantCoupon, MerchantProduct, MerchantProfile
+from .coupon_claim_service import CouponClaimService
+from .merchant_listing_service import MerchantListingService
+from .product_catalog_service import ProductCatalogService
+
+
+@receiver([post_save, post_delete], sender=MerchantCoupon)
+def invalidate_coupon_meta(sender, instance, **kwargs):
+    """优惠券修改或删除后，在事务提交时使领取用的优惠券信息缓存失效"""
+    transaction.on_commit(lambda: CouponClaimService.invalidate_meta(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=MerchantProfile)
+def invalidate_merchant_listing(sender, **kwargs):
+    """商户档案变更后，在事务提交时使公开商户列表缓存失效"""
+    transaction.on_commit(MerchantListingService.invalidate)
+
+
+@receiver([post_save, post_delete], sender=MerchantProduct)
+def invalidate_product_catalog(sender, instance, **kwargs):
+    """商品新增、修改、上下架或删除后，在事务提交时使该商户的商品列表和商品详情缓存失效"""
+    def invalidate():
+        ProductCatalogService.invalidate_merchant(instance.merchant_id)
+        ProductCatalogService.invalidate_product(instance.pk)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=MerchantProfile)
+def invalidate_merchant_catalog(sender, instance, **kwargs):
+    """商户档案变更（停用、改名）后，在事务提交时使该商户的商品目录缓存失效"""
+    transaction.on_commit(lambda: ProductCatalogService.invalidate_merchant_products(instance.pk))
@@ -265,6 +265,16 @@ class TestMerchantOrder:
         assert order.order_no is not None
         assert order.order_no.startswith('ORD')
 
+    @pytest.mark.django_db
+    def test_order_no_is_sequential(self):
+        """测试订单号按当日序列递增"""
+        date_str = timezone.localdate().strftime('%Y%m%d')
+        first = MerchantOrderFactory()
+        second = MerchantOrderFactory()
+
+        assert first.order_no == f'ORD{date_str}00000001'
+        assert second.order_no == f'ORD{date_str}00000002'
+
     @pytest.mark.django_db
     def test_order_accept(self):
         """测试接单"""
@@ -344,3 +354,551 @@ class TestMerchantOrderItem:
         str_repr = str(item)
         assert 'ORD123456' in str_repr
         assert '珍珠奶茶' in str_repr
+
+
+class TestOrderCreate:
+    """下单测试"""
+
+    URL = '/api/merchant/orders/create/'
+
+    def order_payload(self, merchant, items, **extra):
+        return {
+            'merchant_id': merchant.id,
+            'contact_name': '张三',
+            'contact_phone': '13800000000',
+            'pickup_type': 'pickup',
+            'order_items': items,
+            **extra,
+        }
+
+    @pytest.mark.django_db
+    def test_create_order_prices_on_server_and_decrements_stock(self, api_client):
+        """测试按服务端价格计算金额、批量写入订单项并扣减库存"""
+        from decimal import Decimal
+        merchant = MerchantProfileFactory()
+        latte = MerchantProductFactory(merchant=merchant, price=Decimal('0.10'), stock=10, sales_count=0)
+        cake = MerchantProductFactory(merchant=merchant, price=Decimal('0.20'), stock=5, sales_count=1)
+
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.post(self.URL, self.order_payload(merchant, [
+            {'product_id': latte.id, 'quantity': 1, 'price': 0.01},
+            {'product_id': cake.id, 'quantity': 2, 'price': 0.01},
+            {'product_id': latte.id, 'quantity': 2},
+        ]), format='json')
+        assert response.status_code == 201, response.data
+
+        order = MerchantOrder.objects.get(id=response.data['data']['order_id'])
+        assert order.total_amount == Decimal('0.70')
+        assert order.actual_amount == Decimal('0.70')
+        assert sorted(order.items.values_list('product_price', 'quantity')) == [
+            (Decimal('0.10'), 1), (Decimal('0.10'), 2), (Decimal('0.20'), 2)
+        ]
+
+        latte.refresh_from_db()
+        cake.refresh_from_db()
+        assert (latte.stock, latte.sales_count) == (7, 3)
+        assert (cake.stock, cake.sales_count) == (3, 3)
+
+        # 取消订单退回库存
+        response = api_client.post(f'/api/merchant/user/orders/{order.id}/cancel/')
+        assert response.status_code == 200
+        latte.refresh_from_db()
+        assert (latte.stock, latte.sales_count) == (10, 0)
+
+        # 已取消的订单再次取消不重复退回库存
+        assert order.cancel_order(['new']) is False
+        response = api_client.post(f'/api/merchant/user/orders/{order.id}/cancel/')
+        assert response.status_code == 400
+        latte.refresh_from_db()
+        assert (latte.stock, latte.sales_count) == (10, 0)
+
+    @pytest.mark.django_db
+    def test_create_order_rolls_back_when_stock_insufficient(self, api_client):
+        """测试库存不足或商品不属于该商户时整单回滚"""
+        merchant = MerchantProfileFactory()
+        enough = MerchantProductFactory(merchant=merchant, stock=10)
+        short = MerchantProductFactory(merchant=merchant, stock=1)
+        foreign = MerchantProductFactory(stock=10)
+
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.post(self.URL, self.order_payload(merchant, [
+            {'product_id': enough.id, 'quantity': 1},
+            {'product_id': short.id, 'quantity': 2},
+        ]), format='json')
+        assert response.status_code == 400
+        assert '库存不足' in response.data['message']
+
+        response = api_client.post(self.URL, self.order_payload(merchant, [
+            {'product_id': foreign.id, 'quantity': 1},
+        ]), format='json')
+        assert response.status_code == 400
+
+        assert not MerchantOrder.objects.exists()
+        enough.refresh_from_db()
+        assert enough.stock == 10
+
+    @pytest.mark.django_db
+    def test_create_order_applies_coupon_in_decimal(self, api_client):
+        """测试折扣券按 Decimal 计算并标记已使用"""
+        from decimal import Decimal
+        merchant = MerchantProfileFactory()
+        product = MerchantProductFactory(merchant=merchant, price=Decimal('33.33'), stock=10)
+        user = UserFactory()
+        coupon = MerchantCouponFactory(
+            merchant=merchant, coupon_type='discount', amount=Decimal('0.85'), min_amount=Decimal('0')
+        )
+        user_coupon = UserCouponFactory(user=user, coupon=coupon)
+
+        api_client.force_authenticate(user=user)
+        response = api_client.post(self.URL, self.order_payload(
+            merchant, [{'product_id': product.id, 'quantity': 3}], user_coupon_id=user_coupon.id
+        ), format='json')
+        assert response.status_code == 201, response.data
+
+        order = MerchantOrder.objects.get(id=response.data['data']['order_id'])
+        assert order.total_amount == Decimal('99.99')
+        assert order.discount_amount == Decimal('15.00')
+        assert order.actual_amount == Decimal('84.99')
+        user_coupon.refresh_from_db()
+        assert user_coupon.status == 'used'
+        assert user_coupon.used_order_id == order.id
+        # used_count 为已发放数量，核销不再累加
+        coupon.refresh_from_db()
+        assert coupon.used_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_checkouts_do_not_oversell(self):
+        """测试并发下单不会超卖"""
+        import threading
+        import time
+        from types import SimpleNamespace
+        from django.db import OperationalError, connection
+        from rest_framework import serializers
+        from merchant.serializers import OrderCreateSerializer
+
+        merchant = MerchantProfileFactory()
+        product = MerchantProductFactory(merchant=merchant, stock=5, sales_count=0)
+        users = [UserFactory() for _ in range(12)]
+        barrier = threading.Barrier(len(users))
+        results = []
+
+        def checkout(user):
+            serializer = OrderCreateSerializer(
+                data=self.order_payload(merchant, [{'product_id': product.id, 'quantity': 1}]),
+                context={'request': SimpleNamespace(user=user)},
+            )
+            assert serializer.is_valid(), serializer.errors
+            barrier.wait()
+            try:
+                # SQLite 测试库并发写入时直接报锁冲突而不是等待，事务已回滚，重试即可
+                for _ in range(500):
+                    try:
+                        serializer.save()
+                        results.append('created')
+                        break
+                    except OperationalError:
+                        time.sleep(0.005)
+                    except serializers.ValidationError:
+                        results.append('rejected')
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        assert sorted(results) == ['created'] * 5 + ['rejected'] * 7
+        assert product.stock == 0
+        assert product.sales_count == 5
+        assert MerchantOrder.objects.count() == 5
+        assert MerchantOrderItem.objects.filter(product=product).count() == 5
+
+
+class TestCouponClaim:
+    """优惠券抢领测试"""
+
+    URL = '/api/merchant/coupons/receive/'
+
+    @pytest.fixture(autouse=True)
+    def clear_claim_state(self):
+        from django.core.cache import cache
+        from merchant.coupon_claim_service import CouponClaimService
+        cache.clear()
+        CouponClaimService._local_store.clear()
+        yield
+        CouponClaimService._local_store.clear()
+
+    @pytest.mark.django_db
+    def test_parallel_claims_respect_total_and_per_user_limits(self):
+        """测试并发领取时发放数量和每人限领数量都是精确的"""
+        import threading
+        from merchant.coupon_claim_service import CouponClaimService
+
+        coupon = MerchantCouponFactory(total_count=20, per_user_limit=2)
+        # 已有的领取记录计入计数
+        existing = UserCouponFactory(coupon=coupon)
+        users = [UserFactory() for _ in range(15)] + [existing.user]
+        meta = CouponClaimService.get_meta(coupon.id)
+        CouponClaimService.init_counters(CouponClaimService.get_store(), coupon.id, meta)
+
+        barrier = threading.Barrier(len(users))
+        results = []
+
+        def claim(user):
+            barrier.wait()
+            for _ in range(3):
+                results.append((user.id, CouponClaimService.claim(user.id, coupon.id)[0]))
+
+        threads = [threading.Thread(target=claim, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [user_id for user_id, result in results if result == CouponClaimService.CLAIMED]
+        assert len(claimed) == 19
+        assert claimed.count(existing.user_id) <= 1
+        assert all(claimed.count(user.id) <= 2 for user in users)
+        assert {result for _, result in results} <= {
+            CouponClaimService.CLAIMED, CouponClaimService.SOLD_OUT, CouponClaimService.LIMIT_REACHED
+        }
+
+        assert CouponClaimService.flush()['created'] == 19
+        coupon.refresh_from_db()
+        assert coupon.used_count == 19
+        assert UserCoupon.objects.filter(coupon=coupon).count() == 20
+
+    @pytest.mark.django_db
+    def test_flush_persists_claims_and_skips_redelivered(self):
+        """测试入库保留核销码和领取时间，重复投递的记录按核销码跳过"""
+        import json
+        from merchant.coupon_claim_service import CouponClaimService
+
+        coupon = MerchantCouponFactory(total_count=10, per_user_limit=1)
+        user = UserFactory()
+        result, record = CouponClaimService.claim(user.id, coupon.id)
+        assert result == CouponClaimService.CLAIMED
+
+        store = CouponClaimService.get_store()
+        store._queue[0] = json.dumps(record)
+        store._queue.move_to_end(0)
+        store._queue[-1] = 'not json'
+
+        assert CouponClaimService.flush() == {'created': 1, 'duplicates': 1, 'invalid': 1}
+        assert CouponClaimService.backlog() == 0
+
+        user_coupon = UserCoupon.objects.get(coupon=coupon, user=user)
+        assert user_coupon.verification_code == record['verification_code']
+        assert user_coupon.received_at.isoformat() == record['received_at']
+        assert user_coupon.status == 'unused'
+        coupon.refresh_from_db()
+        assert coupon.used_count == 1
+
+    @pytest.mark.django_db
+    def test_init_counters_includes_queued_claims(self):
+        """测试计数过期后重新初始化时计入仍在队列中待入库的领取记录"""
+        from merchant.coupon_claim_service import CouponClaimService
+
+        coupon = MerchantCouponFactory(total_count=2, per_user_limit=1)
+        first, second, third = UserFactory(), UserFactory(), UserFactory()
+        assert CouponClaimService.claim(first.id, coupon.id)[0] == CouponClaimService.CLAIMED
+
+        # 计数过期，领取记录尚未入库
+        CouponClaimService.get_store().reset(coupon.id)
+
+        assert CouponClaimService.claim(first.id, coupon.id)[0] == CouponClaimService.LIMIT_REACHED
+        assert CouponClaimService.claim(second.id, coupon.id)[0] == CouponClaimService.CLAIMED
+        assert CouponClaimService.claim(third.id, coupon.id)[0] == CouponClaimService.SOLD_OUT
+
+    @pytest.mark.django_db
+    def test_receive_endpoint(self, api_client):
+        """测试领取接口返回核销码并按上限拒绝"""
+        from merchant.coupon_claim_service import CouponClaimService
+
+        coupon = MerchantCouponFactory(total_count=1, per_user_limit=1)
+        user = UserFactory()
+        api_client.force_authenticate(user=user)
+
+        response = api_client.post(self.URL, {'coupon_id': coupon.id}, format='json')
+        assert response.status_code == 200, response.data
+        assert response.data['data']['coupon_info']['name'] == coupon.name
+        assert len(response.data['data']['verification_code']) == 12
+
+        response = api_client.post(self.URL, {'coupon_id': coupon.id}, format='json')
+        assert response.status_code == 400
+        assert '领取上限' in response.data['message']
+
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.post(self.URL, {'coupon_id': coupon.id}, format='json')
+        assert response.status_code == 400
+        assert response.data['message'] == '优惠券已失效或数量不足'
+
+        response = api_client.post(self.URL, {'coupon_id': coupon.id + 1000}, format='json')
+        assert response.status_code == 400
+
+        assert CouponClaimService.flush()['created'] == 1
+        assert UserCoupon.objects.filter(coupon=coupon, user=user).exists()
+
+
+class TestMerchantListing:
+    """商户统计与公开商户列表测试"""
+
+    URL = '/api/merchant/profiles/'
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    @pytest.mark.django_db
+    def test_complete_order_accumulates_merchant_stats_once(self):
+        """测试订单完成时累加商户订单数和收入，重复完成不会重复累加"""
+        from decimal import Decimal
+        merchant = MerchantProfileFactory()
+        order = MerchantOrderFactory(merchant=merchant, status='ready', actual_amount=Decimal('25.50'))
+        stale = MerchantOrder.objects.get(pk=order.pk)
+
+        assert order.complete_order() is True
+        assert stale.complete_order() is False
+        MerchantOrderFactory(merchant=merchant, status='ready', actual_amount=Decimal('4.50')).complete_order()
+
+        merchant.refresh_from_db()
+        assert merchant.total_orders == 2
+        assert merchant.total_revenue == Decimal('30.00')
+        order.refresh_from_db()
+        assert order.status == 'completed'
+        assert order.completed_at is not None
+
+    @pytest.mark.django_db
+    def test_cancelled_order_cannot_be_completed(self):
+        """测试订单取消后，按旧状态发起的完成和核销都不生效"""
+        from decimal import Decimal
+        merchant = MerchantProfileFactory()
+        product = MerchantProductFactory(merchant=merchant, stock=5)
+        order = MerchantOrderFactory(merchant=merchant, status='ready', pickup_code='123456',
+                                     actual_amount=Decimal('10.00'))
+        MerchantOrderItemFactory(order=order, product=product, quantity=1, subtotal=Decimal('10.00'))
+        stale = MerchantOrder.objects.get(pk=order.pk)
+
+        assert order.cancel_order(['ready']) is True
+        assert stale.complete_order() is False
+
+        merchant.refresh_from_db()
+        assert (merchant.total_orders, merchant.total_revenue) == (0, Decimal('0'))
+        order.refresh_from_db()
+        assert order.status == 'cancelled'
+        product.refresh_from_db()
+        assert product.stock == 6
+
+    @pytest.mark.django_db
+    def test_public_list_is_paginated_and_cached(self, api_client, django_assert_num_queries,
+                                                 django_capture_on_commit_callbacks):
+        """测试公开商户列表按分类分页、查询数固定，并缓存分页结果"""
+        for _ in range(3):
+            MerchantProfileFactory(shop_category='餐饮')
+        MerchantProfileFactory(shop_category='生活服务')
+        MerchantProfileFactory(shop_category='餐饮', is_active=False)
+
+        with django_assert_num_queries(2):
+            response = api_client.get(self.URL, {'category': '餐饮', 'page_size': 2})
+        assert response.status_code == 200
+        assert len(response.data['data']) == 2
+        assert response.data['pagination'] == {'total': 3, 'page': 1, 'page_size': 2, 'total_pages': 2}
+        assert 'total_orders' in response.data['data'][0]
+
+        with django_assert_num_queries(0):
+            cached = api_client.get(self.URL, {'category': '餐饮', 'page_size': 2})
+        assert cached.data == response.data
+
+        response = api_client.get(self.URL, {'category': '餐饮', 'page_size': 2, 'page': 2})
+        assert len(response.data['data']) == 1
+
+        # 商户档案变更后缓存失效
+        with django_capture_on_commit_callbacks(execute=True):
+            MerchantProfileFactory(shop_category='餐饮')
+        response = api_client.get(self.URL, {'category': '餐饮', 'page_size': 2})
+        assert response.data['pagination']['total'] == 4
+
+        assert api_client.get(self.URL, {'page': 'x'}).status_code == 400
+
+
+class TestMerchantSalesStats:
+    """商户日销售汇总与统计接口测试"""
+
+    URL = '/api/merchant/stats/'
+
+    def complete(self, merchant, amount, items):
+        from decimal import Decimal
+        order = MerchantOrderFactory(merchant=merchant, status='ready', actual_amount=Decimal(amount))
+        for product, quantity in items:
+            MerchantOrderItemFactory(
+                order=order, product=product, product_name=product.name,
+                product_price=product.price, quantity=quantity, subtotal=product.price * quantity,
+            )
+        order.complete_order()
+        return order
+
+    @pytest.mark.django_db
+    def test_complete_order_updates_rollup_and_rebuild_matches(self):
+        """测试订单完成时累加日汇总，重建结果与增量结果一致"""
+        from decimal import Decimal
+        from merchant.models import MerchantDailySales
+        from merchant.sales_stats_service import MerchantSalesService
+
+        merchant = MerchantProfileFactory()
+        latte = MerchantProductFactory(merchant=merchant, price=Decimal('12.00'))
+        cake = MerchantProductFactory(merchant=merchant, price=Decimal('20.00'))
+        self.complete(merchant, '44.00', [(latte, 2), (cake, 1)])
+        self.complete(merchant, '12.00', [(latte, 1)])
+        # 未完成的订单不计入
+        MerchantOrderFactory(merchant=merchant, status='ready')
+
+        rollup = MerchantDailySales.objects.get(merchant=merchant, day=timezone.localdate())
+        assert rollup.order_count == 2
+        assert rollup.revenue == Decimal('56.00')
+        assert rollup.items_sold == 4
+        assert rollup.product_sales[str(latte.id)]['quantity'] == 3
+        assert Decimal(rollup.product_sales[str(latte.id)]['revenue']) == Decimal('36.00')
+
+        incremental = list(MerchantDailySales.objects.values_list(
+            'merchant_id', 'day', 'order_count', 'revenue', 'items_sold'
+        ))
+        assert MerchantSalesService.rebuild() == 1
+        assert list(MerchantDailySales.objects.values_list(
+            'merchant_id', 'day', 'order_count', 'revenue', 'items_sold'
+        )) == incremental
+
+    @pytest.mark.django_db
+    def test_stats_endpoint_serves_trends_from_rollup(self, api_client, django_assert_num_queries):
+        """测试统计接口按完成日期返回 7/30/365 天趋势和商品排行"""
+        from decimal import Decimal
+        from merchant.sales_stats_service import MerchantSalesService
+
+        merchant = MerchantProfileFactory(user=UserFactory(role=2))
+        latte = MerchantProductFactory(merchant=merchant, price=Decimal('10.00'))
+        cake = MerchantProductFactory(merchant=merchant, price=Decimal('30.00'))
+        self.complete(merchant, '30.00', [(cake, 1)])
+        self.complete(merchant, '20.00', [(latte, 2)])
+        # 10 天前下单、3 天前完成的订单按完成日期统计
+        old = self.complete(merchant, '50.00', [(latte, 5)])
+        MerchantOrder.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=10), completed_at=timezone.now() - timedelta(days=3)
+        )
+        MerchantSalesService.rebuild(merchant.id)
+
+        api_client.force_authenticate(user=merchant.user)
+        with django_assert_num_queries(3):
+            response = api_client.get(self.URL)
+        assert response.status_code == 200
+        data = response.data['data']
+        assert data['todayRevenue'] == 50.0
+        assert data['summary'] == {'orders': 3, 'revenue': 100.0, 'itemsSold': 8}
+        assert len(data['salesTrend']) == 7
+        assert data['salesTrend'][-1]['amount'] == 50.0
+        assert data['salesTrend'][-4]['amount'] == 50.0
+        assert [p['product_id'] for p in data['topProducts']] == [latte.id, cake.id]
+        assert data['topProducts'][0]['quantity'] == 7
+
+        response = api_client.get(self.URL, {'days': 30})
+        assert len(response.data['data']['salesTrend']) == 30
+
+        response = api_client.get(self.URL, {'days': 365})
+        trend = response.data['data']['salesTrend']
+        assert trend[-1]['date'] == timezone.localdate().strftime('%Y-%m')
+        assert sum(point['amount'] for point in trend) == 100.0
+
+        assert api_client.get(self.URL, {'days': 5}).status_code == 400
+
+
+class TestProductCatalog:
+    """公开商品目录测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def list_url(self, merchant):
+        return f'/api/merchant/products/public/{merchant.id}/'
+
+    @pytest.mark.django_db
+    def test_cursor_pagination_walks_all_products(self, api_client):
+        """测试游标分页按创建时间倒序无重复地遍历全部上架商品"""
+        merchant = MerchantProfileFactory()
+        products = [MerchantProductFactory(merchant=merchant, status='online', category='饮品') for _ in range(5)]
+        # 创建时间相同时按 ID 排序
+        MerchantProduct.objects.filter(id__in=[p.id for p in products[:3]]).update(created_at=products[0].created_at)
+        MerchantProductFactory(merchant=merchant, status='offline')
+        MerchantProductFactory(merchant=merchant, status='online', category='甜品')
+
+        seen, cursor = [], ''
+        while True:
+            response = api_client.get(self.list_url(merchant), {'category': '饮品', 'page_size': 2, 'cursor': cursor})
+            assert response.status_code == 200
+            seen.extend(item['id'] for item in response.data['data'])
+            if not response.data['pagination']['has_more']:
+                break
+            cursor = response.data['pagination']['next_cursor']
+
+        expected = MerchantProduct.objects.filter(merchant=merchant, category='饮品', status='online').order_by(
+            '-created_at', '-id'
+        ).values_list('id', flat=True)
+        assert seen == list(expected)
+
+        assert api_client.get(self.list_url(merchant), {'cursor': 'bad'}).status_code == 400
+        assert api_client.get('/api/merchant/products/public/999999/').status_code == 404
+
+    @pytest.mark.django_db
+    def test_responses_are_cached_and_revalidated(self, api_client, django_assert_num_queries,
+                                                  django_capture_on_commit_callbacks, monkeypatch):
+        """测试列表和详情缓存、ETag/Last-Modified 条件请求及商品变更后失效"""
+        merchant = MerchantProfileFactory()
+        product = MerchantProductFactory(merchant=merchant, status='online', name='拿铁')
+
+        response = api_client.get(self.list_url(merchant))
+        etag = response['ETag']
+        assert response['Last-Modified']
+        with django_assert_num_queries(0):
+            cached = api_client.get(self.list_url(merchant))
+        assert cached['ETag'] == etag
+        assert cached.data == response.data
+
+        assert api_client.get(self.list_url(merchant), HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert api_client.get(
+            self.list_url(merchant), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+        detail_url = f'/api/merchant/product/public/{product.id}/'
+        detail = api_client.get(detail_url)
+        assert detail.data['data']['name'] == '拿铁'
+        assert api_client.get(detail_url, HTTP_IF_NONE_MATCH=detail['ETag']).status_code == 304
+
+        # 扣库存用 UPDATE 完成不更新 updated_at，缓存过期重建后 Last-Modified 同样前进
+        from django.core.cache import cache
+        from django.db.models import F
+        MerchantProduct.objects.filter(id=product.id).update(stock=F('stock') - 1)
+        cache.clear()
+        later = timezone.now() + timedelta(seconds=5)
+        monkeypatch.setattr('merchant.product_catalog_service.timezone.now', lambda: later)
+        rebuilt = api_client.get(self.list_url(merchant), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert rebuilt.status_code == 200
+        assert rebuilt['ETag'] != etag
+        assert api_client.get(detail_url, HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']).status_code == 200
+
+        # 下架后列表和详情都失效
+        with django_capture_on_commit_callbacks(execute=True):
+            product.toggle_status()
+        response = api_client.get(self.list_url(merchant), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data['data'] == []
+        assert api_client.get(detail_url).status_code == 404
+
+        # 商户停用后列表返回 404
+        with django_capture_on_commit_callbacks(execute=True):
+            merchant.is_active = False
+            merchant.save()
+        assert api_client.get(self.list_url(merchant)).status_code == 404
@@ -1,11 +1,11 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import status, permissions, serializers
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
 from django.db import transaction, models
-from datetime import timedelta
 from .models import (
     MerchantApplication, MerchantProfile, MerchantProduct,
     MerchantOrder, MerchantOrderItem, MerchantCoupon, UserCoupon, CartItem
@@ -20,6 +20,11 @@ from .serializers import (
     OrderCreateSerializer, LogoUploadSerializer, CartItemSerializer,
     CartItemAddSerializer
 )
+from users.token_service import TokenService
+from .coupon_claim_service import CouponClaimService
+from .merchant_listing_service import MerchantListingService
+from .sales_stats_service import MerchantSalesService
+from .product_catalog_service import InvalidCursor, ProductCatalogService
 import logging
 from django.contrib.auth.hashers import make_password
 
@@ -515,7 +520,7 @@ class MerchantLoginView(APIView):
                 )
             
             # 生成token
-            token = f"merchant_token_{user.id}_verified"
+            token = TokenService.issue(user, 'merchant')
 
             # 构建头像完整URL
             avatar_url = None
@@ -842,23 +847,32 @@ class PublicMerchantListView(APIView):
     permission_classes = []  # 不需要登录
     
     def get(self, request):
-        """获取所有启用的商户列表"""
+        """分页获取启用的商户列表"""
         try:
             # 获取查询参数
             category = request.GET.get('category', '')
+            try:
+                page = max(int(request.GET.get('page', 1)), 1)
+                page_size = int(request.GET.get('page_size', MerchantListingService.DEFAULT_PAGE_SIZE))
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'message': '分页参数无效'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            page_size = min(max(page_size, 1), MerchantListingService.MAX_PAGE_SIZE)
             
-            # 构建查询 - 只返回启用的商户
-            queryset = MerchantProfile.objects.filter(is_active=True)
-            
-            if category:
-                queryset = queryset.filter(shop_category=category)
-            
-            merchants = queryset.order_by('-created_at')
-            serializer = MerchantProfileSerializer(merchants, many=True, context={'request': request})
+            result = MerchantListingService.get_page(request, category, page, page_size)
             
+            # data 保持为商户数组，兼容小程序现有解析逻辑
             return Response({
                 'success': True,
-                'data': serializer.data
+                'data': result['items'],
+                'pagination': {
+                    'total': result['total'],
+                    'page': result['page'],
+                    'page_size': result['page_size'],
+                    'total_pages': result['total_pages'],
+                }
             })
             
         except Exception as e:
@@ -899,45 +913,70 @@ class PublicMerchantDetailView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def catalog_response(request, cached, body):
+    """
+    返回带 ETag / Last-Modified 的商品目录响应
+
+    客户端带 If-None-Match（优先）或 If-Modified-Since 且内容未变时返回 304，不重复传输响应体。
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        not_modified = cached['etag'] in if_none_match or if_none_match.strip() == '*'
+    else:
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        not_modified = if_modified_since is not None and cached['last_modified'] <= if_modified_since
+    
+    response = Response(status=status.HTTP_304_NOT_MODIFIED) if not_modified else Response(body)
+    response['ETag'] = cached['etag']
+    response['Last-Modified'] = http_date(cached['last_modified'])
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 class PublicProductListView(APIView):
     """公开的商品列表接口（供小程序使用）"""
     
     permission_classes = []  # 不需要登录
     
     def get(self, request, merchant_id):
-        """获取指定商户的商品列表"""
+        """游标分页获取指定商户的商品列表"""
         try:
-            # 验证商户是否存在且启用
-            try:
-                merchant = MerchantProfile.objects.get(id=merchant_id, is_active=True)
-            except MerchantProfile.DoesNotExist:
-                return Response({
-                    'success': False,
-                    'message': '商户不存在或已停用'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
             # 获取查询参数
             category = request.GET.get('category', '')
             status_filter = request.GET.get('status', 'online')  # 默认只显示上架商品
+            cursor = request.GET.get('cursor', '')
+            try:
+                page_size = int(request.GET.get('page_size', ProductCatalogService.DEFAULT_PAGE_SIZE))
+            except ValueError:
+                page_size = 0
+            page_size = min(max(page_size, 1), ProductCatalogService.MAX_PAGE_SIZE)
             
-            # 构建查询
-            queryset = MerchantProduct.objects.filter(merchant=merchant)
-            
-            if category:
-                queryset = queryset.filter(category=category)
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
+            try:
+                cached = ProductCatalogService.get_list(
+                    request, merchant_id, category, status_filter, cursor, page_size
+                )
+            except InvalidCursor:
+                return Response({
+                    'success': False,
+                    'message': '分页游标无效'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            products = queryset.order_by('-created_at')
-            serializer = MerchantProductSerializer(
-                products, 
-                many=True,
-                context={'request': request}
-            )
+            # 验证商户是否存在且启用
+            if cached is None:
+                return Response({
+                    'success': False,
+                    'message': '商户不存在或已停用'
+                }, status=status.HTTP_404_NOT_FOUND)
             
-            return Response({
+            # data 保持为商品数组，兼容小程序现有解析逻辑
+            return catalog_response(request, cached, {
                 'success': True,
-                'data': serializer.data
+                'data': cached['items'],
+                'pagination': {
+                    'next_cursor': cached['next_cursor'],
+                    'has_more': cached['has_more'],
+                    'page_size': page_size,
+                }
             })
             
         except Exception as e:
@@ -956,23 +995,17 @@ class PublicProductDetailView(APIView):
     def get(self, request, product_id):
         """获取商品详情"""
         try:
-            try:
-                # 只返回上架的商品
-                product = MerchantProduct.objects.get(
-                    id=product_id, 
-                    status='online',
-                    merchant__is_active=True  # 商户也必须是启用状态
-                )
-            except MerchantProduct.DoesNotExist:
+            # 只返回上架且商户启用的商品
+            cached = ProductCatalogService.get_detail(request, product_id)
+            if cached is None:
                 return Response({
                     'success': False,
                     'message': '商品不存在或已下架'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            serializer = MerchantProductSerializer(product, context={'request': request})
-            return Response({
+            return catalog_response(request, cached, {
                 'success': True,
-                'data': serializer.data
+                'data': cached['item']
             })
             
         except Exception as e:
@@ -1145,16 +1178,27 @@ class OrderStatusUpdateView(APIView):
             
             # 更新状态
             from django.utils import timezone
-            order.status = new_status
-            
-            if new_status == 'accepted':
-                order.accepted_at = timezone.now()
-            elif new_status == 'completed':
-                order.completed_at = timezone.now()
+            if new_status == 'completed':
+                # 完成订单时同时累加商户统计，订单状态已被并发修改（如已取消）时不生效
+                if not order.complete_order([current_status]):
+                    return Response({
+                        'success': False,
+                        'message': '订单状态已变更，请刷新后重试'
+                    }, status=status.HTTP_400_BAD_REQUEST)
             elif new_status == 'cancelled':
-                order.reject_reason = reject_reason
-            
-            order.save()
+                # 取消和退回库存在同一事务内完成，订单状态已被并发修改时不重复退回
+                if not order.cancel_order([current_status], reject_reason):
+                    return Response({
+                        'success': False,
+                        'message': '订单状态已变更，请刷新后重试'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                order.status = new_status
+                
+                if new_status == 'accepted':
+                    order.accepted_at = timezone.now()
+                
+                order.save()
             
             return Response({
                 'success': True,
@@ -1218,8 +1262,12 @@ class PickupCodeVerifyView(APIView):
                     'message': '取餐码无效或订单已完成'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # 完成订单
-            order.complete_order()
+            # 完成订单，查询后订单被取消或已被核销时不生效
+            if not order.complete_order():
+                return Response({
+                    'success': False,
+                    'message': '订单状态已变更，无法核销'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             return Response({
                 'success': True,
@@ -1396,45 +1444,41 @@ class CouponReceiveView(APIView):
             
             coupon_id = serializer.validated_data['coupon_id']
             
-            try:
-                coupon = MerchantCoupon.objects.get(id=coupon_id)
-            except MerchantCoupon.DoesNotExist:
+            # 在 Redis 中原子地检查发放数量和每人限领数量，领取记录由 flush_coupon_claims 异步入库
+            result, data = CouponClaimService.claim(request.user.id, coupon_id)
+            
+            if result == CouponClaimService.NOT_FOUND:
                 return Response({
                     'success': False,
                     'message': '优惠券不存在'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # 检查优惠券是否有效
-            if not coupon.is_valid:
+            if result == CouponClaimService.LIMIT_REACHED:
                 return Response({
                     'success': False,
-                    'message': '优惠券已失效或数量不足'
+                    'message': f'您已达到该优惠券的领取上限（{data["per_user_limit"]}张）'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # 检查用户领取数量限制
-            user_received_count = UserCoupon.objects.filter(user=request.user, coupon=coupon).count()
-            if user_received_count >= coupon.per_user_limit:
+            if result != CouponClaimService.CLAIMED:
                 return Response({
                     'success': False,
-                    'message': f'您已达到该优惠券的领取上限（{coupon.per_user_limit}张）'
+                    'message': '优惠券已失效或数量不足'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # 使用事务确保数据一致性
-            with transaction.atomic():
-                # 创建用户优惠券记录
-                user_coupon = UserCoupon.objects.create(
-                    user=request.user,
-                    coupon=coupon
-                )
-                
-                # 更新优惠券使用数量
-                coupon.used_count += 1
-                coupon.save()
-            
             return Response({
                 'success': True,
                 'message': '优惠券领取成功',
-                'data': UserCouponSerializer(user_coupon, context={'request': request}).data
+                'data': {
+                    'coupon': coupon_id,
+                    'coupon_info': {
+                        'id': coupon_id,
+                        'name': CouponClaimService.get_meta(coupon_id)['name'],
+                    },
+                    'status': 'unused',
+                    'status_display': '未使用',
+                    'verification_code': data['verification_code'],
+                    'received_at': data['received_at'],
+                }
             })
             
         except Exception as e:
@@ -1608,8 +1652,15 @@ class OrderCreateView(APIView):
                     'errors': serializer.errors
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # 创建订单
-            order = serializer.save()
+            # 创建订单（商品不存在、已下架、库存不足或优惠券不可用时整单回滚）
+            try:
+                order = serializer.save()
+            except serializers.ValidationError as e:
+                detail = e.detail[0] if isinstance(e.detail, list) else e.detail
+                return Response({
+                    'success': False,
+                    'message': str(detail),
+                }, status=status.HTTP_400_BAD_REQUEST)
 
             # 返回订单详情
             order_data = MerchantOrderSerializer(order, context={'request': request}).data
@@ -1732,9 +1783,12 @@ class UserOrderDetailView(APIView):
                     'message': '订单状态不允许取消'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # 更新订单状态
-            order.status = 'cancelled'
-            order.save()
+            # 更新订单状态并退回库存，订单已被商户接单或取消时不生效
+            if not order.cancel_order(['new']):
+                return Response({
+                    'success': False,
+                    'message': '订单状态不允许取消'
+                }, status=status.HTTP_400_BAD_REQUEST)
 
             # 如果使用了优惠券，退还优惠券
             if order.used_coupon:
@@ -1785,50 +1839,44 @@ class MerchantStatsView(APIView):
                     'message': '商户档案不存在'
                 }, status=status.HTTP_404_NOT_FOUND)
 
-            # 获取当前时间
-            now = timezone.now()
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            # 统计天数：7 / 30 / 365
+            try:
+                days = int(request.GET.get('days', 7))
+            except ValueError:
+                days = 0
+            if days not in MerchantSalesService.TREND_DAYS:
+                return Response({
+                    'success': False,
+                    'message': '统计天数只支持 7、30、365'
+                }, status=status.HTTP_400_BAD_REQUEST)
 
             # 今日订单统计
+            today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
             today_orders = MerchantOrder.objects.filter(
                 merchant=merchant_profile,
                 created_at__gte=today_start
+            ).aggregate(
+                total=models.Count('id'),
+                pending=models.Count('id', filter=models.Q(status='new')),
             )
 
-            # 今日营业额（已完成订单）
-            today_completed_orders = today_orders.filter(status='completed')
-            today_revenue = today_completed_orders.aggregate(
-                total=models.Sum('actual_amount')
-            )['total'] or 0
-
-            # 待处理订单（新订单）
-            pending_orders = today_orders.filter(status='new').count()
-
-            # 近7天销售趋势
-            sales_trend = []
-            for i in range(7):
-                date = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-                next_date = date + timedelta(days=1)
-
-                daily_revenue = MerchantOrder.objects.filter(
-                    merchant=merchant_profile,
-                    status='completed',
-                    created_at__gte=date,
-                    created_at__lt=next_date
-                ).aggregate(total=models.Sum('actual_amount'))['total'] or 0
-
-                sales_trend.insert(0, {
-                    'date': date.strftime('%m-%d'),
-                    'amount': float(daily_revenue)
-                })
+            # 营业额、趋势和商品排行读取日销售汇总表（按完成日期统计）
+            stats = MerchantSalesService.get_stats(merchant_profile.id, days)
 
             return Response({
                 'success': True,
                 'data': {
-                    'todayOrders': today_orders.count(),
-                    'todayRevenue': float(today_revenue),
-                    'pendingOrders': pending_orders,
-                    'salesTrend': sales_trend
+                    'todayOrders': today_orders['total'],
+                    'todayRevenue': stats['today_revenue'],
+                    'pendingOrders': today_orders['pending'],
+                    'days': days,
+                    'summary': {
+                        'orders': stats['summary']['orders'],
+                        'revenue': stats['summary']['revenue'],
+                        'itemsSold': stats['summary']['items_sold'],
+                    },
+                    'salesTrend': stats['sales_trend'],
+                    'topProducts': stats['top_products'],
                 }
             })
 
@@ -0,0 +1,278 @@
+from datetime import datetime
+from django.conf import settings
+from django.utils import timezone
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from common.redis_stream import StreamConsumer, get_redis_client
+from .models import AccessLog
+from .access_log_service import AccessLogIngestService
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLogBufferService:
+    """
+    门禁日志写后缓冲
+
+    上报接口只做校验并把事件追加到 Redis Stream，不等待数据库提交；
+    Redis 不可用时追加到本地暂存文件（按进程、按分钟切分的 NDJSON）。
+    flush_access_logs 进程通过消费组读取事件批量入库，入库成功后才 XACK，
+    进程中途退出时未确认的消息会被重新认领，重复写入由 (device_id, timestamp, sequence) 去重，
+    因此投递语义为至少一次、入库结果恰好一次。
+    """
+
+    STREAM = 'property:access_log:stream'
+    GROUP = 'access_log_flusher'
+    FIELD = 'e'
+    CLAIM_IDLE_MS = 60000  # 超过该时间未确认的消息视为消费者已退出
+    SPOOL_STALE_SECONDS = 600  # 暂存文件认领后超过该时间未删除视为处理进程已退出
+
+    _spool_lock = threading.Lock()
+
+    # ---------- 上报端 ----------
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.ACCESS_LOG_WRITE_BEHIND
+
+    @classmethod
+    def get_client(cls):
+        return get_redis_client()
+
+    @classmethod
+    def get_consumer(cls, client):
+        return StreamConsumer(client, cls.STREAM, cls.GROUP, cls.FIELD, cls.CLAIM_IDLE_MS)
+
+    @staticmethod
+    def to_payload(log):
+        return json.dumps({
+            'person_name': log.person_name,
+            'method': log.method,
+            'direction': log.direction,
+            'location': log.location,
+            'person_type': log.person_type,
+            'timestamp': log.timestamp.isoformat(),
+            'device_id': log.device_id,
+            'sequence': log.sequence,
+            'success': log.success,
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def from_payload(payload):
+        data = json.loads(payload)
+        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return AccessLog(**data)
+
+    @classmethod
+    def ingest(cls, events):
+        """校验并缓冲事件，返回与 AccessLogIngestService.ingest 相同结构，校验通过的事件状态为 202"""
+        results, errors, valid = AccessLogIngestService.validate(events)
+        if valid:
+            cls.append([log for _, log in valid])
+            for index, _ in valid:
+                results[index] = AccessLogIngestService.STATUS_QUEUED
+        return AccessLogIngestService.summarize(results, errors)
+
+    @classmethod
+    def append(cls, logs):
+        """追加到 Redis Stream，失败时写本地暂存文件，返回实际使用的通道"""
+        payloads = [cls.to_payload(log) for log in logs]
+        client = cls.get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for payload in payloads:
+                    pipe.xadd(cls.STREAM, {cls.FIELD: payload})
+                pipe.execute()
+                return 'stream'
+            except Exception as e:
+                logger.warning(f"门禁日志写入 Redis Stream 失败，改写本地暂存文件: {e}")
+
+        cls.spool(payloads)
+        return 'spool'
+
+    @classmethod
+    def spool_dir(cls):
+        path = settings.ACCESS_LOG_SPOOL_DIR
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @classmethod
+    def spool(cls, payloads):
+        """追加到当前进程当前分钟的暂存文件，刷盘后返回"""
+        name = f"spool-{timezone.now():%Y%m%d%H%M}-{os.getpid()}.ndjson"
+        path = os.path.join(cls.spool_dir(), name)
+        with cls._spool_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(payloads) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    @classmethod
+    def backlog(cls):
+        """待入库事件数（Stream 长度），Redis 不可用时返回 0"""
+        client = cls.get_client()
+        if client is None:
+            return 0
+        try:
+            return cls.get_consumer(client).length()
+        except Exception:
+            return 0
+
+    @classmethod
+    def is_overloaded(cls):
+        """积压超过上限时上报接口返回 503，由设备端本地缓存后重试"""
+        return cls.backlog() >= settings.ACCESS_LOG_MAX_BACKLOG
+
+    # ---------- 入库端 ----------
+
+    @classmethod
+    def flush_stream(cls, consumer, count=5000, block_ms=1000):
+        """从消费组读取一批事件入库，返回 {'created', 'duplicates', 'invalid'}；Redis 不可用时返回 None"""
+        client = cls.get_client()
+        if client is None:
+            return None
+        stream = cls.get_consumer(client)
+
+        entries = stream.read(consumer, count, block_ms)
+        if not entries:
+            return {'created': 0, 'duplicates': 0, 'invalid': 0}
+
+        logs, invalid = [], 0
+        for _, payload in entries:
+            try:
+                logs.append(cls.from_payload(payload))
+            except (TypeError, ValueError) as e:
+                invalid += 1
+                logger.error(f"丢弃无法解析的门禁事件: {payload!r}, {e}")
+
+        statuses = AccessLogIngestService.write(logs)
+
+        # 入库完成后再确认并删除，确认前退出的消息会被重新投递
+        stream.ack([message_id for message_id, _ in entries])
+        return cls._flush_result(statuses, invalid)
+
+    @classmethod
+    def flush_spool(cls, include_current=False):
+        """
+        导入本地暂存文件，返回 {'created', 'duplicates', 'invalid'}
+
+        默认只处理上一分钟及更早的文件，当前分钟的文件可能仍在被写入；文件全部入库后才删除。
+        每个文件先改名为 .processing 认领，多个 flush 进程同时运行时同一文件只会被一个进程读取；
+        认领后长时间未删除的文件视为处理进程已退出，重新认领（重复写入按事件去重）。
+        """
+        current = None if include_current else f"spool-{timezone.now():%Y%m%d%H%M}-"
+        created, duplicates, invalid = 0, 0, 0
+
+        paths = sorted(glob.glob(os.path.join(cls.spool_dir(), 'spool-*.ndjson')))
+        paths += cls.stale_processing_files()
+        for path in paths:
+            if current and os.path.basename(path).startswith(current):
+                continue
+
+            processing = cls.claim_spool_file(path)
+            if processing is None:
+                continue
+
+            logs = []
+            with open(processing, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        logs.append(cls.from_payload(line))
+                    except (TypeError, ValueError) as e:
+                        invalid += 1
+                        logger.error(f"丢弃无法解析的门禁事件: {line!r}, {e}")
+
+            statuses = AccessLogIngestService.write(logs)
+            created += statuses.count(AccessLogIngestService.STATUS_CREATED)
+            duplicates += statuses.count(AccessLogIngestService.STATUS_DUPLICATE)
+            try:
+                os.remove(processing)
+            except FileNotFoundError:
+                pass  # 处理超时后已被其他进程重新认领
+
+        return {'created': created, 'duplicates': duplicates, 'invalid': invalid}
+
+    @classmethod
+    def claim_spool_file(cls, path):
+        """把暂存文件改名为当前进程的 .processing 文件，返回新路径；已被其他进程认领时返回 None"""
+        base = path.split('.ndjson', 1)[0]
+        processing = f"{base}.ndjson.{os.getpid()}.processing"
+        try:
+            os.rename(path, processing)
+        except FileNotFoundError:
+            return None
+        # 改名不更新修改时间，刷新后用于判断认领是否过期
+        os.utime(processing)
+        return processing
+
+    @classmethod
+    def stale_processing_files(cls):
+        deadline = time.time() - cls.SPOOL_STALE_SECONDS
+        stale = []
+        for path in sorted(glob.glob(os.path.join(cls.spool_dir(), 'spool-*.processing'))):
+            try:
+                if os.path.getmtime(path) < deadline:
+                    stale.append(path)
+            except FileNotFoundError:
+                continue
+        return stale
+
+    @staticmethod
+    def _flush_result(statuses, invalid):
+        return {
+            'created': statuses.count(AccessLogIngestService.STATUS_CREATED),
+            'duplicates': statuses.count(AccessLogIngestService.STATUS_DUPLICATE),
+            'invalid': invalid,
+        }
+
+    # ---------- 监控 ----------
+
+    @staticmethod
+    def file_size(path):
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            # 统计期间被入库进程删除
+            return 0
+
+    @classmethod
+    def get_metrics(cls):
+        """积压指标：Stream 长度、未确认数、最早事件滞留秒数、暂存文件数量和大小"""
+        spool_files = glob.glob(os.path.join(cls.spool_dir(), 'spool-*.ndjson*'))
+        metrics = {
+            'write_behind': cls.is_enabled(),
+            'redis_available': False,
+            'stream_length': 0,
+            'pending': 0,
+            'oldest_lag_seconds': 0,
+            'spool_files': len(spool_files),
+            'spool_bytes': sum(cls.file_size(path) for path in spool_files),
+            'max_backlog': settings.ACCESS_LOG_MAX_BACKLOG,
+        }
+
+        client = cls.get_client()
+        if client is not None:
+            try:
+                stream = cls.get_consumer(client)
+                metrics['stream_length'] = stream.length()
+                oldest = client.xrange(cls.STREAM, count=1)
+                if oldest:
+                    message_id = oldest[0][0]
+                    message_id = message_id.decode() if isinstance(message_id, bytes) else message_id
+                    millis = int(message_id.split('-')[0])
+                    metrics['oldest_lag_seconds'] = max(0, round(time.time() - millis / 1000, 1))
+                metrics['pending'] = stream.pending()
+                metrics['redis_available'] = True
+            except Exception as e:
+                logger.warning(f"获取门禁日志缓冲指标失败: {e}")
+
+        metrics['overloaded'] = metrics['stream_length'] >= metrics['max_backlog']
+        return metrics
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PropertyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "property"
+
+    def ready(self):
+        # 注册工作台统计缓存失效信号
+        from . import signals  # noqa: F401
@@ -0,0 +1,178 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import date, timedelta
+import hashlib
+import json
+import logging
+
+from .models import BillingJob, Building, FeeStandard
+from .billing_service import BillGenerationService, BillReminderService
+
+logger = logging.getLogger(__name__)
+
+
+class BillingJobService:
+    """缴费后台任务服务：提交、领取、执行"""
+
+    # 执行中的任务超过该时长未更新视为工作进程已退出，可被重新领取（秒）
+    STALE_AFTER = 600
+
+    @classmethod
+    def _make_key(cls, *parts):
+        """拼接幂等键，超长时取摘要"""
+        key = ':'.join(str(part) for part in parts)
+        if len(key) > 191:
+            key = f"{parts[0]}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+        return key
+
+    @classmethod
+    def _submit(cls, job_type, key, params, user=None):
+        """
+        按幂等键提交任务，返回 (job, created)
+
+        已存在的任务直接返回；失败的任务重置为排队状态以便重试。
+        """
+        job, created = BillingJob.objects.get_or_create(
+            idempotency_key=key,
+            defaults={
+                'job_type': job_type,
+                'params': params,
+                'created_by': user if user and user.is_authenticated else None,
+            }
+        )
+        if not created and job.status == 'failed':
+            BillingJob.objects.filter(pk=job.pk, status='failed').update(
+                status='pending', progress=0, processed_count=0, errors=[], updated_at=timezone.now()
+            )
+            job.refresh_from_db()
+        return job, created
+
+    @classmethod
+    def submit_generate(cls, fee_standard, fee_type, billing_year, billing_month, target_buildings=None, user=None):
+        """提交批量生成账单任务，幂等键为 (费用类型, 账期, 楼栋范围)"""
+        buildings = sorted(set(target_buildings or []))
+        key = cls._make_key(
+            'generate_bills', fee_type, f"{billing_year}{billing_month:02d}", ','.join(buildings) or '*'
+        )
+        params = {
+            'fee_standard_id': fee_standard.id,
+            'fee_type': fee_type,
+            'billing_year': billing_year,
+            'billing_month': billing_month,
+            'target_buildings': buildings,
+        }
+        return cls._submit('generate_bills', key, params, user)
+
+    @classmethod
+    def submit_reminders(cls, bill_ids, message_template, user=None):
+        """提交批量催缴任务，同一天相同账单和内容只发送一次"""
+        bill_ids = sorted(set(bill_ids))
+        digest = hashlib.sha1(json.dumps([bill_ids, message_template]).encode('utf-8')).hexdigest()
+        key = cls._make_key('send_reminders', date.today().strftime('%Y%m%d'), digest)
+        params = {
+            'bill_ids': bill_ids,
+            'message_template': message_template,
+        }
+        return cls._submit('send_reminders', key, params, user)
+
+    @classmethod
+    def claim_next(cls):
+        """领取一个待执行任务并标记为执行中，没有任务时返回 None"""
+        stale_before = timezone.now() - timedelta(seconds=cls.STALE_AFTER)
+        with transaction.atomic():
+            job = BillingJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') | Q(status='running', updated_at__lt=stale_before)
+            ).order_by('created_at').first()
+            if job is None:
+                return None
+
+            job.status = 'running'
+            job.attempts += 1
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+        return job
+
+    @classmethod
+    def _update(cls, job, **fields):
+        """只更新进度相关字段，避免覆盖其他列"""
+        for name, value in fields.items():
+            setattr(job, name, value)
+        BillingJob.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+
+    @classmethod
+    def run(cls, job):
+        """执行任务，结束后更新最终状态"""
+        handlers = {
+            'generate_bills': cls._run_generate,
+            'send_reminders': cls._run_reminders,
+        }
+        try:
+            handlers[job.job_type](job)
+        except Exception as e:
+            logger.exception(f"缴费任务执行失败: {job.id}")
+            cls._update(job, errors=job.errors + [{'error': str(e)}])
+
+        cls._update(
+            job,
+            status='failed' if job.errors else 'succeeded',
+            finished_at=timezone.now()
+        )
+        logger.info(f"缴费任务 {job.id} 执行结束: {job.status}")
+        return job
+
+    @classmethod
+    def _run_generate(cls, job):
+        """按楼栋逐个生成账单，每栋一个事务；已有账单的房屋自动跳过，重试不会重复出账"""
+        params = job.params
+        fee_standard = FeeStandard.objects.get(id=params['fee_standard_id'])
+        buildings = params.get('target_buildings') or list(
+            Building.objects.order_by('name').values_list('name', flat=True)
+        )
+
+        building_counts = dict(job.result.get('building_counts', {}))
+        errors = []
+        cls._update(job, total_count=len(buildings), processed_count=0, errors=[])
+
+        for index, building_name in enumerate(buildings, start=1):
+            try:
+                result = BillGenerationService.generate(
+                    fee_standard, params['fee_type'], params['billing_year'], params['billing_month'],
+                    [building_name], skip_existing=True
+                )
+                building_counts[building_name] = building_counts.get(building_name, 0) + result['generated_count']
+            except Exception as e:
+                logger.error(f"楼栋 {building_name} 生成账单失败: {e}")
+                errors.append({'building': building_name, 'error': str(e)})
+
+            cls._update(
+                job,
+                processed_count=index,
+                progress=index * 100 // len(buildings),
+                result={
+                    'generated_count': sum(building_counts.values()),
+                    'building_counts': building_counts,
+                },
+                errors=errors
+            )
+
+        if not buildings:
+            cls._update(job, progress=100, result={'generated_count': 0, 'building_counts': {}})
+
+    @classmethod
+    def _run_reminders(cls, job):
+        """批量发送催缴通知，任务创建后已发送过的账单在重试时跳过"""
+        params = job.params
+        cls._update(job, total_count=len(params['bill_ids']), processed_count=0, errors=[])
+
+        def on_progress(processed, total):
+            cls._update(
+                job,
+                processed_count=processed,
+                progress=processed * 100 // total if total else 100
+            )
+
+        sent = BillReminderService.send(
+            params['bill_ids'], params['message_template'], on_progress, skip_reminded_since=job.created_at
+        )
+        cls._update(job, result={'sent_count': job.result.get('sent_count', 0) + sent})
@@ -0,0 +1,398 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+
+from common.sequence_service import SequenceService
+from .models import Bill, BillStatsRollup, House, HouseUserBinding
+from .dashboard_service import DashboardService
+
+logger = logging.getLogger(__name__)
+
+
+class BillGenerationError(Exception):
+    """账单生成失败（业务错误，直接返回给调用方）"""
+    pass
+
+
+class BillGenerationService:
+    """账单批量生成服务"""
+
+    # 每批 bulk_create 的账单数量
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def get_billing_period(cls, billing_year, billing_month):
+        """计算计费周期和缴费截止日期（次月15日）"""
+        billing_period_start = date(billing_year, billing_month, 1)
+        if billing_month == 12:
+            next_month = date(billing_year + 1, 1, 1)
+        else:
+            next_month = date(billing_year, billing_month + 1, 1)
+        billing_period_end = next_month - timedelta(days=1)
+        due_date = next_month.replace(day=15)
+        return billing_period_start, billing_period_end, due_date
+
+    @classmethod
+    def calculate_amount(cls, fee_standard, house):
+        """按计费单位计算 (数量, 金额)"""
+        if fee_standard.billing_unit == 'per_sqm_month':
+            quantity = house.area
+            return quantity, quantity * fee_standard.unit_price
+        # 其他计费方式暂时按固定金额处理
+        return Decimal('1'), fee_standard.unit_price
+
+    @classmethod
+    def get_owner_bindings(cls, target_buildings=None, exclude_billed=None):
+        """
+        一次联表查询取出所有已绑定业主，每套房屋只保留最新的一条绑定
+
+        exclude_billed 为 Bill 查询条件时，排除已存在匹配账单的房屋。
+        """
+        bindings = HouseUserBinding.objects.filter(
+            status=1,  # 已绑定状态
+            identity=1,  # 业主身份
+            house__isnull=False
+        ).select_related('house__building').order_by('house_id', '-created_at', '-id')
+
+        if target_buildings:
+            bindings = bindings.filter(house__building__name__in=target_buildings)
+
+        if exclude_billed:
+            bindings = bindings.exclude(Exists(
+                Bill.objects.filter(house_id=OuterRef('house_id'), **exclude_billed)
+            ))
+
+        owners = {}
+        for binding in bindings.iterator(chunk_size=cls.BATCH_SIZE):
+            owners.setdefault(binding.house_id, binding)
+        return list(owners.values())
+
+    @classmethod
+    def count_targets(cls, target_buildings=None):
+        """待出账房屋数（已绑定业主的房屋），用于决定同步生成还是提交后台任务"""
+        bindings = HouseUserBinding.objects.filter(status=1, identity=1, house__isnull=False)
+        if target_buildings:
+            bindings = bindings.filter(house__building__name__in=target_buildings)
+        return bindings.values('house_id').distinct().count()
+
+    @classmethod
+    def allocate_bill_nos(cls, count, today=None):
+        """从当日账单序列中一次性预留 count 个账单号"""
+        return SequenceService.daily_numbers('bill', 'BILL', 8, count, today)
+
+    @classmethod
+    def generate(cls, fee_standard, fee_type, billing_year, billing_month, target_buildings=None, skip_existing=False):
+        """
+        为已绑定业主的房屋批量生成账单
+
+        skip_existing=True 时跳过本期已有账单的房屋（用于任务重试），否则存在账单即报错。
+        返回 {'generated_count': int, 'building_counts': {楼栋名: 数量}}
+        """
+        billing_period_start, billing_period_end, due_date = cls.get_billing_period(billing_year, billing_month)
+        period_filter = {
+            'fee_type': fee_type,
+            'billing_period_start': billing_period_start,
+            'billing_period_end': billing_period_end,
+        }
+
+        bindings = cls.get_owner_bindings(target_buildings, period_filter if skip_existing else None)
+        if not bindings:
+            if skip_existing:
+                return {'generated_count': 0, 'building_counts': {}}
+            raise BillGenerationError("没有符合条件的房屋可以生成账单")
+
+        # 检查是否已经生成过该期间的账单
+        if not skip_existing:
+            existing_bills = Bill.objects.filter(**period_filter)
+            if target_buildings:
+                existing_bills = existing_bills.filter(house__building__name__in=target_buildings)
+            if existing_bills.exists():
+                raise BillGenerationError(
+                    f"{billing_year}年{billing_month}月的{fee_standard.get_fee_type_display()}账单已存在"
+                )
+
+        title = f"{billing_year}年{billing_month}月{fee_standard.get_fee_type_display()}"
+        # 在写入事务之外预留账单号，序列计数器行锁不随整批写入持有
+        bill_nos = cls.allocate_bill_nos(len(bindings))
+
+        with transaction.atomic():
+            building_counts = {}
+            stats_deltas = BillStatsService.new_deltas()
+            batch = []
+
+            for binding, bill_no in zip(bindings, bill_nos):
+                house = binding.house
+                quantity, amount = cls.calculate_amount(fee_standard, house)
+
+                batch.append(Bill(
+                    bill_no=bill_no,
+                    title=title,
+                    fee_type=fee_type,
+                    house=house,
+                    user_id=binding.user_id,
+                    fee_standard=fee_standard,
+                    billing_period_start=billing_period_start,
+                    billing_period_end=billing_period_end,
+                    unit_price=fee_standard.unit_price,
+                    quantity=quantity,
+                    amount=amount,
+                    due_date=due_date,
+                    description=f"房屋地址：{house}，计费面积：{quantity}平米"
+                ))
+                building_name = house.building.name
+                building_counts[building_name] = building_counts.get(building_name, 0) + 1
+                delta = stats_deltas[(fee_type, billing_period_start, house.building_id, 'unpaid', due_date)]
+                delta[0] += 1
+                delta[1] += amount
+
+                if len(batch) >= cls.BATCH_SIZE:
+                    Bill.objects.bulk_create(batch)
+                    batch = []
+
+            if batch:
+                Bill.objects.bulk_create(batch)
+
+            # bulk_create 不会调用 save 和发送信号，按楼栋汇总后一次性累加到统计表并刷新工作台缓存
+            BillStatsService.apply(stats_deltas)
+            transaction.on_commit(DashboardService.invalidate)
+
+        logger.info(f"成功生成{len(bindings)}张{fee_standard.get_fee_type_display()}账单")
+
+        return {
+            'generated_count': len(bindings),
+            'building_counts': building_counts,
+        }
+
+
+class BillReminderService:
+    """账单催缴通知服务"""
+
+    # 每批写入的通知数量
+    BATCH_SIZE = 500
+
+    @classmethod
+    def build_content(cls, bill, message_template):
+        """构建催缴消息内容"""
+        house_info = f"{bill.house}" if bill.house else "您的房屋"
+        return f"尊敬的业主，{house_info}的{bill.get_fee_type_display()}（{bill.get_period_display()}）尚未缴费，" \
+               f"金额￥{bill.amount}，请于{bill.due_date}前完成缴费。{message_template}"
+
+    @classmethod
+    def send(cls, bill_ids, message_template, on_progress=None, skip_reminded_since=None):
+        """
+        为未支付账单批量创建催缴通知，返回发送条数
+
+        on_progress(processed, total) 在每批写入后回调，用于后台任务上报进度；
+        skip_reminded_since 指定时间后已催缴过的账单不再重复发送（任务重试时使用）。
+        """
+        from users.models import Notification
+
+        bills = Bill.objects.filter(
+            id__in=bill_ids, status='unpaid'
+        ).select_related('house__building').order_by('id')
+        if skip_reminded_since:
+            bills = bills.exclude(Exists(Notification.objects.filter(
+                notification_type='bill_reminder',
+                related_object_type='bill',
+                related_object_id=OuterRef('id'),
+                created_at__gte=skip_reminded_since
+            )))
+        total = len(bill_ids)
+        sent = 0
+        batch = []
+
+        for bill in bills.iterator(chunk_size=cls.BATCH_SIZE):
+            batch.append(Notification(
+                title="缴费催收通知",
+                content=cls.build_content(bill, message_template),
+                notification_type='bill_reminder',
+                recipient_id=bill.user_id,
+                related_object_type='bill',
+                related_object_id=bill.id
+            ))
+            if len(batch) >= cls.BATCH_SIZE:
+                Notification.objects.bulk_create(batch)
+                sent += len(batch)
+                batch = []
+                if on_progress:
+                    on_progress(sent, total)
+
+        if batch:
+            Notification.objects.bulk_create(batch)
+            sent += len(batch)
+
+        if on_progress:
+            on_progress(total, total)
+
+        logger.info(f"成功发送{sent}条催缴通知")
+        return sent
+
+
+class BillStatsService:
+    """账单统计汇总服务：维护 BillStatsRollup，并从汇总表生成统计数据"""
+
+    @classmethod
+    def new_deltas(cls):
+        """汇总键 -> [账单数, 应缴金额, 已缴金额] 的增量字典"""
+        return defaultdict(lambda: [0, Decimal('0'), Decimal('0')])
+
+    @classmethod
+    def record_change(cls, old_snapshot, new_snapshot):
+        """
+        根据单张账单变更前后的统计字段更新汇总表
+
+        新建时 old_snapshot 为 None，删除时 new_snapshot 为 None。
+        """
+        house_ids = {
+            snapshot['house_id'] for snapshot in (old_snapshot, new_snapshot)
+            if snapshot and snapshot['house_id']
+        }
+        building_ids = dict(
+            House.objects.filter(id__in=house_ids).values_list('id', 'building_id')
+        ) if house_ids else {}
+
+        deltas = cls.new_deltas()
+        for snapshot, sign in ((old_snapshot, -1), (new_snapshot, 1)):
+            if snapshot is None:
+                continue
+            key = (
+                snapshot['fee_type'],
+                snapshot['billing_period_start'],
+                building_ids.get(snapshot['house_id']),
+                snapshot['status'],
+                snapshot['due_date'],
+            )
+            delta = deltas[key]
+            delta[0] += sign
+            delta[1] += sign * Decimal(str(snapshot['amount'] or 0))
+            delta[2] += sign * Decimal(str(snapshot['paid_amount'] or 0))
+        cls.apply(deltas)
+
+    @classmethod
+    def apply(cls, deltas):
+        """把增量原子地累加到汇总表，行不存在时创建"""
+        for key, (count, amount, paid_amount) in deltas.items():
+            if not count and not amount and not paid_amount:
+                continue
+            fee_type, billing_period_start, building_id, status, due_date = key
+            lookup = {
+                'fee_type': fee_type,
+                'billing_period_start': billing_period_start,
+                'building_id': building_id,
+                'status': status,
+                'due_date': due_date,
+            }
+            increments = {
+                'bill_count': F('bill_count') + count,
+                'amount_total': F('amount_total') + amount,
+                'paid_amount_total': F('paid_amount_total') + paid_amount,
+            }
+            if BillStatsRollup.objects.filter(**lookup).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    BillStatsRollup.objects.create(
+                        bill_count=count, amount_total=amount, paid_amount_total=paid_amount, **lookup
+                    )
+            except IntegrityError:
+                # 并发创建了同一行，改为累加
+                BillStatsRollup.objects.filter(**lookup).update(**increments)
+
+    @classmethod
+    def rebuild(cls):
+        """从账单表全量重建汇总表，返回汇总行数"""
+        rows = Bill.objects.values(
+            'fee_type', 'billing_period_start', 'house__building_id', 'status', 'due_date'
+        ).annotate(
+            bill_count=Count('id'),
+            amount_total=Sum('amount'),
+            paid_amount_total=Sum('paid_amount'),
+        ).order_by()
+
+        rollups = [
+            BillStatsRollup(
+                fee_type=row['fee_type'],
+                billing_period_start=row['billing_period_start'],
+                building_id=row['house__building_id'],
+                status=row['status'],
+                due_date=row['due_date'],
+                bill_count=row['bill_count'],
+                amount_total=row['amount_total'] or 0,
+                paid_amount_total=row['paid_amount_total'] or 0,
+            )
+            for row in rows.iterator()
+        ]
+
+        with transaction.atomic():
+            BillStatsRollup.objects.all().delete()
+            BillStatsRollup.objects.bulk_create(rollups, batch_size=1000)
+
+        logger.info(f"账单统计汇总表重建完成，共{len(rollups)}行")
+        return len(rollups)
+
+    @classmethod
+    def get_summary(cls, today=None):
+        """只读汇总表，一次分组查询得到账单统计数据"""
+        today = today or date.today()
+        rows = BillStatsRollup.objects.values('fee_type', 'status').annotate(
+            count=Sum('bill_count'),
+            amount=Sum('amount_total'),
+            paid_amount=Sum('paid_amount_total'),
+            overdue_count=Sum('bill_count', filter=Q(due_date__lt=today)),
+        ).order_by()
+
+        totals = {'total': 0, 'paid': 0, 'unpaid': 0, 'overdue': 0}
+        amounts = {'total': Decimal('0'), 'paid': Decimal('0'), 'unpaid': Decimal('0')}
+        by_type = {}
+
+        for row in rows:
+            count = row['count'] or 0
+            amount = row['amount'] or Decimal('0')
+            type_stat = by_type.setdefault(row['fee_type'], {
+                'total_count': 0, 'paid_count': 0, 'total_amount': Decimal('0'), 'paid_amount': Decimal('0')
+            })
+            type_stat['total_count'] += count
+            type_stat['total_amount'] += amount
+            totals['total'] += count
+            amounts['total'] += amount
+
+            if row['status'] == 'paid':
+                paid_amount = row['paid_amount'] or Decimal('0')
+                totals['paid'] += count
+                amounts['paid'] += paid_amount
+                type_stat['paid_count'] += count
+                type_stat['paid_amount'] += paid_amount
+            elif row['status'] == 'unpaid':
+                totals['unpaid'] += count
+                totals['overdue'] += row['overdue_count'] or 0
+                amounts['unpaid'] += amount
+
+        fee_type_distribution = []
+        for fee_type, fee_type_display in Bill.FEE_TYPE_CHOICES:
+            stat = by_type.get(fee_type)
+            if not stat or stat['total_count'] <= 0:
+                continue
+            fee_type_distribution.append({
+                'type': fee_type_display,
+                'total_count': stat['total_count'],
+                'paid_count': stat['paid_count'],
+                'unpaid_count': stat['total_count'] - stat['paid_count'],
+                'total_amount': float(stat['total_amount']),
+                'paid_amount': float(stat['paid_amount']),
+                'collection_rate': round(stat['paid_count'] / stat['total_count'] * 100, 2)
+            })
+
+        return {
+            'total_bills': totals['total'],
+            'paid_bills': totals['paid'],
+            'unpaid_bills': totals['unpaid'],
+            'overdue_bills': totals['overdue'],
+            'total_amount': float(amounts['total']),
+            'paid_amount': float(amounts['paid']),
+            'unpaid_amount': float(amounts['unpaid']),
+            'collection_rate': round(totals['paid'] / totals['total'] * 100, 2) if totals['total'] > 0 else 0,
+            'fee_type_distribution': fee_type_distribution
+        }
@@ -0,0 +1,302 @@
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from common.service_hooks import RequiredHooks
+from .models import (
+    House, HouseBindingApplication, HouseUserBinding,
+    ParkingSpace, ParkingBindingApplication, ParkingUserBinding,
+)
+from .dashboard_service import DashboardService
+from .property_tree_service import PropertyTreeService
+
+logger = logging.getLogger(__name__)
+
+
+class BindingAuditService(RequiredHooks):
+    """
+    绑定申请批量审核
+
+    一批申请在同一事务内处理：申请加行锁一次取出，目标房屋/车位一条查询解析，
+    申请状态、房屋/车位状态、绑定关系和审核通知均批量写入，
+    返回每条申请的处理结果。单条审核接口同样走这里，只是批次里只有一条。
+    """
+
+    # 单次请求最多审核的申请数量
+    MAX_ITEMS = 5000
+    # 批量写入的批大小
+    BATCH_SIZE = 500
+
+    STATUS_OK = 200
+    STATUS_INVALID = 400
+    STATUS_NOT_FOUND = 404
+    STATUS_CONFLICT = 409
+
+    application_model = None
+    binding_model = None
+    target_field = None
+    label = None
+    required_hooks = ('target_key', 'resolve_targets', 'target_status', 'describe')
+
+    @classmethod
+    def parse_items(cls, data):
+        """
+        解析请求体，返回 (审核条目列表, 错误信息)
+
+        支持 {"items": [{"id", "action", "remark", "reject_reason"}, ...]}，
+        也支持 {"ids": [...], "action", "remark", "reject_reason"} 对多条申请执行同一操作。
+        """
+        if 'items' in data:
+            items = data.get('items')
+            if not isinstance(items, list):
+                return None, "items 必须为数组"
+        else:
+            ids = data.get('ids')
+            if not isinstance(ids, list):
+                return None, "请提供 items 或 ids"
+            items = [
+                {
+                    'id': application_id,
+                    'action': data.get('action'),
+                    'remark': data.get('remark', ''),
+                    'reject_reason': data.get('reject_reason', ''),
+                }
+                for application_id in ids
+            ]
+
+        if not items:
+            return None, "审核列表为空"
+        if len(items) > cls.MAX_ITEMS:
+            return None, f"单次最多审核 {cls.MAX_ITEMS} 条申请"
+        if not all(isinstance(item, dict) for item in items):
+            return None, "审核条目格式错误"
+        return items, None
+
+    @classmethod
+    def target_key(cls, application):
+        """申请中填写的房屋/车位，用于匹配目标记录"""
+
+    @classmethod
+    def resolve_targets(cls, applications):
+        """一条查询取出所有目标记录，返回 {目标键: 对象}"""
+
+    @classmethod
+    def target_status(cls, application):
+        """通过审核后目标记录的状态"""
+
+    @classmethod
+    def describe(cls, application):
+        """申请的房屋/车位描述，用于审核通知"""
+
+    @classmethod
+    def audit(cls, items, auditor=None):
+        """
+        执行审核，返回每条申请的结果列表
+
+        结果按请求顺序排列，每条为 {id, code, message}；
+        申请不存在、已审核过、操作无效或缺少拒绝原因的条目单独报错，不影响其他条目。
+        """
+        from users.models import Notification
+
+        results = []
+        ids = set()
+        for item in items:
+            try:
+                ids.add(int(item.get('id')))
+            except (TypeError, ValueError):
+                pass
+
+        now = timezone.now()
+        approved = []
+        rejected = []
+
+        with transaction.atomic():
+            applications = cls.application_model.objects.select_for_update().in_bulk(ids)
+            seen = set()
+
+            for item in items:
+                try:
+                    application_id = int(item.get('id'))
+                except (TypeError, ValueError):
+                    results.append(cls.result(item.get('id'), cls.STATUS_INVALID, "申请ID无效"))
+                    continue
+
+                application = applications.get(application_id)
+                action = item.get('action')
+                if application is None:
+                    results.append(cls.result(application_id, cls.STATUS_NOT_FOUND, "申请记录不存在"))
+                    continue
+                if application_id in seen or application.status != 0:
+                    results.append(cls.result(application_id, cls.STATUS_CONFLICT, "申请已审核"))
+                    continue
+
+                if action == 'approve':
+                    application.status = 1
+                    application.audit_remark = item.get('remark') or ''
+                    approved.append(application)
+                    message = "审核通过"
+                elif action == 'reject':
+                    reject_reason = item.get('reject_reason')
+                    if not reject_reason:
+                        results.append(cls.result(application_id, cls.STATUS_INVALID, "请输入拒绝原因"))
+                        continue
+                    application.status = 2
+                    application.reject_reason = reject_reason
+                    rejected.append(application)
+                    message = "已拒绝申请"
+                else:
+                    results.append(cls.result(application_id, cls.STATUS_INVALID, "无效的操作"))
+                    continue
+
+                seen.add(application_id)
+                application.audit_time = now
+                application.updated_at = now
+                application.auditor = auditor
+                results.append(cls.result(application_id, cls.STATUS_OK, message))
+
+            targets = cls.resolve_targets(approved) if approved else {}
+            bindings = []
+            target_statuses = {}
+            for application in approved:
+                target = targets.get(cls.target_key(application))
+                if target is None:
+                    # 找不到对应的房屋/车位时仍然创建绑定关系，但不关联目标记录
+                    logger.warning(f"{cls.label}绑定申请 {application.id} 已通过审核，但找不到对应记录：{cls.describe(application)}")
+                else:
+                    target_statuses.setdefault(cls.target_status(application), set()).add(target.id)
+                bindings.append(cls.binding_model(
+                    user_id=application.user_id,
+                    application=application,
+                    identity=application.identity,
+                    **{cls.target_field: target},
+                ))
+
+            audited = approved + rejected
+            cls.application_model.objects.bulk_update(
+                audited,
+                ['status', 'audit_time', 'updated_at', 'auditor', 'audit_remark', 'reject_reason'],
+                batch_size=cls.BATCH_SIZE,
+            )
+            target_model = cls.binding_model._meta.get_field(cls.target_field).related_model
+            for target_status, target_ids in target_statuses.items():
+                target_model.objects.filter(id__in=target_ids).update(status=target_status)
+            cls.binding_model.objects.bulk_create(bindings, batch_size=cls.BATCH_SIZE)
+            Notification.objects.bulk_create(
+                [cls.build_notification(Notification, application) for application in audited],
+                batch_size=cls.BATCH_SIZE,
+            )
+
+            if audited:
+                # 批量写入不会触发信号，手动刷新房产树和工作台缓存
+                transaction.on_commit(PropertyTreeService.invalidate)
+                transaction.on_commit(DashboardService.invalidate)
+
+        logger.info(f"{cls.label}绑定申请批量审核：通过 {len(approved)} 条，拒绝 {len(rejected)} 条")
+        return results
+
+    @classmethod
+    def build_notification(cls, notification_model, application):
+        if application.status == 1:
+            title = f"{cls.label}绑定申请已通过"
+            content = f"您提交的{cls.label}绑定申请（{cls.describe(application)}）已审核通过。"
+        else:
+            title = f"{cls.label}绑定申请未通过"
+            content = f"您提交的{cls.label}绑定申请（{cls.describe(application)}）未通过审核，原因：{application.reject_reason}"
+        return notification_model(
+            title=title,
+            content=content,
+            notification_type='system_notice',
+            recipient_id=application.user_id,
+            related_object_type=cls.application_model._meta.model_name,
+            related_object_id=application.id,
+        )
+
+    @classmethod
+    def result(cls, application_id, code, message):
+        return {'id': application_id, 'code': code, 'message': message}
+
+    @classmethod
+    def summarize(cls, results):
+        """统计各结果数量，作为批量接口的返回数据"""
+        return {
+            'total': len(results),
+            'succeeded': sum(1 for result in results if result['code'] == cls.STATUS_OK),
+            'failed': sum(1 for result in results if result['code'] != cls.STATUS_OK),
+            'results': results,
+        }
+
+
+class HouseBindingAuditService(BindingAuditService):
+    """房屋绑定申请审核"""
+
+    application_model = HouseBindingApplication
+    binding_model = HouseUserBinding
+    target_field = 'house'
+    label = '房屋'
+
+    @classmethod
+    def target_key(cls, application):
+        return (application.building_name, application.unit_name, application.room_number)
+
+    @classmethod
+    def resolve_targets(cls, applications):
+        keys = {cls.target_key(application) for application in applications}
+        # 按三列分别取 IN 后在内存中精确匹配，避免上千个 OR 条件
+        houses = House.objects.filter(
+            building__name__in={key[0] for key in keys},
+            unit__in={key[1] for key in keys},
+            room_number__in={key[2] for key in keys},
+        ).select_related('building').order_by('id')
+
+        targets = {}
+        for house in houses:
+            key = (house.building.name, house.unit, house.room_number)
+            if key in keys:
+                targets.setdefault(key, house)
+        return targets
+
+    @classmethod
+    def target_status(cls, application):
+        # 业主=自住，其他=出租
+        return 1 if application.identity == 1 else 2
+
+    @classmethod
+    def describe(cls, application):
+        return f"{application.building_name}{application.unit_name}{application.room_number}"
+
+
+class ParkingBindingAuditService(BindingAuditService):
+    """车位绑定申请审核"""
+
+    application_model = ParkingBindingApplication
+    binding_model = ParkingUserBinding
+    target_field = 'parking_space'
+    label = '车位'
+
+    @classmethod
+    def target_key(cls, application):
+        return (application.parking_area, application.parking_no)
+
+    @classmethod
+    def resolve_targets(cls, applications):
+        keys = {cls.target_key(application) for application in applications}
+        spaces = ParkingSpace.objects.filter(
+            area_name__in={key[0] for key in keys},
+            space_number__in={key[1] for key in keys},
+        ).order_by('id')
+
+        targets = {}
+        for space in spaces:
+            key = (space.area_name, space.space_number)
+            if key in keys:
+                targets.setdefault(key, space)
+        return targets
+
+    @classmethod
+    def target_status(cls, application):
+        # 已占用
+        return 1
+
+    @classmethod
+    def describe(cls, application):
+        return f"{application.parking_area}-{application.parking_no}"
@@ -0,0 +1,120 @@
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+import logging
+
+from common.cache_version import bump_version, get_version
+from .models import (
+    House, HouseUserBinding, ParkingSpace, ParkingUserBinding, RepairOrder, BillStatsRollup
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardService:
+    """物业工作台统计服务：每项指标一次分组查询，结果缓存到 Redis"""
+
+    # 缓存有效期（秒）
+    CACHE_TTL = 60
+    CACHE_VERSION_KEY = 'property:dashboard:version'
+    CACHE_KEY = 'property:dashboard:stats:{version}:{date}:{days}'
+
+    # 趋势统计支持的最大天数
+    MAX_DAYS = 365
+
+    @classmethod
+    def get_cache_key(cls, today, days):
+        version = get_version(cls.CACHE_VERSION_KEY)
+        return cls.CACHE_KEY.format(version=version, date=today.isoformat(), days=days)
+
+    @classmethod
+    def invalidate(cls):
+        """工单、绑定、账单等数据变更后调用，使所有已缓存的统计结果失效"""
+        bump_version(cls.CACHE_VERSION_KEY)
+
+    @classmethod
+    def get_stats(cls, days=7):
+        """获取工作台统计数据（优先读缓存）"""
+        days = max(1, min(int(days), cls.MAX_DAYS))
+        today = timezone.localdate()
+        cache_key = cls.get_cache_key(today, days)
+
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = cls.compute_stats(today, days)
+            cache.set(cache_key, stats, cls.CACHE_TTL)
+        return stats
+
+    @classmethod
+    def compute_stats(cls, today, days):
+        """计算统计数据，查询条数与 days 无关"""
+        tz = timezone.get_current_timezone()
+        today_start = timezone.make_aware(datetime.combine(today, time.min), tz)
+        trend_start_date = today - timedelta(days=days - 1)
+        trend_start = timezone.make_aware(datetime.combine(trend_start_date, time.min), tz)
+
+        # 1. 房屋与车位占用
+        total_houses = House.objects.count()
+        occupied_houses = HouseUserBinding.objects.filter(status=1).count()
+        total_parking_spaces = ParkingSpace.objects.count()
+        occupied_parking_spaces = ParkingUserBinding.objects.filter(status=1).count()
+
+        # 2. 工单数量：待处理和今日新增一次聚合
+        order_counts = RepairOrder.objects.aggregate(
+            pending=Count('id', filter=Q(status='pending')),
+            today=Count('id', filter=Q(created_at__gte=today_start)),
+        )
+
+        # 3. 工单趋势：按日期分组一次查询，区间条件可以走 created_at 索引
+        daily_counts = {
+            row['day']: row['count']
+            for row in RepairOrder.objects.filter(created_at__gte=trend_start).annotate(
+                day=TruncDate('created_at', tzinfo=tz)
+            ).values('day').annotate(count=Count('id')).order_by()
+        }
+        work_order_trend = []
+        for offset in range(days):
+            target_date = trend_start_date + timedelta(days=offset)
+            work_order_trend.append({
+                'date': target_date.strftime('%m-%d'),
+                'count': daily_counts.get(target_date, 0)
+            })
+
+        # 4. 报修类型分布
+        type_names = dict(RepairOrder.TYPE_CHOICES)
+        repair_type_distribution = [
+            {
+                'type': type_names.get(row['repair_type'], row['repair_type']),
+                'value': row['count']
+            }
+            for row in RepairOrder.objects.values('repair_type').annotate(
+                count=Count('id')
+            ).order_by('-count')
+        ]
+        if not repair_type_distribution:
+            repair_type_distribution = [
+                {'type': type_name, 'value': 0} for type_name in type_names.values()
+            ]
+
+        # 5. 物业费收缴率：已支付物业费账单数 / 物业费账单总数（不含已取消账单，读取账单统计汇总表）
+        bill_counts = BillStatsRollup.objects.filter(fee_type='property').exclude(status='cancelled').aggregate(
+            total=Sum('bill_count'),
+            paid=Sum('bill_count', filter=Q(status='paid')),
+        )
+        total_bills = bill_counts['total'] or 0
+        fee_collection_rate = round((bill_counts['paid'] or 0) / total_bills, 3) if total_bills > 0 else 0
+
+        return {
+            'pendingWorkOrders': order_counts['pending'],
+            'todayRepairs': order_counts['today'],
+            'totalResidents': occupied_houses,  # 简化：每个绑定房屋算一户
+            'feeCollectionRate': fee_collection_rate,
+            'totalHouses': total_houses,
+            'occupiedHouses': occupied_houses,
+            'totalParkingSpaces': total_parking_spaces,
+            'occupiedParkingSpaces': occupied_parking_spaces,
+            'workOrderTrend': work_order_trend,
+            'repairTypeDistribution': repair_type_distribution
+        }
@@ -0,0 +1,83 @@
+from django.utils import timezone
+
+from common.export import StreamingExporter
+from .models import Bill, AccessLog
+
+
+def _format_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+class BillExportService:
+    """账单导出：列定义与逐行格式化"""
+
+    HEADERS = [
+        '账单号', '账单标题', '费用类型', '楼栋', '单元', '房号', '缴费人', '联系电话',
+        '计费周期开始', '计费周期结束', '应缴金额', '已缴金额', '账单状态', '缴费截止日期',
+        '支付方式', '支付时间', '创建时间',
+    ]
+    FIELDS = [
+        'bill_no', 'title', 'fee_type', 'house__building__name', 'house__unit', 'house__room_number',
+        'user__real_name', 'user__nickname', 'user__phone',
+        'billing_period_start', 'billing_period_end', 'amount', 'paid_amount', 'status', 'due_date',
+        'payment_method', 'paid_at', 'created_at',
+    ]
+    FEE_TYPES = dict(Bill.FEE_TYPE_CHOICES)
+    STATUSES = dict(Bill.STATUS_CHOICES)
+    PAYMENT_METHODS = dict(Bill.PAYMENT_METHOD_CHOICES)
+
+    @classmethod
+    def rows(cls, queryset):
+        for row in StreamingExporter.iter_keyset(queryset, 'created_at', cls.FIELDS):
+            yield [
+                row['bill_no'],
+                row['title'],
+                cls.FEE_TYPES.get(row['fee_type'], row['fee_type']),
+                row['house__building__name'] or '',
+                row['house__unit'] or '',
+                row['house__room_number'] or '',
+                row['user__real_name'] or row['user__nickname'] or '',
+                row['user__phone'] or '',
+                row['billing_period_start'].isoformat(),
+                row['billing_period_end'].isoformat(),
+                row['amount'],
+                row['paid_amount'],
+                cls.STATUSES.get(row['status'], row['status']),
+                row['due_date'].isoformat(),
+                cls.PAYMENT_METHODS.get(row['payment_method'], row['payment_method'] or ''),
+                _format_datetime(row['paid_at']),
+                _format_datetime(row['created_at']),
+            ]
+
+    @classmethod
+    def response(cls, queryset, file_type):
+        filename = f"bills-{timezone.localdate():%Y%m%d}"
+        return StreamingExporter.response(file_type, filename, cls.HEADERS, cls.rows(queryset), '账单')
+
+
+class AccessLogExportService:
+    """门禁日志导出：列定义与逐行格式化"""
+
+    HEADERS = ['记录时间', '人员姓名', '人员类型', '开门方式', '进出方向', '位置', '设备ID']
+    FIELDS = ['timestamp', 'person_name', 'person_type', 'method', 'direction', 'location', 'device_id']
+    METHODS = dict(AccessLog.METHOD_CHOICES)
+    DIRECTIONS = dict(AccessLog.DIRECTION_CHOICES)
+    PERSON_TYPES = dict(AccessLog._meta.get_field('person_type').choices)
+
+    @classmethod
+    def rows(cls, queryset):
+        for row in StreamingExporter.iter_keyset(queryset, 'timestamp', cls.FIELDS):
+            yield [
+                _format_datetime(row['timestamp']),
+                row['person_name'],
+                cls.PERSON_TYPES.get(row['person_type'], row['person_type']),
+                cls.METHODS.get(row['method'], row['method']),
+                cls.DIRECTIONS.get(row['direction'], row['direction']),
+                row['location'],
+                row['device_id'],
+            ]
+
+    @classmethod
+    def response(cls, queryset, file_type):
+        filename = f"access-logs-{timezone.localdate():%Y%m%d}"
+        return StreamingExporter.response(file_type, filename, cls.HEADERS, cls.rows(queryset), '门禁日志')
@@ -0,0 +1,423 @@
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.conf import settings
+from django.db import connection, transaction
+import csv
+import logging
+import os
+import re
+import uuid
+
+from common.importer import TabularReader, ImportFileError
+from common.service_hooks import RequiredHooks
+from .models import Building, House, ParkingSpace
+from .dashboard_service import DashboardService
+from .property_tree_service import PropertyTreeService
+
+logger = logging.getLogger(__name__)
+
+
+class ImportErrorReport:
+    """导入错误报告：出错的原始行加上行号和错误原因，首次写入时才创建 CSV 文件"""
+
+    REPORT_DIR = 'import_reports'
+    TOKEN_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.token = None
+        self.file = None
+        self.writer = None
+
+    @classmethod
+    def get_path(cls, token):
+        """错误报告的文件路径，token 不合法时返回 None"""
+        if not token or not cls.TOKEN_PATTERN.fullmatch(token):
+            return None
+        return os.path.join(settings.MEDIA_ROOT, cls.REPORT_DIR, f'{token}.csv')
+
+    def add(self, line_no, row, message):
+        if self.writer is None:
+            self.token = uuid.uuid4().hex
+            path = self.get_path(self.token)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['行号', '错误原因', *self.headers])
+        self.writer.writerow([line_no, message, *row])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class AssetImportService(RequiredHooks):
+    """
+    楼栋/房屋/车位批量导入
+
+    文件逐行流式读取，每 CHUNK_SIZE 行为一块：先在内存中校验字段、按唯一键检测文件内重复，
+    再用一条查询找出库中已存在的记录（只用于区分新增和更新），最后 bulk_create 批量写入，
+    唯一键冲突的行按 update_fields 更新。可选列缺失或单元格为空时该字段值为 None：
+    新记录使用模型默认值，已有记录不覆盖该字段。每块单独提交事务，出错的行写入可下载的错误报告。
+    """
+
+    CHUNK_SIZE = 2000
+    # 接口返回中附带的错误条数，其余见错误报告
+    MAX_ERRORS = 20
+
+    model = None
+    label = None
+    # 字段 -> 可识别的表头名称，第一个为错误报告中使用的名称
+    columns = {}
+    required_columns = ()
+    unique_fields = ()
+    update_fields = ()
+    required_hooks = ('clean', 'get_key', 'existing_keys', 'build_objects')
+
+    @classmethod
+    def run(cls, file, file_type):
+        """
+        导入文件，返回汇总结果
+
+        表头缺少必填列或文件无法解析时抛出 ImportFileError。
+        """
+        rows = TabularReader.iter_rows(file, file_type)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError("文件为空")
+        positions = cls.map_columns(header)
+
+        report = ImportErrorReport([aliases[0] for aliases in cls.columns.values()])
+        summary = {'total': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        context = {'seen': set()}
+        numbered = enumerate(rows, start=2)
+
+        try:
+            while True:
+                chunk = list(islice(numbered, cls.CHUNK_SIZE))
+                if not chunk:
+                    break
+
+                records, errors = cls.validate_chunk(chunk, positions, context)
+                for line_no, row, message in errors:
+                    report.add(line_no, [row[index] if index is not None and index < len(row) else ''
+                                         for index in positions.values()], message)
+                    if len(summary['errors']) < cls.MAX_ERRORS:
+                        summary['errors'].append({'row': line_no, 'message': message})
+
+                created, updated = cls.save_chunk(records, context) if records else (0, 0)
+                summary['total'] += len(chunk)
+                summary['created'] += created
+                summary['updated'] += updated
+                summary['failed'] += len(errors)
+        finally:
+            report.close()
+
+        if summary['created'] or summary['updated']:
+            # bulk_create 不会触发信号，手动刷新房产树和工作台缓存
+            PropertyTreeService.invalidate()
+            DashboardService.invalidate()
+
+        summary['error_report'] = report.token
+        logger.info(
+            f"{cls.label}导入完成：共 {summary['total']} 行，新增 {summary['created']}，"
+            f"更新 {summary['updated']}，失败 {summary['failed']}"
+        )
+        return summary
+
+    @classmethod
+    def map_columns(cls, header):
+        """按表头名称定位各字段所在的列，可选列缺失时位置为 None"""
+        names = [str(name).strip().lower() for name in header]
+        positions = {}
+        for field, aliases in cls.columns.items():
+            positions[field] = next(
+                (names.index(alias.lower()) for alias in aliases if alias.lower() in names), None
+            )
+
+        missing = [cls.columns[field][0] for field in cls.required_columns if positions[field] is None]
+        if missing:
+            raise ImportFileError(f"缺少必填列：{'、'.join(missing)}")
+        return positions
+
+    @classmethod
+    def validate_chunk(cls, chunk, positions, context):
+        """校验一块数据，返回 (有效记录列表, [(行号, 原始行, 错误原因)])"""
+        records = []
+        errors = []
+        seen = context['seen']
+
+        for line_no, row in chunk:
+            if not any(cell.strip() for cell in row):
+                continue
+            values = {
+                field: (row[index].strip() if index is not None and index < len(row) else '')
+                for field, index in positions.items()
+            }
+            try:
+                record = cls.clean(values)
+            except ValueError as e:
+                errors.append((line_no, row, str(e)))
+                continue
+
+            key = cls.get_key(record)
+            if key in seen:
+                errors.append((line_no, row, "与文件中前面的行重复"))
+                continue
+            seen.add(key)
+            records.append(record)
+
+        return records, errors
+
+    @classmethod
+    def save_chunk(cls, records, context):
+        """写入一块有效记录，返回 (新增数, 更新数)"""
+        # 按实际提供的更新字段分组写入，空单元格不覆盖已有值
+        groups = {}
+        for record in records:
+            fields = tuple(field for field in cls.update_fields if record[field] is not None)
+            groups.setdefault(fields, []).append(record)
+
+        with transaction.atomic():
+            existing = cls.existing_keys(records, context)
+            for fields, group in groups.items():
+                cls.upsert(cls.build_objects(group, context), fields)
+
+        updated = sum(1 for record in records if cls.get_key(record) in existing)
+        return len(records) - updated, updated
+
+    @classmethod
+    def upsert(cls, objects, update_fields):
+        # 没有需要更新的字段时，已存在的记录保持不变
+        options = {'ignore_conflicts': True}
+        if update_fields:
+            options = {'update_conflicts': True, 'update_fields': list(update_fields)}
+            # MySQL 的 ON DUPLICATE KEY UPDATE 不能指定冲突列
+            if connection.features.supports_update_conflicts_with_target:
+                options['unique_fields'] = list(cls.unique_fields)
+        cls.model.objects.bulk_create(objects, batch_size=cls.CHUNK_SIZE, **options)
+
+    @classmethod
+    def clean(cls, values):
+        """校验并转换一行数据，失败时抛出 ValueError"""
+
+    @classmethod
+    def get_key(cls, record):
+        """记录的唯一键，用于检测文件内重复和区分新增与更新"""
+
+    @classmethod
+    def existing_keys(cls, records, context):
+        """一条查询返回库中已存在的唯一键集合"""
+
+    @classmethod
+    def build_objects(cls, records, context):
+        """把一组记录转换为待写入的模型实例"""
+
+    @staticmethod
+    def require(values, field, label, max_length):
+        value = values[field]
+        if not value:
+            raise ValueError(f"{label}不能为空")
+        if len(value) > max_length:
+            raise ValueError(f"{label}不能超过{max_length}个字符")
+        return value
+
+    @staticmethod
+    def parse_choice(value, choices, label, default):
+        if not value:
+            return default
+        if value in choices:
+            return choices[value]
+        raise ValueError(f"{label}无效：{value}")
+
+
+class BuildingImportService(AssetImportService):
+    """楼栋导入：楼栋只有名称，已存在的楼栋不会重复创建（名称唯一，并发导入时忽略冲突）"""
+
+    model = Building
+    label = '楼栋'
+    columns = {'name': ('楼栋名称', '楼栋', 'name', 'building')}
+    required_columns = ('name',)
+    unique_fields = ('name',)
+
+    @classmethod
+    def clean(cls, values):
+        return {'name': cls.require(values, 'name', '楼栋名称', 50)}
+
+    @classmethod
+    def get_key(cls, record):
+        return record['name']
+
+    @classmethod
+    def existing_keys(cls, records, context):
+        existing = set(Building.objects.filter(
+            name__in=[record['name'] for record in records]
+        ).values_list('name', flat=True))
+        context['existing'] = existing
+        return existing
+
+    @classmethod
+    def build_objects(cls, records, context):
+        return [Building(name=record['name']) for record in records if record['name'] not in context['existing']]
+
+
+class HouseImportService(AssetImportService):
+    """房屋导入：楼栋按名称匹配，不存在的楼栋自动创建；同一楼栋单元房号已存在时更新楼层、面积和状态"""
+
+    model = House
+    label = '房屋'
+    columns = {
+        'building': ('楼栋', '楼栋名称', 'building'),
+        'unit': ('单元', '单元号', 'unit'),
+        'floor': ('楼层', 'floor'),
+        'room_number': ('房号', '门牌号', 'room', 'room_number'),
+        'area': ('面积', 'area'),
+        'status': ('状态', '房屋状态', 'status'),
+    }
+    required_columns = ('building', 'unit', 'floor', 'room_number', 'area')
+    unique_fields = ('building', 'unit', 'room_number')
+    update_fields = ('floor', 'area', 'status')
+    STATUS_CHOICES = {
+        '1': 1, '2': 2, '3': 3,
+        'self': 1, 'rent': 2, 'empty': 3,
+        '自住': 1, '出租': 2, '空置': 3,
+    }
+    MAX_AREA = Decimal('99999999.99')
+
+    @classmethod
+    def clean(cls, values):
+        try:
+            floor = int(values['floor'])
+        except ValueError:
+            raise ValueError(f"楼层必须为整数：{values['floor']}")
+        try:
+            area = Decimal(values['area'])
+            if not area.is_finite():
+                raise InvalidOperation
+            area = area.quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"面积格式不正确：{values['area']}")
+        if area <= 0:
+            raise ValueError("面积必须大于0")
+        if area > cls.MAX_AREA:
+            raise ValueError(f"面积不能超过{cls.MAX_AREA}")
+
+        return {
+            'building': cls.require(values, 'building', '楼栋', 50),
+            'unit': cls.require(values, 'unit', '单元', 10),
+            'room_number': cls.require(values, 'room_number', '房号', 10),
+            'floor': floor,
+            'area': area,
+            'status': cls.parse_choice(values['status'], cls.STATUS_CHOICES, '房屋状态', None),
+        }
+
+    @classmethod
+    def get_key(cls, record):
+        return (record['building'], record['unit'], record['room_number'])
+
+    @classmethod
+    def resolve_buildings(cls, names, context):
+        """楼栋名称 -> id，本次导入中已查过的楼栋不再查询"""
+        buildings = context.setdefault('buildings', {})
+        missing = set(names) - buildings.keys()
+        if missing:
+            buildings.update(Building.objects.filter(name__in=missing).values_list('name', 'id'))
+            new_names = missing - buildings.keys()
+            if new_names:
+                # 楼栋名称唯一，并发导入同时创建的楼栋忽略冲突后按名称取回
+                Building.objects.bulk_create([Building(name=name) for name in sorted(new_names)], ignore_conflicts=True)
+                # MySQL 的 bulk_create 不回填主键，重新查一次
+                buildings.update(Building.objects.filter(name__in=new_names).values_list('name', 'id'))
+        return buildings
+
+    @classmethod
+    def existing_keys(cls, records, context):
+        buildings = cls.resolve_buildings({record['building'] for record in records}, context)
+        building_names = {buildings[record['building']]: record['building'] for record in records}
+        keys = {cls.get_key(record) for record in records}
+
+        # 三列分别取 IN 后在内存中精确匹配，避免上千个 OR 条件
+        rows = House.objects.filter(
+            building_id__in=building_names.keys(),
+            unit__in={record['unit'] for record in records},
+            room_number__in={record['room_number'] for record in records},
+        ).values_list('building_id', 'unit', 'room_number')
+        return {
+            (building_names[building_id], unit, room_number)
+            for building_id, unit, room_number in rows
+        } & keys
+
+    @classmethod
+    def build_objects(cls, records, context):
+        buildings = context['buildings']
+        return [
+            House(
+                building_id=buildings[record['building']],
+                unit=record['unit'],
+                room_number=record['room_number'],
+                floor=record['floor'],
+                area=record['area'],
+                **({'status': record['status']} if record['status'] is not None else {}),
+            )
+            for record in records
+        ]
+
+
+class ParkingSpaceImportService(AssetImportService):
+    """车位导入：同一区域车位号已存在时更新车位类型和状态"""
+
+    model = ParkingSpace
+    label = '车位'
+    columns = {
+        'area_name': ('停车区域', '区域', 'area', 'area_name'),
+        'space_number': ('车位号', 'space_number', 'parkingNo'),
+        'parking_type': ('车位类型', 'type', 'parking_type'),
+        'status': ('状态', '车位状态', 'status'),
+    }
+    required_columns = ('area_name', 'space_number')
+    unique_fields = ('area_name', 'space_number')
+    update_fields = ('parking_type', 'status')
+    TYPE_CHOICES = {
+        'owned': 'owned', 'rented': 'rented',
+        '自有车位': 'owned', '租赁车位': 'rented', '自有': 'owned', '租赁': 'rented',
+    }
+    STATUS_CHOICES = {
+        '1': 1, '2': 2, '3': 3,
+        'active': 1, 'expired': 2, 'empty': 3,
+    }
+
+    @classmethod
+    def clean(cls, values):
+        return {
+            'area_name': cls.require(values, 'area_name', '停车区域', 50),
+            'space_number': cls.require(values, 'space_number', '车位号', 20),
+            'parking_type': cls.parse_choice(values['parking_type'], cls.TYPE_CHOICES, '车位类型', None),
+            'status': cls.parse_choice(values['status'], cls.STATUS_CHOICES, '车位状态', None),
+        }
+
+    @classmethod
+    def get_key(cls, record):
+        return (record['area_name'], record['space_number'])
+
+    @classmethod
+    def existing_keys(cls, records, context):
+        keys = {cls.get_key(record) for record in records}
+        rows = ParkingSpace.objects.filter(
+            area_name__in={record['area_name'] for record in records},
+            space_number__in={record['space_number'] for record in records},
+        ).values_list('area_name', 'space_number')
+        return set(rows) & keys
+
+    @classmethod
+    def build_objects(cls, records, context):
+        return [
+            ParkingSpace(**{field: value for field, value in record.items() if value is not None})
+            for record in records
+        ]
+
+
+ASSET_IMPORT_SERVICES = {
+    'buildings': BuildingImportService,
+    'houses': HouseImportService,
+    'parking-spaces': ParkingSpaceImportService,
+}
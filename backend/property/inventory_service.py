@@ -0,0 +1,166 @@
+from django.db.models import Prefetch
+
+from common.pagination import ListPaginator
+from common.service_hooks import RequiredHooks
+from .models import House, HouseUserBinding, ParkingSpace, ParkingUserBinding
+
+
+class InventoryListService(RequiredHooks):
+    """
+    房屋/车位基础数据列表
+
+    当前绑定通过 Prefetch 一次性取出（含申请信息），整页只需固定条数的查询。
+    请求带 page 参数时分页返回 {list, total, ...}，否则保持原来的完整数组；
+    layout=columns 时以 {columns, rows} 列式结构返回，省去每行重复的字段名。
+    """
+
+    model = None
+    binding_model = None
+    ordering = ()
+    columns = ()
+    status_aliases = {}
+    default_page_size = 50
+    required_hooks = ('filter_queryset', 'to_row')
+
+    @classmethod
+    def get_queryset(cls):
+        active_bindings = cls.binding_model.objects.filter(status=1).select_related('application')
+        return cls.model.objects.prefetch_related(
+            Prefetch('user_bindings', queryset=active_bindings, to_attr='active_bindings')
+        ).order_by(*cls.ordering)
+
+    @classmethod
+    def parse_status(cls, value):
+        """状态筛选同时支持数据库中的数字和接口返回的状态名"""
+        if value in cls.status_aliases:
+            return cls.status_aliases[value]
+        return int(value)
+
+    @classmethod
+    def filter_queryset(cls, queryset, params):
+        """按请求参数筛选列表"""
+
+    @classmethod
+    def to_row(cls, obj, binding):
+        """返回与 columns 顺序一致的字段值"""
+
+    @classmethod
+    def current_binding(cls, obj):
+        """最新的已绑定记录（绑定记录默认按创建时间倒序）"""
+        return obj.active_bindings[0] if obj.active_bindings else None
+
+    @classmethod
+    def list(cls, request):
+        """返回接口 data 字段的内容"""
+        queryset = cls.filter_queryset(cls.get_queryset(), request.GET)
+
+        pagination = None
+        if 'page' in request.GET:
+            items, pagination = ListPaginator.paginate_pages(request, queryset, cls.default_page_size)
+        else:
+            items = list(queryset)
+
+        rows = [cls.to_row(obj, cls.current_binding(obj)) for obj in items]
+
+        if request.GET.get('layout') == 'columns':
+            data = {'columns': list(cls.columns), 'rows': rows}
+        else:
+            data = [dict(zip(cls.columns, row)) for row in rows]
+
+        if pagination is None:
+            return data
+        if isinstance(data, list):
+            data = {'list': data}
+        data.update(pagination)
+        return data
+
+
+class HouseListService(InventoryListService):
+    """房屋列表"""
+
+    model = House
+    binding_model = HouseUserBinding
+    ordering = ('building__name', 'unit', 'floor', 'room_number', 'id')
+    columns = ('id', 'building', 'unit', 'room', 'floor', 'area', 'status', 'ownerName', 'ownerPhone', 'bindingId')
+    status_aliases = {'self': 1, 'rent': 2, 'empty': 3}
+
+    @classmethod
+    def get_queryset(cls):
+        return super().get_queryset().select_related('building')
+
+    @classmethod
+    def filter_queryset(cls, queryset, params):
+        building = params.get('building')
+        building_id = params.get('building_id')
+        unit = params.get('unit')
+        status_filter = params.get('status')
+
+        if building:
+            queryset = queryset.filter(building__name=building)
+        if building_id:
+            queryset = queryset.filter(building_id=building_id)
+        if unit:
+            queryset = queryset.filter(unit=unit)
+        if status_filter:
+            queryset = queryset.filter(status=cls.parse_status(status_filter))
+        return queryset
+
+    @classmethod
+    def to_row(cls, house, binding):
+        application = binding.application if binding else None
+        return [
+            house.id,
+            house.building.name,
+            house.unit,
+            house.room_number,
+            house.floor,
+            str(house.area),
+            'self' if house.status == 1 else ('rent' if house.status == 2 else 'empty'),
+            application.applicant_name if application else None,
+            application.applicant_phone if application else None,
+            binding.id if application else None,
+        ]
+
+
+class ParkingSpaceListService(InventoryListService):
+    """车位列表"""
+
+    model = ParkingSpace
+    binding_model = ParkingUserBinding
+    ordering = ('area_name', 'space_number', 'id')
+    columns = (
+        'id', 'area', 'parkingNo', 'type', 'status',
+        'carNo', 'carBrand', 'carColor', 'ownerName', 'ownerPhone', 'bindingId'
+    )
+    status_aliases = {'active': 1, 'expired': 2, 'empty': 3}
+
+    @classmethod
+    def filter_queryset(cls, queryset, params):
+        area = params.get('area')
+        parking_type = params.get('type')
+        status_filter = params.get('status')
+
+        if area:
+            queryset = queryset.filter(area_name=area)
+        if parking_type:
+            queryset = queryset.filter(parking_type=parking_type)
+        if status_filter:
+            queryset = queryset.filter(status=cls.parse_status(status_filter))
+        return queryset
+
+    @classmethod
+    def to_row(cls, space, binding):
+        application = binding.application if binding else None
+        return [
+            space.id,
+            space.area_name,
+            space.space_number,
+            space.parking_type,
+            'active' if space.status == 1 else ('expired' if space.status == 2 else 'empty'),
+            application.car_no if application else None,
+            application.car_brand if application else None,
+            application.car_color if application else None,
+            application.owner_name if application else None,
+            application.owner_phone if application else None,
+            binding.id if application else None,
+        ]
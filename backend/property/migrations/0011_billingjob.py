@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0010_accesslog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('generate_bills', '批量生成账单'), ('send_reminders', '批量催缴')], max_length=20, verbose_name='任务类型')),
+                ('idempotency_key', models.CharField(max_length=191, unique=True, verbose_name='幂等键')),
+                ('params', models.JSONField(default=dict, verbose_name='任务参数')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='任务状态')),
+                ('progress', models.IntegerField(default=0, verbose_name='进度百分比')),
+                ('total_count', models.IntegerField(default=0, verbose_name='总数')),
+                ('processed_count', models.IntegerField(default=0, verbose_name='已处理数')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='执行结果')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='错误信息')),
+                ('attempts', models.IntegerField(default=0, verbose_name='执行次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billing_jobs', to=settings.AUTH_USER_MODEL, verbose_name='提交人')),
+            ],
+            options={
+                'verbose_name': '缴费后台任务',
+                'verbose_name_plural': '缴费后台任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='property_bi_status_9b6863_idx')],
+            },
+        ),
+    ]
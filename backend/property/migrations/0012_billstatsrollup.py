@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_bill_stats(apps, schema_editor):
+    """根据现有账单初始化统计汇总表"""
+    from django.db.models import Count, Sum
+
+    Bill = apps.get_model('property', 'Bill')
+    BillStatsRollup = apps.get_model('property', 'BillStatsRollup')
+
+    rows = Bill.objects.values(
+        'fee_type', 'billing_period_start', 'house__building_id', 'status', 'due_date'
+    ).annotate(
+        bill_count=Count('id'),
+        amount_total=Sum('amount'),
+        paid_amount_total=Sum('paid_amount'),
+    ).order_by()
+
+    BillStatsRollup.objects.bulk_create([
+        BillStatsRollup(
+            fee_type=row['fee_type'],
+            billing_period_start=row['billing_period_start'],
+            building_id=row['house__building_id'],
+            status=row['status'],
+            due_date=row['due_date'],
+            bill_count=row['bill_count'],
+            amount_total=row['amount_total'] or 0,
+            paid_amount_total=row['paid_amount_total'] or 0,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0011_billingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fee_type', models.CharField(choices=[('property', '物业费'), ('parking', '停车费'), ('water', '水费'), ('electric', '电费'), ('gas', '燃气费'), ('heating', '供暖费')], max_length=20, verbose_name='费用类型')),
+                ('billing_period_start', models.DateField(verbose_name='计费周期开始')),
+                ('status', models.CharField(choices=[('unpaid', '待支付'), ('paid', '已支付'), ('overdue', '已逾期'), ('cancelled', '已取消')], max_length=20, verbose_name='账单状态')),
+                ('due_date', models.DateField(verbose_name='缴费截止日期')),
+                ('bill_count', models.IntegerField(default=0, verbose_name='账单数量')),
+                ('amount_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='应缴金额合计')),
+                ('paid_amount_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='已缴金额合计')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bill_stats', to='property.building', verbose_name='楼栋')),
+            ],
+            options={
+                'verbose_name': '账单统计汇总',
+                'verbose_name_plural': '账单统计汇总',
+                'unique_together': {('fee_type', 'billing_period_start', 'building', 'status', 'due_date')},
+            },
+        ),
+        migrations.RunPython(build_bill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:34
+
+from datetime import date
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+FUTURE_MONTHS = 3
+
+
+# 分区 DDL 在迁移内固定下来，不依赖 AccessLogPartitionService 的后续修改
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def build_partition_sql(table, first_month, last_month):
+    """生成将门禁日志表转换为按月分区的 DDL 列表：每月一个分区 pYYYYMM，末尾 pmax 兜底"""
+    clauses = []
+    month = month_start(first_month)
+    while month <= last_month:
+        upper = add_months(month, 1)
+        clauses.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d} 00:00:00')")
+        month = upper
+    clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+
+    # 分区列必须包含在所有唯一键中，主键扩展为 (id, timestamp)
+    return [
+        f"ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `timestamp`)",
+        f"ALTER TABLE `{table}` PARTITION BY RANGE COLUMNS(`timestamp`) (\n    "
+        + ",\n    ".join(clauses) + "\n)",
+    ]
+
+
+def partition_access_log(apps, schema_editor):
+    """MySQL 下将门禁日志表转换为按月分区，其他数据库跳过"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+
+    from django.db.models import Min
+    from django.utils import timezone
+
+    AccessLog = apps.get_model('property', 'AccessLog')
+    current = month_start(timezone.localdate())
+    earliest = AccessLog.objects.aggregate(earliest=Min('timestamp'))['earliest']
+    first_month = month_start(earliest.date()) if earliest else current
+
+    for sql in build_partition_sql(AccessLog._meta.db_table, first_month, add_months(current, FUTURE_MONTHS)):
+        schema_editor.execute(sql)
+
+
+def unpartition_access_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+
+    table = apps.get_model('property', 'AccessLog')._meta.db_table
+    schema_editor.execute(f"ALTER TABLE `{table}` REMOVE PARTITIONING")
+    schema_editor.execute(f"ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0014_bill_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='access_logs', to=settings.AUTH_USER_MODEL, verbose_name='关联用户'),
+        ),
+        migrations.RunPython(partition_access_log, unpartition_access_log),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0015_accesslog_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesslog',
+            name='sequence',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='设备事件序号'),
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='记录时间'),
+        ),
+        migrations.AddConstraint(
+            model_name='accesslog',
+            constraint=models.UniqueConstraint(fields=('device_id', 'timestamp', 'sequence'), name='uniq_accesslog_device_event'),
+        ),
+    ]
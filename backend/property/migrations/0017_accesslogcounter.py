@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+def build_access_log_counters(apps, schema_editor):
+    """根据现有门禁日志初始化小时汇总表"""
+    from django.db.models import Count
+    from django.db.models.functions import TruncHour
+
+    AccessLog = apps.get_model('property', 'AccessLog')
+    AccessLogCounter = apps.get_model('property', 'AccessLogCounter')
+
+    rows = AccessLog.objects.filter(success=True).annotate(
+        hour=TruncHour('timestamp')
+    ).values('hour', 'location', 'method', 'person_type', 'direction').annotate(
+        total=Count('id')
+    ).order_by()
+
+    AccessLogCounter.objects.bulk_create([
+        AccessLogCounter(count=row.pop('total'), **row) for row in rows.iterator()
+    ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0016_accesslog_device_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessLogCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='小时')),
+                ('location', models.CharField(max_length=100, verbose_name='位置')),
+                ('method', models.CharField(choices=[('face', '人脸识别'), ('qrcode', '二维码'), ('card', '刷卡'), ('password', '密码')], max_length=20, verbose_name='开门方式')),
+                ('person_type', models.CharField(max_length=20, verbose_name='人员类型')),
+                ('direction', models.CharField(choices=[('in', '进入'), ('out', '离开')], max_length=10, verbose_name='进出方向')),
+                ('count', models.IntegerField(default=0, verbose_name='通行次数')),
+            ],
+            options={
+                'verbose_name': '门禁通行汇总',
+                'verbose_name_plural': '门禁通行汇总',
+                'unique_together': {('hour', 'location', 'method', 'person_type', 'direction')},
+            },
+        ),
+        migrations.RunPython(build_access_log_counters, migrations.RunPython.noop),
+    ]
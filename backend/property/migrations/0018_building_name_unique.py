@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+def rename_duplicate_buildings(apps, schema_editor):
+    """
+    同名楼栋保留 id 最小的一个，其余改名为 "名称(id)"
+
+    重复楼栋下可能已有房屋、账单，改名不丢数据，需要时由管理员手工合并。
+    """
+    from django.db.models import Count, Min
+
+    Building = apps.get_model('property', 'Building')
+    duplicates = Building.objects.values('name').annotate(count=Count('id'), keep=Min('id')).filter(count__gt=1)
+    for row in duplicates:
+        for building in Building.objects.filter(name=row['name']).exclude(id=row['keep']):
+            suffix = f"({building.id})"
+            building.name = building.name[:50 - len(suffix)] + suffix
+            building.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0017_accesslogcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_buildings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='building',
+            name='name',
+            field=models.CharField(max_length=50, unique=True, verbose_name='楼栋名称'),
+        ),
+    ]
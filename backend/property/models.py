@@ -5,7 +5,7 @@ import uuid
 
 # 1. 楼栋表
 class Building(models.Model):
-    name = models.CharField(max_length=50, verbose_name="楼栋名称") # 如 "1号楼"
+    name = models.CharField(max_length=50, unique=True, verbose_name="楼栋名称") # 如 "1号楼"
     # 可以加一些描述、位置等
     
     def __str__(self):
@@ -456,29 +456,27 @@ class RepairOrder(models.Model):
         verbose_name = "报修工单"
         verbose_name_plural = "报修工单"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),  # 工作台按日期区间统计
+        ]
     
     def __str__(self):
         return f"{self.order_no} - {self.summary}"
     
+    @classmethod
+    def get_last_daily_seq(cls, date_str):
+        """当日已有工单的最大序号，用于序列首次使用时接续历史工单号"""
+        order_nos = cls.objects.filter(order_no__startswith=f'WO{date_str}').values_list('order_no', flat=True)
+        seqs = (order_no[len(date_str) + 2:] for order_no in order_nos)
+        return max((int(seq) for seq in seqs if seq.isdigit()), default=0)
+    
     def save(self, *args, **kwargs):
-        # 自动生成工单号
+        # 自动生成工单号：WO + 日期 + 当日序号
         if not self.order_no:
-            import datetime
-            today = datetime.date.today()
-            date_str = today.strftime('%Y%m%d')
-            # 获取当天最后一个工单号
-            last_order = RepairOrder.objects.filter(
-                order_no__startswith=f'WO{date_str}'
-            ).order_by('-order_no').first()
-            
-            if last_order:
-                # 提取序号并+1
-                last_seq = int(last_order.order_no[-3:])
-                new_seq = last_seq + 1
-            else:
-                new_seq = 1
-            
-            self.order_no = f'WO{date_str}{new_seq:03d}'
+            from common.sequence_service import SequenceService
+            self.order_no = SequenceService.daily_numbers(
+                'repair_order', 'WO', 3, seed=RepairOrder.get_last_daily_seq
+            )[0]
         
         super().save(*args, **kwargs)
     
@@ -656,29 +654,54 @@ class Bill(models.Model):
         ordering = ['-created_at']
         # 确保同一房屋同一类型同一周期不重复生成账单
         unique_together = ('house', 'fee_type', 'billing_period_start', 'billing_period_end')
+        indexes = [
+            models.Index(fields=['created_at']),  # 账单列表按时间游标分页
+        ]
     
     def __str__(self):
         house_info = f"{self.house}" if self.house else "无房屋"
         return f"{self.bill_no} - {house_info} - {self.get_fee_type_display()}"
-    
+
+    # 账单统计汇总表依赖的字段
+    STATS_FIELDS = ('house_id', 'fee_type', 'billing_period_start', 'due_date', 'status', 'amount', 'paid_amount')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的统计字段，保存时只把差值累加到汇总表
+        if all(field in field_names for field in cls.STATS_FIELDS):
+            instance._stats_snapshot = instance.get_stats_snapshot()
+        return instance
+
+    def get_stats_snapshot(self):
+        """当前统计字段取值"""
+        return {field: getattr(self, field) for field in self.STATS_FIELDS}
+
     def save(self, *args, **kwargs):
         # 自动生成账单号
         if not self.bill_no:
-            import datetime
-            import random
-            today = datetime.date.today()
-            date_str = today.strftime('%Y%m%d')
-            # 生成8位随机数
-            random_num = random.randint(10000000, 99999999)
-            self.bill_no = f'BILL{date_str}{random_num}'
+            from common.sequence_service import SequenceService
+            self.bill_no = SequenceService.daily_numbers('bill', 'BILL', 8)[0]
         
         # 自动设置账单标题
         if not self.title:
             period_str = f"{self.billing_period_start.strftime('%Y年%m月')}"
             self.title = f"{period_str}{self.get_fee_type_display()}"
-        
-        super().save(*args, **kwargs)
-    
+
+        from django.db import transaction
+        from .billing_service import BillStatsService
+
+        with transaction.atomic():
+            old_snapshot = None if self._state.adding else getattr(self, '_stats_snapshot', None)
+            if old_snapshot is None and self.pk is not None:
+                # .only()/.defer() 加载或指定主键构造的实例没有快照，以库中现有行为准（不存在时视为新账单）
+                old_snapshot = Bill.objects.select_for_update().filter(pk=self.pk).values(*self.STATS_FIELDS).first()
+            super().save(*args, **kwargs)
+            new_snapshot = self.get_stats_snapshot()
+            if old_snapshot != new_snapshot:
+                BillStatsService.record_change(old_snapshot, new_snapshot)
+        self._stats_snapshot = new_snapshot
+
     def is_overdue(self):
         """检查是否逾期"""
         from django.utils import timezone
@@ -702,6 +725,90 @@ class Bill(models.Model):
             return f"{self.billing_period_start.strftime('%Y-%m-%d')} 至 {self.billing_period_end.strftime('%Y-%m-%d')}"
 
 
+class BillStatsRollup(models.Model):
+    """账单统计汇总表：按 (费用类型, 账期, 楼栋, 状态, 截止日期) 维护数量和金额，供统计接口直接读取"""
+    fee_type = models.CharField(max_length=20, choices=Bill.FEE_TYPE_CHOICES, verbose_name="费用类型")
+    billing_period_start = models.DateField(verbose_name="计费周期开始")
+    building = models.ForeignKey(
+        'Building',
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='bill_stats',
+        verbose_name="楼栋"
+    )
+    status = models.CharField(max_length=20, choices=Bill.STATUS_CHOICES, verbose_name="账单状态")
+    # 截止日期同一账期内通常相同，单独作为维度以便统计逾期账单
+    due_date = models.DateField(verbose_name="缴费截止日期")
+
+    bill_count = models.IntegerField(default=0, verbose_name="账单数量")
+    amount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="应缴金额合计")
+    paid_amount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="已缴金额合计")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "账单统计汇总"
+        verbose_name_plural = "账单统计汇总"
+        unique_together = ('fee_type', 'billing_period_start', 'building', 'status', 'due_date')
+
+    def __str__(self):
+        return f"{self.fee_type} {self.billing_period_start} {self.building_id} {self.status}: {self.bill_count}"
+
+
+class BillingJob(models.Model):
+    """缴费后台任务（批量生成账单、批量催缴），由 run_billing_jobs 工作进程执行"""
+    JOB_TYPE_CHOICES = (
+        ('generate_bills', '批量生成账单'),
+        ('send_reminders', '批量催缴'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', '排队中'),
+        ('running', '执行中'),
+        ('succeeded', '已完成'),
+        ('failed', '失败'),
+    )
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES, verbose_name="任务类型")
+    # 幂等键：同一 (费用类型, 账期, 楼栋范围) 只会有一个任务，重复提交直接返回已有任务
+    idempotency_key = models.CharField(max_length=191, unique=True, verbose_name="幂等键")
+    params = models.JSONField(default=dict, verbose_name="任务参数")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="任务状态")
+
+    # 进度信息
+    progress = models.IntegerField(default=0, verbose_name="进度百分比")
+    total_count = models.IntegerField(default=0, verbose_name="总数")
+    processed_count = models.IntegerField(default=0, verbose_name="已处理数")
+    result = models.JSONField(default=dict, blank=True, verbose_name="执行结果")  # 如各楼栋生成数量
+    errors = models.JSONField(default=list, blank=True, verbose_name="错误信息")
+    attempts = models.IntegerField(default=0, verbose_name="执行次数")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='billing_jobs',
+        verbose_name="提交人"
+    )
+
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="结束时间")
+
+    class Meta:
+        verbose_name = "缴费后台任务"
+        verbose_name_plural = "缴费后台任务"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),  # 工作进程按状态领取任务
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} - {self.get_status_display()} ({self.idempotency_key})"
+
+
 # ===== 门禁日志模型 =====
 
 class AccessLog(models.Model):
@@ -729,11 +836,13 @@ class AccessLog(models.Model):
     location = models.CharField(max_length=100, verbose_name="位置")  # 如 "1栋东门", "南大门" 等
 
     # 可选关联信息（如果有系统用户）
+    # MySQL 分区表不支持外键约束，只保留关联关系
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_constraint=False,
         related_name='access_logs',
         verbose_name="关联用户"
     )
@@ -752,11 +861,13 @@ class AccessLog(models.Model):
         verbose_name="人员类型"
     )
 
-    # 记录时间
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="记录时间")
+    # 记录时间（设备批量上报时为设备端事件时间）
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="记录时间")
 
     # 设备信息（可选）
     device_id = models.CharField(max_length=50, blank=True, verbose_name="设备ID")
+    # 仅批量上报的事件有序号；为空时不参与去重（唯一索引中 NULL 互不冲突）
+    sequence = models.PositiveIntegerField(null=True, blank=True, verbose_name="设备事件序号")
 
     # 状态信息
     success = models.BooleanField(default=True, verbose_name="是否成功")
@@ -765,6 +876,7 @@ class AccessLog(models.Model):
         verbose_name = "门禁日志"
         verbose_name_plural = "门禁日志"
         ordering = ['-timestamp']
+        # MySQL 下按 timestamp 按月 RANGE 分区，见 AccessLogPartitionService
         indexes = [
             models.Index(fields=['timestamp']),  # 时间索引
             models.Index(fields=['person_name']),  # 姓名索引
@@ -772,6 +884,12 @@ class AccessLog(models.Model):
             models.Index(fields=['location']),  # 位置索引
             models.Index(fields=['person_type']),  # 人员类型索引
         ]
+        constraints = [
+            # 设备重复上报去重；唯一键包含分区列 timestamp
+            models.UniqueConstraint(
+                fields=['device_id', 'timestamp', 'sequence'], name='uniq_accesslog_device_event'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.person_name} - {self.get_method_display()} - {self.location} - {self.timestamp}"
@@ -803,4 +921,22 @@ class AccessLog(models.Model):
             'staff': '工作人员',
             'other': '其他',
         }
-        return type_map.get(self.person_type, '其他')
\ No newline at end of file
+        return type_map.get(self.person_type, '其他')
+
+class AccessLogCounter(models.Model):
+    """门禁通行小时汇总表：按 (小时, 位置, 开门方式, 人员类型, 进出方向) 统计成功通行次数，供统计接口直接读取"""
+    hour = models.DateTimeField(verbose_name="小时")  # 截断到整点
+    location = models.CharField(max_length=100, verbose_name="位置")
+    method = models.CharField(max_length=20, choices=AccessLog.METHOD_CHOICES, verbose_name="开门方式")
+    person_type = models.CharField(max_length=20, verbose_name="人员类型")
+    direction = models.CharField(max_length=10, choices=AccessLog.DIRECTION_CHOICES, verbose_name="进出方向")
+
+    count = models.IntegerField(default=0, verbose_name="通行次数")
+
+    class Meta:
+        verbose_name = "门禁通行汇总"
+        verbose_name_plural = "门禁通行汇总"
+        unique_together = ('hour', 'location', 'method', 'person_type', 'direction')
+
+    def __str__(self):
+        return f"{self.hour} {self.location} {self.method} {self.person_type} {self.direction}: {self.count}"
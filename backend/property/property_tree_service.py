@@ -0,0 +1,96 @@
+from django.core.cache import cache
+import hashlib
+import json
+import logging
+
+from common.cache_version import bump_version, get_version
+from .models import Building, House, HouseUserBinding, ParkingSpace, ParkingUserBinding
+
+logger = logging.getLogger(__name__)
+
+
+class PropertyTreeService:
+    """
+    房产层级树：楼栋 → 单元 → 房号、停车区域 → 车位，附带是否可绑定
+
+    整棵树固定 5 条查询构建一次后缓存到 Redis，绑定审核、解绑及房屋/车位变更时通过版本号失效。
+    ETag 取树内容的摘要，客户端可用 If-None-Match 做条件请求。
+    """
+
+    # 缓存有效期（秒），正常情况下由版本号失效，过期时间只是兜底
+    CACHE_TTL = 24 * 60 * 60
+    CACHE_VERSION_KEY = 'property:tree:version'
+    CACHE_KEY = 'property:tree:{version}'
+
+    @classmethod
+    def get_cache_key(cls):
+        version = get_version(cls.CACHE_VERSION_KEY)
+        return cls.CACHE_KEY.format(version=version)
+
+    @classmethod
+    def invalidate(cls):
+        """绑定关系、房屋、车位变更后调用，使已缓存的房产树失效"""
+        bump_version(cls.CACHE_VERSION_KEY)
+
+    @classmethod
+    def get_tree(cls):
+        """返回 (房产树, ETag)，优先读缓存"""
+        cache_key = cls.get_cache_key()
+        cached = cache.get(cache_key)
+        if cached is None:
+            tree = cls.build_tree()
+            digest = hashlib.sha1(
+                json.dumps(tree, ensure_ascii=False, sort_keys=True).encode('utf-8')
+            ).hexdigest()[:20]
+            cached = {'tree': tree, 'etag': f'"{digest}"'}
+            cache.set(cache_key, cached, cls.CACHE_TTL)
+        return cached['tree'], cached['etag']
+
+    @classmethod
+    def build_tree(cls):
+        bound_houses = set(
+            HouseUserBinding.objects.filter(status=1, house__isnull=False).values_list('house_id', flat=True)
+        )
+        bound_spaces = set(
+            ParkingUserBinding.objects.filter(
+                status=1, parking_space__isnull=False
+            ).values_list('parking_space_id', flat=True)
+        )
+
+        buildings = {
+            building_id: {'building': name, 'units': {}}
+            for building_id, name in Building.objects.order_by('id').values_list('id', 'name')
+        }
+        houses = House.objects.order_by('unit', 'room_number').values_list(
+            'id', 'building_id', 'unit', 'room_number'
+        )
+        for house_id, building_id, unit, room_number in houses:
+            rooms = buildings[building_id]['units'].setdefault(unit, [])
+            rooms.append({'room': room_number, 'available': house_id not in bound_houses})
+
+        areas = {}
+        spaces = ParkingSpace.objects.order_by('area_name', 'space_number').values_list(
+            'id', 'area_name', 'space_number'
+        )
+        for space_id, area_name, space_number in spaces:
+            areas.setdefault(area_name, []).append(
+                {'space': space_number, 'available': space_id not in bound_spaces}
+            )
+
+        return {
+            'buildings': [
+                {
+                    'building': building['building'],
+                    'units': [{'unit': unit, 'rooms': rooms} for unit, rooms in building['units'].items()],
+                }
+                for building in buildings.values()
+            ],
+            'parking_areas': [{'area': area, 'spaces': spaces} for area, spaces in areas.items()],
+        }
+
+    @classmethod
+    def find_building(cls, tree, building_name):
+        for building in tree['buildings']:
+            if building['building'] == building_name:
+                return building
+        return None
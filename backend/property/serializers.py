@@ -2,7 +2,7 @@ from rest_framework import serializers
 from .models import (
     HouseBindingApplication, HouseUserBinding, House, Building, Visitor,
     ParkingBindingApplication, ParkingUserBinding, ParkingSpace, Announcement,
-    RepairOrder, RepairOrderImage, RepairEmployee, FeeStandard, Bill, AccessLog
+    RepairOrder, RepairOrderImage, RepairEmployee, FeeStandard, Bill, BillingJob, AccessLog
 )
 from django.utils import timezone
 
@@ -682,6 +682,20 @@ class BillCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError("收费标准不存在")
 
 
+class BillingJobSerializer(serializers.ModelSerializer):
+    """缴费后台任务序列化器"""
+    job_type_display = serializers.CharField(source='get_job_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = BillingJob
+        fields = [
+            'id', 'job_type', 'job_type_display', 'status', 'status_display',
+            'params', 'progress', 'total_count', 'processed_count', 'result', 'errors',
+            'attempts', 'created_at', 'started_at', 'finished_at'
+        ]
+
+
 class BillListSerializer(serializers.ModelSerializer):
     """账单列表序列化器"""
     fee_type_display = serializers.CharField(source='get_fee_type_display', read_only=True)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Bill, Building, House, HouseUserBinding, ParkingSpace, ParkingUserBinding, RepairOrder
+from .billing_service import BillStatsService
+from .dashboard_service import DashboardService
+from .property_tree_service import PropertyTreeService
+
+
+@receiver([post_save, post_delete], sender=RepairOrder)
+@receiver([post_save, post_delete], sender=House)
+@receiver([post_save, post_delete], sender=HouseUserBinding)
+@receiver([post_save, post_delete], sender=ParkingSpace)
+@receiver([post_save, post_delete], sender=ParkingUserBinding)
+@receiver([post_save, post_delete], sender=Bill)
+def invalidate_dashboard_stats(sender, **kwargs):
+    """工作台相关数据变更后，在事务提交时使统计缓存失效"""
+    transaction.on_commit(DashboardService.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Building)
+@receiver([post_save, post_delete], sender=House)
+@receiver([post_save, post_delete], sender=HouseUserBinding)
+@receiver([post_save, post_delete], sender=ParkingSpace)
+@receiver([post_save, post_delete], sender=ParkingUserBinding)
+def invalidate_property_tree(sender, **kwargs):
+    """楼栋、房屋、车位或绑定关系变更后，在事务提交时使房产树缓存失效"""
+    transaction.on_commit(PropertyTreeService.invalidate)
+
+
+@receiver(post_delete, sender=Bill)
+def remove_bill_from_stats(sender, instance, origin=None, **kwargs):
+    """
+    账单删除后从统计汇总表中扣除
+
+    用信号而不是覆盖 Bill.delete，房屋、用户级联删除和 QuerySet.delete() 同样会触发；
+    删除楼栋时其汇总行随楼栋一并级联删除，不再扣减。
+    """
+    if isinstance(origin, Building) or getattr(origin, 'model', None) is Building:
+        return
+    BillStatsService.record_change(instance.get_stats_snapshot(), None)
@@ -0,0 +1,1136 @@
+"""
+property 模块服务层测试
+"""
+import io
+import json
+import os
+import time
+import zipfile
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from property.models import (
+    Bill, BillingJob, AccessLog, AccessLogCounter, Building, House, HouseUserBinding, ParkingSpace, ParkingUserBinding
+)
+from users.models import Notification
+from property.billing_service import BillGenerationService, BillGenerationError, BillStatsService
+from property.billing_job_service import BillingJobService
+from property.dashboard_service import DashboardService
+from property.access_log_service import (
+    AccessLogService, AccessLogPartitionService, AccessLogCounterService, AccessLogIngestService
+)
+from property.access_log_buffer import AccessLogBufferService
+from property.property_tree_service import PropertyTreeService
+from property.binding_audit_service import HouseBindingAuditService
+from property.import_service import HouseImportService
+from common.export import StreamingExporter
+from common.sequence_service import SequenceService
+from property.tests.fixtures import (
+    BuildingFactory, HouseFactory, HouseUserBindingFactory, FeeStandardFactory, BillFactory,
+    RepairOrderFactory, AccessLogFactory, ParkingUserBindingFactory, ParkingSpaceFactory,
+    HouseBindingApplicationFactory, ParkingBindingApplicationFactory
+)
+
+
+class TestBillGenerationService:
+    """账单批量生成服务测试"""
+
+    @pytest.mark.django_db
+    def test_generate_bills_for_owners(self):
+        """测试只为已绑定业主的房屋生成账单，并按楼栋统计数量"""
+        building_a = BuildingFactory(name='1号楼')
+        building_b = BuildingFactory(name='2号楼')
+        for _ in range(3):
+            HouseUserBindingFactory(house=HouseFactory(building=building_a, area=Decimal('100.00')))
+        HouseUserBindingFactory(house=HouseFactory(building=building_b, area=Decimal('80.00')))
+        # 租客和已解绑的房屋不生成账单
+        HouseUserBindingFactory(house=HouseFactory(building=building_b), identity=3)
+        HouseUserBindingFactory(house=HouseFactory(building=building_b), status=2)
+        fee_standard = FeeStandardFactory(
+            fee_type='property', unit_price=Decimal('2.00'), billing_unit='per_sqm_month'
+        )
+
+        result = BillGenerationService.generate(fee_standard, 'property', 2025, 12)
+
+        assert result['generated_count'] == 4
+        assert result['building_counts'] == {'1号楼': 3, '2号楼': 1}
+        bills = Bill.objects.all()
+        assert bills.count() == 4
+        assert len({bill.bill_no for bill in bills}) == 4
+        assert bills.filter(house__building=building_b).get().amount == Decimal('160.00')
+
+    @pytest.mark.django_db
+    def test_generate_bills_target_buildings(self):
+        """测试只为指定楼栋生成账单"""
+        building_a = BuildingFactory(name='1号楼')
+        building_b = BuildingFactory(name='2号楼')
+        HouseUserBindingFactory(house=HouseFactory(building=building_a, area=Decimal('90.00')))
+        HouseUserBindingFactory(house=HouseFactory(building=building_b, area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+
+        result = BillGenerationService.generate(fee_standard, 'property', 2025, 12, ['2号楼'])
+
+        assert result['building_counts'] == {'2号楼': 1}
+
+    @pytest.mark.django_db
+    def test_generate_bills_rejects_duplicate_period(self):
+        """测试同一周期重复生成被拒绝"""
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+        BillGenerationService.generate(fee_standard, 'property', 2025, 12)
+
+        with pytest.raises(BillGenerationError):
+            BillGenerationService.generate(fee_standard, 'property', 2025, 12)
+        assert Bill.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_bill_nos_are_sequential(self):
+        """测试账单号从序列中连续分配"""
+        first = BillGenerationService.allocate_bill_nos(2)
+        second = BillGenerationService.allocate_bill_nos(1)
+
+        assert first[0].endswith('00000001')
+        assert first[1].endswith('00000002')
+        assert second[0].endswith('00000003')
+
+
+class TestBillingJobService:
+    """缴费后台任务服务测试"""
+
+    @pytest.mark.django_db
+    def test_generate_job_runs_and_reports_progress(self):
+        """测试账单生成任务按楼栋执行并记录进度"""
+        building_a = BuildingFactory(name='1号楼')
+        building_b = BuildingFactory(name='2号楼')
+        HouseUserBindingFactory(house=HouseFactory(building=building_a, area=Decimal('90.00')))
+        HouseUserBindingFactory(house=HouseFactory(building=building_b, area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+
+        job, created = BillingJobService.submit_generate(fee_standard, 'property', 2025, 12)
+        assert created
+        assert BillingJobService.claim_next().id == job.id
+        BillingJobService.run(job)
+
+        job.refresh_from_db()
+        assert job.status == 'succeeded'
+        assert job.progress == 100
+        assert job.result['generated_count'] == 2
+        assert job.result['building_counts'] == {'1号楼': 1, '2号楼': 1}
+        assert BillingJobService.claim_next() is None
+
+    @pytest.mark.django_db
+    def test_generate_job_is_idempotent(self):
+        """测试重复提交和重试都不会重复出账"""
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+
+        job, _ = BillingJobService.submit_generate(fee_standard, 'property', 2025, 12)
+        BillingJobService.run(BillingJobService.claim_next())
+        same_job, created = BillingJobService.submit_generate(fee_standard, 'property', 2025, 12)
+        assert not created
+        assert same_job.id == job.id
+
+        # 模拟工作进程中途退出后任务被重新执行
+        BillingJob.objects.filter(id=job.id).update(status='pending')
+        BillingJobService.run(BillingJobService.claim_next())
+        assert Bill.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_job_detail_endpoint(self, api_client):
+        """测试任务进度查询接口"""
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+
+        response = api_client.post('/api/property/bills/generate', {
+            'fee_type': 'property',
+            'billing_year': 2025,
+            'billing_month': 12,
+            'fee_standard_id': fee_standard.id,
+            'async': True,
+        }, format='json')
+        assert response.status_code == 202
+        job_id = response.data['data']['id']
+
+        response = api_client.get(f'/api/property/jobs/{job_id}')
+        assert response.status_code == 200
+        assert response.data['data']['status'] == 'pending'
+
+    @pytest.mark.django_db
+    def test_generate_queues_by_default_above_threshold(self, api_client, settings):
+        """测试未指定 async 时，待出账房屋数达到阈值才提交后台任务"""
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(fee_type='property', unit_price=Decimal('2.00'))
+        payload = {'fee_type': 'property', 'billing_year': 2025, 'billing_month': 12, 'fee_standard_id': fee_standard.id}
+
+        settings.BILLING_ASYNC_THRESHOLD = 2
+        response = api_client.post('/api/property/bills/generate', {**payload, 'async': False}, format='json')
+        assert response.status_code == 200
+        assert response.data['data']['generated_count'] == 2
+
+        response = api_client.post('/api/property/bills/generate', {**payload, 'billing_month': 11}, format='json')
+        assert response.status_code == 202
+        assert BillingJob.objects.count() == 1
+
+        settings.BILLING_ASYNC_THRESHOLD = 3
+        response = api_client.post('/api/property/bills/generate', {**payload, 'billing_month': 10}, format='json')
+        assert response.status_code == 200
+
+
+class TestBillStatsService:
+    """账单统计汇总服务测试"""
+
+    @pytest.mark.django_db
+    def test_rollup_tracks_save_payment_and_delete(self):
+        """测试账单新建、支付、删除时增量更新汇总表"""
+        bill = BillFactory(fee_type='property', amount=Decimal('100.00'), status='unpaid')
+        BillFactory(fee_type='water', amount=Decimal('30.00'), status='unpaid')
+
+        summary = BillStatsService.get_summary()
+        assert summary['total_bills'] == 2
+        assert summary['unpaid_amount'] == 130.0
+
+        bill.refresh_from_db()
+        bill.mark_as_paid('wechat', 'REF001')
+        summary = BillStatsService.get_summary()
+        assert summary['paid_bills'] == 1
+        assert summary['paid_amount'] == 100.0
+        assert summary['unpaid_amount'] == 30.0
+        assert summary['collection_rate'] == 50.0
+
+        bill.delete()
+        summary = BillStatsService.get_summary()
+        assert summary['total_bills'] == 1
+        assert summary['paid_bills'] == 0
+
+    @pytest.mark.django_db
+    def test_rollup_tracks_cascade_and_queryset_deletes(self):
+        """测试房屋、用户级联删除和批量删除账单时同样扣减汇总表，删除楼栋时汇总行一并删除"""
+        from property.models import BillStatsRollup
+        from users.tests.fixtures import UserFactory
+        user = UserFactory()
+        house = HouseFactory()
+        BillFactory(house=house, amount=Decimal('100.00'))
+        BillFactory(house=house, amount=Decimal('50.00'))
+        BillFactory(user=user, amount=Decimal('30.00'))
+        BillFactory(fee_type='water', amount=Decimal('20.00'))
+        kept = BillFactory(amount=Decimal('10.00'))
+
+        house.delete()
+        user.delete()
+        Bill.objects.filter(fee_type='water').delete()
+
+        incremental = BillStatsService.get_summary()
+        assert incremental['total_bills'] == 1
+        BillStatsService.rebuild()
+        assert BillStatsService.get_summary() == incremental
+
+        kept.house.building.delete()
+        assert BillStatsService.get_summary()['total_bills'] == 0
+        assert not BillStatsRollup.objects.exists()
+
+    @pytest.mark.django_db
+    def test_rollup_without_loaded_snapshot_is_not_double_counted(self):
+        """测试 .only() 加载或指定主键构造的账单保存时按库中现有行计算差值"""
+        bill = BillFactory(fee_type='property', amount=Decimal('100.00'), status='unpaid')
+
+        partial = Bill.objects.only('id', 'status', 'paid_amount').get(pk=bill.pk)
+        partial.status = 'paid'
+        partial.paid_amount = Decimal('100.00')
+        partial.save()
+        summary = BillStatsService.get_summary()
+        assert (summary['total_bills'], summary['paid_bills']) == (1, 1)
+
+        rebuilt = Bill.objects.get(pk=bill.pk)
+        rebuilt._state.adding = True
+        del rebuilt._stats_snapshot
+        rebuilt.amount = Decimal('120.00')
+        rebuilt.save()
+        summary = BillStatsService.get_summary()
+        assert summary['total_bills'] == 1
+        incremental = summary
+        BillStatsService.rebuild()
+        assert BillStatsService.get_summary() == incremental
+
+    @pytest.mark.django_db
+    def test_rollup_matches_rebuild(self):
+        """测试增量维护的汇总结果与全量重建一致"""
+        HouseUserBindingFactory(house=HouseFactory(area=Decimal('90.00')))
+        fee_standard = FeeStandardFactory(
+            fee_type='property', unit_price=Decimal('2.00'), billing_unit='per_sqm_month'
+        )
+        BillGenerationService.generate(fee_standard, 'property', 2030, 1)
+        overdue = BillFactory(fee_type='water', amount=Decimal('30.00'), status='unpaid')
+        overdue.refresh_from_db()
+        overdue.due_date = date.today() - timedelta(days=3)
+        overdue.save()
+
+        incremental = BillStatsService.get_summary()
+        BillStatsService.rebuild()
+
+        assert incremental == BillStatsService.get_summary()
+        assert incremental['total_bills'] == 2
+        assert incremental['overdue_bills'] == 1
+        assert incremental['total_amount'] == 210.0
+
+    @pytest.mark.django_db
+    def test_bill_stats_endpoint_reads_rollup(self, api_client, django_assert_num_queries):
+        """测试统计接口只查询一次汇总表"""
+        BillFactory(amount=Decimal('100.00'))
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/property/bills/stats')
+
+        assert response.status_code == 200
+        assert response.data['data']['total_bills'] == 1
+
+
+class TestDashboardService:
+    """工作台统计服务测试"""
+
+    @pytest.mark.django_db
+    def test_dashboard_stats(self):
+        """测试工单趋势、类型分布和真实收缴率"""
+        cache.clear()
+        RepairOrderFactory(repair_type='water')
+        RepairOrderFactory(repair_type='water', status='completed')
+        RepairOrderFactory(repair_type='door')
+        BillFactory(fee_type='property', status='paid', amount=Decimal('100.00'))
+        BillFactory(fee_type='property', status='unpaid', amount=Decimal('100.00'))
+        # 其他费用类型和已取消的账单不计入物业费收缴率
+        BillFactory(fee_type='parking', status='unpaid', amount=Decimal('100.00'))
+        BillFactory(fee_type='property', status='cancelled', amount=Decimal('100.00'))
+
+        stats = DashboardService.get_stats(7)
+
+        assert stats['pendingWorkOrders'] == 2
+        assert stats['todayRepairs'] == 3
+        assert len(stats['workOrderTrend']) == 7
+        assert stats['workOrderTrend'][-1]['count'] == 3
+        assert stats['repairTypeDistribution'][0] == {'type': '水电', 'value': 2}
+        assert stats['feeCollectionRate'] == 0.5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dashboard_cache_invalidated_on_write(self):
+        """测试数据变更后缓存失效"""
+        cache.clear()
+        assert DashboardService.get_stats(7)['pendingWorkOrders'] == 0
+
+        RepairOrderFactory(status='pending')
+
+        assert DashboardService.get_stats(7)['pendingWorkOrders'] == 1
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('days', [1, 7, 30, 365])
+    def test_dashboard_query_count_is_constant(self, api_client, django_assert_num_queries, days):
+        """测试工作台查询条数与统计天数无关"""
+        RepairOrderFactory()
+        cache.clear()
+
+        with django_assert_num_queries(8):
+            response = api_client.get(f'/api/property/dashboard/stats?days={days}')
+
+        assert response.status_code == 200
+        assert len(response.data['data']['workOrderTrend']) == days
+
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('days', ['abc', '7.5', '0', '366'])
+    def test_dashboard_rejects_invalid_days(self, api_client, days):
+        """测试统计天数不是 1-365 的整数时返回 400"""
+        response = api_client.get('/api/property/dashboard/stats', {'days': days})
+
+        assert response.status_code == 400
+        assert response.data['code'] == 400
+
+class TestListPagination:
+    """列表接口游标分页测试"""
+
+    @pytest.mark.django_db
+    def test_cursor_walks_all_rows_with_equal_timestamps(self, api_client):
+        """测试时间相同的记录按 id 连续翻页，不重复也不遗漏"""
+        logs = AccessLogFactory.create_batch(5, success=True)
+        AccessLog.objects.update(timestamp=timezone.now())
+
+        seen = []
+        cursor = ''
+        while True:
+            response = api_client.get('/api/property/access-logs', {'cursor': cursor, 'page_size': 2})
+            assert response.status_code == 200
+            data = response.data['data']
+            assert data['total'] is None
+            seen.extend(item['id'] for item in data['list'])
+            if not data['has_more']:
+                break
+            cursor = data['next_cursor']
+
+        assert seen == sorted((log.id for log in logs), reverse=True)
+
+    @pytest.mark.django_db
+    def test_page_mode_keeps_shape_and_total_is_optional(self, api_client, django_assert_num_queries):
+        """测试页码分页保持原有返回结构，with_total=false 时跳过 count"""
+        RepairOrderFactory.create_batch(3)
+
+        response = api_client.get('/api/property/repair-orders', {'page': 2, 'page_size': 2})
+        data = response.data['data']
+        assert len(data['list']) == 1
+        assert data['total'] == 3
+        assert data['total_pages'] == 2
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/property/bills', {'page_size': 2, 'with_total': 'false'})
+        assert response.data['data']['total'] is None
+
+    @pytest.mark.django_db
+    def test_invalid_cursor(self, api_client):
+        """测试非法游标返回 400"""
+        response = api_client.get('/api/property/bills', {'cursor': 'not-a-cursor'})
+
+        assert response.status_code == 400
+
+
+class TestAccessLogService:
+    """门禁日志日期过滤与分区维护测试"""
+
+    @pytest.mark.django_db
+    def test_date_filter_is_half_open(self, api_client):
+        """测试结束日期包含当天全天，不包含次日 0 点"""
+        day = date(2026, 3, 31)
+        inside = AccessLogFactory(success=True)
+        boundary = AccessLogFactory(success=True)
+        AccessLog.objects.filter(id=inside.id).update(
+            timestamp=AccessLogService.day_start(day) + timedelta(hours=23, minutes=59)
+        )
+        AccessLog.objects.filter(id=boundary.id).update(
+            timestamp=AccessLogService.day_start(day + timedelta(days=1))
+        )
+
+        response = api_client.get('/api/property/access-logs', {
+            'start_date': '2026-03-31', 'end_date': '2026-03-31'
+        })
+
+        assert [item['id'] for item in response.data['data']['list']] == [inside.id]
+
+    def test_build_partition_sql(self):
+        """测试按月分区 DDL 的边界和兜底分区"""
+        sql = AccessLogPartitionService.build_partition_sql(date(2025, 11, 15), date(2026, 1, 1))
+
+        assert 'ADD PRIMARY KEY (`id`, `timestamp`)' in sql[0]
+        assert "PARTITION p202511 VALUES LESS THAN ('2025-12-01 00:00:00')" in sql[1]
+        assert "PARTITION p202601 VALUES LESS THAN ('2026-02-01 00:00:00')" in sql[1]
+        assert 'PARTITION pmax VALUES LESS THAN (MAXVALUE)' in sql[1]
+
+    @pytest.mark.django_db
+    def test_expire_without_partitions_deletes_old_rows(self):
+        """测试未分区数据库按批删除过期记录"""
+        old, recent = AccessLogFactory.create_batch(2)
+        AccessLog.objects.filter(id=old.id).update(
+            timestamp=timezone.make_aware(datetime(2024, 5, 20))
+        )
+
+        results = AccessLogPartitionService.expire(date(2024, 6, 1))
+
+        assert results[0]['rows'] == 1
+        assert list(AccessLog.objects.values_list('id', flat=True)) == [recent.id]
+
+
+class TestAccessLogIngest:
+    """门禁设备批量上报测试"""
+
+    @staticmethod
+    def make_event(sequence, **overrides):
+        event = {
+            'person_name': '张三',
+            'method': 'card',
+            'direction': 'in',
+            'location': '南大门',
+            'device_id': 'gate-01',
+            'timestamp': '2026-03-01T08:00:00+08:00',
+            'sequence': sequence,
+        }
+        event.update(overrides)
+        return event
+
+    @pytest.mark.django_db
+    def test_batch_ingest_reports_per_item_status(self, api_client):
+        """测试逐条返回状态码，非法事件不影响其他事件"""
+        events = [self.make_event(1), self.make_event(2, method='fingerprint'), self.make_event(3)]
+
+        response = api_client.post('/api/property/access-logs/batch', events, format='json')
+
+        data = response.data['data']
+        assert data['results'] == [201, 400, 201]
+        assert 'method' in data['errors'][1]
+        assert AccessLog.objects.count() == 2
+        assert AccessLog.objects.filter(sequence=1).get().timestamp == datetime.fromisoformat(
+            '2026-03-01T08:00:00+08:00'
+        )
+
+    @pytest.mark.django_db
+    def test_duplicate_events_are_idempotent(self, api_client):
+        """测试同一批内和重复上报的事件只写入一次"""
+        api_client.post('/api/property/access-logs/batch', [self.make_event(1)], format='json')
+        body = '\n'.join(json.dumps(event) for event in [self.make_event(1), self.make_event(2), self.make_event(2)])
+
+        response = api_client.generic(
+            'POST', '/api/property/access-logs/batch', body, content_type='application/x-ndjson'
+        )
+
+        assert response.data['data']['results'] == [200, 201, 200]
+        assert AccessLog.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_success_flag_is_parsed_strictly(self):
+        """测试开门结果只接受布尔值及 true/false/1/0，其余按该条事件校验失败处理"""
+        events = [
+            self.make_event(1, success='false'),
+            self.make_event(2, success=0),
+            self.make_event(3, success='TRUE'),
+            self.make_event(4),
+            self.make_event(5, success='no'),
+            self.make_event(6, success=2),
+        ]
+
+        result = AccessLogIngestService.ingest(events)
+
+        assert result['results'] == [201, 201, 201, 201, 400, 400]
+        assert 'success' in result['errors'][4] and 'success' in result['errors'][5]
+        assert dict(AccessLog.objects.values_list('sequence', 'success')) == {1: False, 2: False, 3: True, 4: True}
+
+
+    @pytest.mark.django_db
+    def test_concurrent_duplicate_is_not_counted(self, api_client, monkeypatch):
+        """测试去重查询之后被并发请求写入的事件按重复处理，不计入汇总"""
+        api_client.post('/api/property/access-logs/batch', [self.make_event(1)], format='json')
+        # 模拟另一请求在去重查询之后、写入之前写入了同一事件
+        monkeypatch.setattr(AccessLogIngestService, 'existing_keys', classmethod(lambda cls, logs: set()))
+
+        result = AccessLogIngestService.ingest([self.make_event(1), self.make_event(2)])
+
+        assert result['results'] == [200, 201]
+        assert AccessLog.objects.count() == 2
+        assert sum(AccessLogCounter.objects.values_list('count', flat=True)) == 2
+
+
+class TestAccessLogBuffer:
+    """门禁日志写后缓冲测试（无 Redis 时走本地暂存文件）"""
+
+    @pytest.mark.django_db
+    def test_write_behind_spools_then_flushes_once(self, api_client, settings, tmp_path):
+        """测试上报只写缓冲不入库，重复导入同一批事件只入库一次"""
+        settings.ACCESS_LOG_WRITE_BEHIND = True
+        settings.ACCESS_LOG_SPOOL_DIR = str(tmp_path)
+        events = [TestAccessLogIngest.make_event(1), TestAccessLogIngest.make_event(2, method='bad')]
+
+        response = api_client.post('/api/property/access-logs/batch', events, format='json')
+
+        assert response.status_code == 202
+        assert response.data['data']['results'] == [202, 400]
+        assert AccessLog.objects.count() == 0
+        assert AccessLogBufferService.get_metrics()['spool_files'] == 1
+
+        # 模拟入库后未来得及删除暂存文件、再次导入
+        spool_file = next(tmp_path.iterdir())
+        content = spool_file.read_text(encoding='utf-8')
+        AccessLogBufferService.flush_spool(include_current=True)
+        spool_file.write_text(content, encoding='utf-8')
+        result = AccessLogBufferService.flush_spool(include_current=True)
+
+        assert result == {'created': 0, 'duplicates': 1, 'invalid': 0}
+        assert AccessLog.objects.count() == 1
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.django_db
+    def test_flush_spool_claims_each_file_once(self, settings, tmp_path):
+        """测试暂存文件被认领后其他进程跳过，认领过期的文件会被重新导入"""
+        settings.ACCESS_LOG_SPOOL_DIR = str(tmp_path)
+        log = AccessLogBufferService.from_payload(json.dumps(TestAccessLogIngest.make_event(1)))
+        AccessLogBufferService.spool([AccessLogBufferService.to_payload(log)])
+        spool_file = str(next(tmp_path.iterdir()))
+
+        # 另一个进程已认领该文件
+        processing = AccessLogBufferService.claim_spool_file(spool_file)
+        assert AccessLogBufferService.claim_spool_file(spool_file) is None
+        assert AccessLogBufferService.flush_spool(include_current=True) == {
+            'created': 0, 'duplicates': 0, 'invalid': 0
+        }
+        assert AccessLog.objects.count() == 0
+
+        # 认领进程退出，文件过期后重新认领导入
+        expired = time.time() - AccessLogBufferService.SPOOL_STALE_SECONDS - 1
+        os.utime(processing, (expired, expired))
+        result = AccessLogBufferService.flush_spool(include_current=True)
+
+        assert result == {'created': 1, 'duplicates': 0, 'invalid': 0}
+        assert AccessLog.objects.count() == 1
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestAccessLogCounter:
+    """门禁通行小时汇总测试"""
+
+    def post_events(self, api_client):
+        events = [
+            TestAccessLogIngest.make_event(1, timestamp='2026-03-01T08:10:00+00:00'),
+            TestAccessLogIngest.make_event(2, timestamp='2026-03-01T08:50:00+00:00', method='face'),
+            TestAccessLogIngest.make_event(3, timestamp='2026-03-02T18:05:00+00:00'),
+            TestAccessLogIngest.make_event(4, timestamp='2026-03-02T18:06:00+00:00', success=False),
+        ]
+        api_client.post('/api/property/access-logs/batch', events, format='json')
+
+    @pytest.mark.django_db
+    def test_ingest_updates_counters_incrementally(self, api_client):
+        """测试上报时按小时累加，重复上报和失败记录不计数，与全量重建一致"""
+        self.post_events(api_client)
+        self.post_events(api_client)
+
+        incremental = sorted(AccessLogCounter.objects.values_list('hour', 'method', 'count'))
+        assert sum(count for _, _, count in incremental) == 3
+
+        AccessLogCounterService.rebuild()
+        assert sorted(AccessLogCounter.objects.values_list('hour', 'method', 'count')) == incremental
+
+    @pytest.mark.django_db
+    def test_statistics_endpoint_single_query(self, api_client, django_assert_num_queries):
+        """测试统计接口只对汇总表做一次分组查询"""
+        self.post_events(api_client)
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/property/access-logs/statistics', {
+                'start_date': '2026-03-01', 'end_date': '2026-03-02'
+            })
+
+        data = response.data['data']
+        assert data['total_count'] == 3
+        assert data['daily_trend'] == [{'date': '03-01', 'count': 2}, {'date': '03-02', 'count': 1}]
+        assert data['hourly_distribution'][8] == {'hour': '08:00', 'count': 2}
+        assert data['hourly_distribution'][18]['count'] == 1
+        assert data['method_distribution'][0] == {'method': '刷卡', 'count': 2, 'percentage': 66.67}
+
+
+class TestExport:
+    """账单和门禁日志流式导出测试"""
+
+    @pytest.mark.django_db
+    def test_access_log_csv_export_reuses_filters(self, api_client, monkeypatch):
+        """测试导出沿用列表筛选条件，并跨多个分块完整输出"""
+        monkeypatch.setattr(StreamingExporter, 'CHUNK_SIZE', 2)
+        AccessLogFactory.create_batch(5, location='南大门', success=True)
+        AccessLogFactory(location='1栋东门', success=True)
+        AccessLog.objects.update(timestamp=timezone.now())
+
+        response = api_client.get('/api/property/access-logs/export', {'location': '南大门'})
+
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        lines = content.strip().splitlines()
+        assert response['Content-Disposition'].endswith('.csv"')
+        assert lines[0].startswith('记录时间,人员姓名')
+        assert len(lines) == 6
+        assert all('南大门' in line for line in lines[1:])
+
+    @pytest.mark.django_db
+    def test_bill_xlsx_export(self, api_client):
+        """测试 XLSX 导出为有效的 zip 工作簿"""
+        BillFactory(fee_type='property', amount=Decimal('100.00'))
+        BillFactory(fee_type='water', amount=Decimal('30.00'))
+
+        response = api_client.get('/api/property/bills/export', {'file_type': 'xlsx', 'fee_type': 'water'})
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        assert sheet.count('<row>') == 2
+        assert '水费' in sheet and '物业费' not in sheet
+        assert '<v>30.00</v>' in sheet
+
+
+class TestInventoryList:
+    """房屋/车位列表测试"""
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('house_count', [1, 20])
+    def test_house_list_query_count_is_constant(self, api_client, django_assert_num_queries, house_count):
+        """测试房屋列表查询条数与房屋数量无关"""
+        building = BuildingFactory(name='1号楼')
+        for _ in range(house_count):
+            HouseUserBindingFactory(house=HouseFactory(building=building))
+
+        with django_assert_num_queries(2):
+            response = api_client.get('/api/property/house/list')
+        assert len(response.data['data']) == house_count
+        assert response.data['data'][0]['ownerName']
+
+        with django_assert_num_queries(3):
+            response = api_client.get('/api/property/house/list', {'page': 1, 'page_size': 10})
+        assert response.data['data']['total'] == house_count
+
+    @pytest.mark.django_db
+    def test_house_list_filters_and_columns_layout(self, api_client):
+        """测试按楼栋、单元、状态筛选和列式返回"""
+        building = BuildingFactory(name='2号楼')
+        bound = HouseFactory(building=building, unit='1单元', status=1)
+        HouseUserBindingFactory(house=bound)
+        HouseUserBindingFactory(house=HouseFactory(building=building, unit='1单元'), status=2)
+        HouseFactory(building=building, unit='2单元', status=1)
+        HouseFactory(building=building, unit='1单元', status=2)
+
+        response = api_client.get('/api/property/house/list', {
+            'building': '2号楼', 'unit': '1单元', 'status': 'self', 'layout': 'columns'
+        })
+
+        data = response.data['data']
+        owner_index = data['columns'].index('ownerName')
+        assert len(data['rows']) == 2
+        owners = {row[0]: row[owner_index] for row in data['rows']}
+        assert owners[bound.id] is not None
+        assert sum(owner is None for owner in owners.values()) == 1
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('space_count', [1, 20])
+    def test_parking_list_query_count_is_constant(self, api_client, django_assert_num_queries, space_count):
+        """测试车位列表查询条数与车位数量无关"""
+        for _ in range(space_count):
+            ParkingUserBindingFactory()
+        ParkingSpaceFactory(status=3)
+
+        with django_assert_num_queries(2):
+            response = api_client.get('/api/parking/space/list', {'status': 'active'})
+
+        assert len(response.data['data']) == space_count
+        assert response.data['data'][0]['carNo']
+
+
+    def test_subclass_missing_hook_is_rejected(self):
+        """测试定义子类时缺少钩子直接报错"""
+        from property.inventory_service import InventoryListService
+
+        with pytest.raises(TypeError, match='to_row'):
+            class IncompleteListService(InventoryListService):
+                @classmethod
+                def filter_queryset(cls, queryset, params):
+                    return queryset
+
+class TestPropertyTree:
+    """房产层级树测试"""
+
+    @pytest.mark.django_db
+    def test_tree_marks_bound_rooms_and_spaces(self, api_client):
+        """测试层级树内容及可绑定状态，选项接口只返回未绑定的房号/车位"""
+        cache.clear()
+        building = BuildingFactory(name='3号楼')
+        bound = HouseFactory(building=building, unit='1单元', room_number='101')
+        HouseFactory(building=building, unit='1单元', room_number='102')
+        HouseFactory(building=building, unit='2单元', room_number='201')
+        HouseUserBindingFactory(house=bound)
+        space = ParkingSpaceFactory(area_name='A区', space_number='A-001')
+        ParkingSpaceFactory(area_name='A区', space_number='A-002')
+        ParkingUserBindingFactory(parking_space=space)
+
+        tree, etag = PropertyTreeService.get_tree()
+
+        node = PropertyTreeService.find_building(tree, '3号楼')
+        assert [unit['unit'] for unit in node['units']] == ['1单元', '2单元']
+        assert node['units'][0]['rooms'] == [
+            {'room': '101', 'available': False},
+            {'room': '102', 'available': True},
+        ]
+        area = next(area for area in tree['parking_areas'] if area['area'] == 'A区')
+        assert area['spaces'] == [
+            {'space': 'A-001', 'available': False},
+            {'space': 'A-002', 'available': True},
+        ]
+
+        response = api_client.get('/api/property/house/options/rooms', {'building': '3号楼', 'unit': '1单元'})
+        assert response.data['data'] == ['102']
+        response = api_client.get('/api/parking/options/spaces', {'area': 'A区'})
+        assert response.data['data'] == ['A-002']
+        response = api_client.get('/api/property/house/options/units', {'building': '不存在'})
+        assert response.status_code == 404
+
+    @pytest.mark.django_db
+    def test_tree_endpoint_etag_and_cache_hit(self, api_client, django_assert_num_queries):
+        """测试缓存命中不查库，If-None-Match 匹配时返回 304"""
+        cache.clear()
+        HouseFactory(building=BuildingFactory(name='5号楼'))
+
+        response = api_client.get('/api/property/options/tree')
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert response.data['data']['buildings'][0]['building'] == '5号楼'
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/property/options/tree', HTTP_IF_NONE_MATCH=etag)
+            api_client.get('/api/property/house/options/buildings')
+        assert response.status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_tree_invalidated_on_binding_change(self, api_client):
+        """测试绑定或解绑后房产树缓存失效"""
+        cache.clear()
+        house = HouseFactory(building=BuildingFactory(name='6号楼'), unit='1单元', room_number='101')
+        params = {'building': '6号楼', 'unit': '1单元'}
+        etag = api_client.get('/api/property/options/tree')['ETag']
+        assert api_client.get('/api/property/house/options/rooms', params).data['data'] == ['101']
+
+        binding = HouseUserBindingFactory(house=house)
+        assert api_client.get('/api/property/house/options/rooms', params).data['data'] == []
+        assert api_client.get('/api/property/options/tree', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+        binding.status = 2
+        binding.save()
+        assert api_client.get('/api/property/house/options/rooms', params).data['data'] == ['101']
+
+
+class TestBindingAudit:
+    """绑定申请批量审核测试"""
+
+    @staticmethod
+    def make_applications(count, building):
+        applications = []
+        for _ in range(count):
+            house = HouseFactory(building=building, status=3)
+            applications.append(HouseBindingApplicationFactory(
+                building_name=building.name, unit_name=house.unit, room_number=house.room_number, identity=1
+            ))
+        return applications
+
+    @pytest.mark.django_db
+    def test_batch_audit_reports_per_application_results(self, api_client):
+        """测试批量审核按条返回结果，通过的申请建立绑定并更新房屋状态"""
+        building = BuildingFactory(name='7号楼')
+        owner, tenant = self.make_applications(2, building)
+        tenant.identity = 3
+        tenant.save()
+        missing_house = HouseBindingApplicationFactory(building_name='不存在')
+        rejected = HouseBindingApplicationFactory()
+        audited = HouseBindingApplicationFactory(status=1)
+
+        response = api_client.post('/api/property/house/binding/audit/batch', {'items': [
+            {'id': owner.id, 'action': 'approve'},
+            {'id': tenant.id, 'action': 'approve'},
+            {'id': missing_house.id, 'action': 'approve'},
+            {'id': rejected.id, 'action': 'reject', 'reject_reason': '资料不全'},
+            {'id': audited.id, 'action': 'approve'},
+            {'id': rejected.id, 'action': 'reject'},
+            {'id': 999999, 'action': 'approve'},
+        ]}, format='json')
+
+        data = response.data['data']
+        assert [result['code'] for result in data['results']] == [200, 200, 200, 200, 409, 409, 404]
+        assert data['succeeded'] == 4 and data['failed'] == 3
+
+        owner_binding = HouseUserBinding.objects.get(application=owner)
+        assert owner_binding.house.status == 1
+        assert HouseUserBinding.objects.get(application=tenant).house.status == 2
+        assert HouseUserBinding.objects.get(application=missing_house).house is None
+        assert not HouseUserBinding.objects.filter(application=rejected).exists()
+        rejected.refresh_from_db()
+        assert rejected.status == 2 and rejected.reject_reason == '资料不全'
+        assert Notification.objects.filter(related_object_type='housebindingapplication').count() == 4
+
+    @pytest.mark.django_db
+    def test_batch_audit_query_count_is_constant(self):
+        """测试批量审核查询条数与申请数量无关"""
+        building = BuildingFactory(name='8号楼')
+        counts = []
+        for count in (2, 30):
+            applications = self.make_applications(count, building)
+            with CaptureQueriesContext(connection) as queries:
+                results = HouseBindingAuditService.audit(
+                    [{'id': application.id, 'action': 'approve'} for application in applications]
+                )
+            assert all(result['code'] == 200 for result in results)
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1]
+        assert House.objects.filter(building=building, status=1).count() == 32
+
+    @pytest.mark.django_db
+    def test_single_audit_uses_same_pipeline(self, api_client):
+        """测试单条审核接口返回与原来一致"""
+        space = ParkingSpaceFactory(status=3)
+        application = ParkingBindingApplicationFactory(parking_area=space.area_name, parking_no=space.space_number)
+
+        response = api_client.patch(f'/api/parking/binding/audit/{application.id}', {'action': 'reject'}, format='json')
+        assert response.status_code == 400
+        assert response.data['message'] == '请输入拒绝原因'
+
+        response = api_client.patch(f'/api/parking/binding/audit/{application.id}', {'action': 'approve'}, format='json')
+        assert response.data == {'code': 200, 'message': '审核通过'}
+        assert ParkingUserBinding.objects.get(application=application).parking_space_id == space.id
+        assert ParkingSpace.objects.get(id=space.id).status == 1
+
+        response = api_client.patch(f'/api/parking/binding/audit/{application.id}', {'action': 'approve'}, format='json')
+        assert response.status_code == 409
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batch_audit_invalidates_property_tree(self, api_client):
+        """测试批量审核后房产树缓存失效"""
+        cache.clear()
+        building = BuildingFactory(name='9号楼')
+        application, = self.make_applications(1, building)
+        params = {'building': '9号楼', 'unit': application.unit_name}
+        assert api_client.get('/api/property/house/options/rooms', params).data['data'] == [application.room_number]
+
+        api_client.post('/api/property/house/binding/audit/batch', {
+            'ids': [application.id], 'action': 'approve'
+        }, format='json')
+
+        assert api_client.get('/api/property/house/options/rooms', params).data['data'] == []
+
+
+    def test_subclass_missing_hook_is_rejected(self):
+        """测试定义子类时缺少钩子直接报错"""
+        from property.binding_audit_service import BindingAuditService
+
+        with pytest.raises(TypeError, match='resolve_targets, target_status, describe'):
+            class IncompleteAuditService(BindingAuditService):
+                @classmethod
+                def target_key(cls, application):
+                    return application.id
+
+class TestAssetImport:
+    """楼栋/房屋/车位批量导入测试"""
+
+    @staticmethod
+    def csv_file(rows, name='houses.csv'):
+        content = b''.join(StreamingExporter.stream_csv(rows[0], rows[1:]))
+        return SimpleUploadedFile(name, content, content_type='text/csv')
+
+    @pytest.mark.django_db
+    def test_house_import_upserts_and_reports_errors(self, api_client):
+        """测试房屋导入：新增、按唯一键更新、文件内重复和校验错误写入错误报告"""
+        building = BuildingFactory(name='10号楼')
+        existing = HouseFactory(building=building, unit='1单元', room_number='101', floor=1, area=Decimal('80.00'))
+
+        upload = self.csv_file([
+            ['楼栋', '单元', '楼层', '房号', '面积', '状态'],
+            ['10号楼', '1单元', '1', '101', '95.5', '出租'],
+            ['10号楼', '1单元', '1', '102', '88', ''],
+            ['11号楼', '2单元', '3', '301', '120.00', 'empty'],
+            ['11号楼', '2单元', '3', '301', '120.00', 'empty'],
+            ['11号楼', '2单元', '三', '302', '120.00', ''],
+            ['11号楼', '2单元', '3', '303', '-1', ''],
+        ])
+        response = api_client.post('/api/property/import/houses', {'file': upload}, format='multipart')
+
+        data = response.data['data']
+        assert (data['total'], data['created'], data['updated'], data['failed']) == (6, 2, 1, 3)
+        assert [error['row'] for error in data['errors']] == [5, 6, 7]
+
+        existing.refresh_from_db()
+        assert existing.area == Decimal('95.50') and existing.status == 2
+        new_house = House.objects.get(building__name='11号楼', room_number='301')
+        assert new_house.status == 3 and new_house.floor == 3
+
+        report = api_client.get(data['error_report_url'])
+        assert report.status_code == 200
+        lines = b''.join(report.streaming_content).decode('utf-8-sig').splitlines()
+        assert lines[0].startswith('行号,错误原因,楼栋')
+        assert len(lines) == 4 and '重复' in lines[1]
+
+    @pytest.mark.django_db
+    def test_parking_import_from_xlsx(self, api_client):
+        """测试从 XLSX 导入车位，已存在的车位更新类型"""
+        ParkingSpaceFactory(area_name='C区', space_number='C-001', parking_type='owned')
+        content = b''.join(StreamingExporter.stream_xlsx(
+            ['停车区域', '车位号', '车位类型'],
+            [['C区', 'C-001', '租赁车位'], ['C区', 'C-002', 'owned'], ['C区', '', 'owned']],
+        ))
+        upload = SimpleUploadedFile('spaces.xlsx', content)
+
+        response = api_client.post('/api/property/import/parking-spaces', {'file': upload}, format='multipart')
+
+        data = response.data['data']
+        assert (data['created'], data['updated'], data['failed']) == (1, 1, 1)
+        assert data['errors'][0]['message'] == '车位号不能为空'
+        assert ParkingSpace.objects.get(area_name='C区', space_number='C-001').parking_type == 'rented'
+
+    @pytest.mark.django_db
+    def test_reimport_without_optional_columns_keeps_existing_values(self, api_client):
+        """测试重新导入时缺少状态列或状态为空，不覆盖已有房屋和车位的状态"""
+        building = BuildingFactory(name='12号楼')
+        rented = HouseFactory(building=building, unit='1单元', room_number='101', floor=1, status=2)
+        empty = HouseFactory(building=building, unit='1单元', room_number='102', floor=1, status=3)
+
+        upload = self.csv_file([
+            ['楼栋', '单元', '楼层', '房号', '面积'],
+            ['12号楼', '1单元', '2', '101', '90'],
+            ['12号楼', '1单元', '2', '103', '90'],
+        ])
+        data = api_client.post('/api/property/import/houses', {'file': upload}, format='multipart').data['data']
+        assert (data['created'], data['updated']) == (1, 1)
+        upload = self.csv_file([
+            ['楼栋', '单元', '楼层', '房号', '面积', '状态'],
+            ['12号楼', '1单元', '2', '102', '90', ''],
+        ])
+        api_client.post('/api/property/import/houses', {'file': upload}, format='multipart')
+
+        rented.refresh_from_db()
+        empty.refresh_from_db()
+        assert (rented.floor, rented.status) == (2, 2)
+        assert (empty.floor, empty.status) == (2, 3)
+        assert House.objects.get(building=building, room_number='103').status == 1
+
+        space = ParkingSpaceFactory(area_name='D区', space_number='D-001', parking_type='rented', status=2)
+        upload = self.csv_file([['停车区域', '车位号', '状态'], ['D区', 'D-001', '']], name='spaces.csv')
+        response = api_client.post('/api/property/import/parking-spaces', {'file': upload}, format='multipart')
+        assert response.data['data']['updated'] == 1
+        space.refresh_from_db()
+        assert (space.parking_type, space.status) == ('rented', 2)
+
+    @pytest.mark.django_db
+    def test_concurrently_created_building_is_not_duplicated(self, monkeypatch):
+        """测试楼栋已被并发导入创建时不会重复创建同名楼栋"""
+        from property.import_service import BuildingImportService
+        building = BuildingFactory(name='13号楼')
+        # 模拟查询已有楼栋之后、写入之前楼栋被其他导入创建
+        monkeypatch.setattr(BuildingImportService, 'existing_keys', classmethod(
+            lambda cls, records, context: context.setdefault('existing', set())
+        ))
+
+        BuildingImportService.run(self.csv_file([['楼栋名称'], ['13号楼'], ['14号楼']], name='b.csv'), 'csv')
+        summary = HouseImportService.run(self.csv_file([
+            ['楼栋', '单元', '楼层', '房号', '面积'], ['13号楼', '1单元', '1', '101', '90'],
+        ]), 'csv')
+
+        assert summary['created'] == 1
+        assert Building.objects.filter(name='13号楼').count() == 1
+        assert House.objects.get(room_number='101').building_id == building.id
+
+    @pytest.mark.django_db
+    def test_import_rejects_missing_columns(self, api_client):
+        """测试缺少必填列时直接返回 400"""
+        upload = self.csv_file([['楼栋', '单元'], ['1号楼', '1单元']])
+
+        response = api_client.post('/api/property/import/houses', {'file': upload}, format='multipart')
+
+        assert response.status_code == 400
+        assert '楼层' in response.data['message']
+        assert api_client.get('/api/property/import/reports/not-a-token').status_code == 404
+
+    @pytest.mark.django_db
+    def test_import_query_count_is_constant(self):
+        """测试每块数据的查询条数与行数无关"""
+        counts = []
+        for prefix, count in (('A', 2), ('B', 150)):
+            rows = [['楼栋', '单元', '楼层', '房号', '面积']] + [
+                [f'{prefix}栋', '1单元', '1', f'{i:04d}', '90'] for i in range(count)
+            ]
+            upload = self.csv_file(rows)
+            with CaptureQueriesContext(connection) as queries:
+                summary = HouseImportService.run(upload, 'csv')
+            assert summary['created'] == count
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1]
+        assert Building.objects.filter(name__in=['A栋', 'B栋']).count() == 2
+
+
+    def test_subclass_missing_hook_is_rejected(self):
+        """测试定义子类时缺少钩子直接报错，继承已有实现的子类不受影响"""
+        from property.import_service import AssetImportService
+
+        with pytest.raises(TypeError, match='existing_keys, build_objects'):
+            class IncompleteImportService(AssetImportService):
+                @classmethod
+                def clean(cls, values):
+                    return values
+
+                @classmethod
+                def get_key(cls, record):
+                    return record['name']
+
+        class CustomHouseImportService(HouseImportService):
+            label = '房屋（自定义）'
+
+
+class TestSequenceService:
+    """序列号服务测试"""
+
+    @pytest.mark.django_db
+    def test_repair_order_numbers_continue_legacy_sequence(self):
+        """测试工单号接续当日已有的最大序号，超过 999 后继续增长"""
+        date_str = date.today().strftime('%Y%m%d')
+        RepairOrderFactory(order_no=f'WO{date_str}007')
+
+        assert RepairOrderFactory().order_no == f'WO{date_str}008'
+        numbers = SequenceService.daily_numbers('repair_order', 'WO', 3, count=992)
+        assert numbers[0] == f'WO{date_str}009' and numbers[-1] == f'WO{date_str}1000'
+        assert RepairOrderFactory().order_no == f'WO{date_str}1001'
+
+    @pytest.mark.django_db
+    def test_single_and_bulk_bill_numbers_share_sequence(self):
+        """测试单张账单和批量生成共用账单号序列，号码单调递增"""
+        bill = BillFactory(amount=Decimal('100.00'))
+        reserved = BillGenerationService.allocate_bill_nos(3)
+        later = BillFactory(amount=Decimal('100.00'))
+
+        numbers = [bill.bill_no, *reserved, later.bill_no]
+        assert numbers == sorted(numbers)
+        assert len(set(numbers)) == 5
+
+    @pytest.mark.django_db
+    def test_falls_back_to_database_when_redis_fails(self, monkeypatch):
+        """测试 Redis 不可用时改用数据库计数器"""
+        class BrokenRedis:
+            def register_script(self, source):
+                raise ConnectionError('redis down')
+
+        monkeypatch.setattr(SequenceService, 'get_client', classmethod(lambda cls: BrokenRedis()))
+
+        assert SequenceService.reserve('test', 5) == (1, 5)
+        assert SequenceService.next_value('test') == 6
+
+    @pytest.mark.django_db(transaction=True)
+    def test_block_reserved_in_rolled_back_transaction_is_not_reused(self, monkeypatch):
+        """测试在调用方事务内补充号段、事务回滚后，之后发出的号码不重复"""
+        from django.db import transaction
+        from common import sequence_service
+
+        class FakeRedis:
+            """按 Lua 脚本语义模拟号段的取号和装入"""
+
+            def __init__(self):
+                self.data = {}
+
+            def register_script(self, source):
+                def take(keys, args):
+                    current, limit = (int(self.data.get(key, -1)) for key in keys)
+                    count = int(args[0])
+                    if current >= 0 and current + count <= limit:
+                        self.data[keys[0]] = current + count
+                        return current + count
+                    if source == sequence_service._TAKE_SCRIPT:
+                        return None
+                    first, last = int(args[1]), int(args[2])
+                    if first <= limit:
+                        return None
+                    self.data[keys[0]], self.data[keys[1]] = first - 1 + count, last
+                    return first - 1 + count
+                return take
+
+        redis = FakeRedis()
+        monkeypatch.setattr(SequenceService, 'get_client', classmethod(lambda cls: redis))
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                assert SequenceService.reserve('test', 1) == (1, 1)
+                raise RuntimeError('rollback')
+
+        numbers = []
+        first, last = SequenceService.reserve('test', SequenceService.BLOCK_SIZE - 1)
+        numbers.extend(range(first, last + 1))
+        # Redis 不可用时直接从数据库计数器取号
+        first, last = SequenceService._reserve_db('test', 5)
+        numbers.extend(range(first, last + 1))
+        # 事务内补充的号段在提交后才装入 Redis
+        with transaction.atomic():
+            numbers.extend(SequenceService.next_value('test') for _ in range(3))
+        numbers.extend(SequenceService.next_value('test') for _ in range(3))
+
+        assert len(numbers) == len(set(numbers))
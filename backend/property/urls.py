@@ -1,12 +1,12 @@
 from django.urls import path
 from .views import (
-    HouseCreateView, ParkingSpaceCreateView,
+    HouseCreateView, ParkingSpaceCreateView, AssetImportView, ImportErrorReportView,
     HouseBindingApplicationView, MyHouseListView, HouseBindingStatsView,
     VisitorInviteView, VisitorDetailView, VisitorStatusView, VisitorQRCodeView,
     ParkingBindingApplicationView, MyParkingListView, ParkingBindingStatsView,
-    HouseBindingAuditView, ParkingBindingAuditView, HouseBindingUnbindView, ParkingBindingUnbindView,
+    HouseBindingAuditView, HouseBindingAuditBatchView, ParkingBindingAuditView, ParkingBindingAuditBatchView, HouseBindingUnbindView, ParkingBindingUnbindView,
     HouseListView, ParkingSpaceListView, DashboardStatsView, EmployeeListView,
-    HouseBuildingOptionsView, HouseUnitOptionsView, HouseRoomOptionsView,
+    PropertyTreeView, HouseBuildingOptionsView, HouseUnitOptionsView, HouseRoomOptionsView,
     ParkingAreaOptionsView, ParkingSpaceOptionsView,
     HouseIdentityOptionsView, ParkingIdentityOptionsView,
     AnnouncementListView, AnnouncementCreateView, AnnouncementDetailView,
@@ -14,12 +14,13 @@ from .views import (
     AnnouncementCategoryOptionsView,
     RepairOrderView, RepairOrderDetailView, RepairOrderAssignView,
     RepairOrderCompleteView, RepairOrderRejectView, RepairOrderRatingView,
-    RepairEmployeeView, RepairOrderOptionsView, DashboardStatsView,
+    RepairEmployeeView, RepairOrderOptionsView,
     # 缴费管理相关视图
     FeeStandardView, BillBatchGenerateView, BillListView, BillDetailView,
-    BillPaymentView, BillReminderView, BillReceiptView, BillStatsView,
+    BillPaymentView, BillReminderView, BillReceiptView, BillStatsView, BillingJobDetailView, BillExportView,
     # 门禁日志相关视图
-    AccessLogView, AccessLogStatisticsView, AccessLogOptionsView
+    AccessLogView, AccessLogExportView, AccessLogBatchIngestView, AccessLogIngestMetricsView,
+    AccessLogStatisticsView, AccessLogOptionsView
 )
 
 urlpatterns = [
@@ -35,6 +36,7 @@ urlpatterns = [
     
     # 房屋绑定审核
     path('property/house/binding/audit', HouseBindingAuditView.as_view(), name='house_binding_audit_list'),
+    path('property/house/binding/audit/batch', HouseBindingAuditBatchView.as_view(), name='house_binding_audit_batch'),
     path('property/house/binding/audit/<int:application_id>', HouseBindingAuditView.as_view(), name='house_binding_audit'),
     
     # 房屋绑定解绑
@@ -59,6 +61,7 @@ urlpatterns = [
     
     # 车位绑定审核
     path('parking/binding/audit', ParkingBindingAuditView.as_view(), name='parking_binding_audit_list'),
+    path('parking/binding/audit/batch', ParkingBindingAuditBatchView.as_view(), name='parking_binding_audit_batch'),
     path('parking/binding/audit/<int:application_id>', ParkingBindingAuditView.as_view(), name='parking_binding_audit'),
     
     # 车位绑定解绑
@@ -67,6 +70,10 @@ urlpatterns = [
     # 基础数据管理 - 创建
     path('property/house/create', HouseCreateView.as_view(), name='house_create'),
     path('parking/space/create', ParkingSpaceCreateView.as_view(), name='parking_space_create'),
+    
+    # 楼栋/房屋/车位批量导入
+    path('property/import/reports/<str:token>', ImportErrorReportView.as_view(), name='import_error_report'),
+    path('property/import/<str:asset_type>', AssetImportView.as_view(), name='asset_import'),
 
     # 基础数据列表
     path('property/house/list', HouseListView.as_view(), name='house_list'),
@@ -79,6 +86,7 @@ urlpatterns = [
     path('property/employees', EmployeeListView.as_view(), name='employee_list'),
     
     # 房屋绑定选项数据
+    path('property/options/tree', PropertyTreeView.as_view(), name='property_tree'),
     path('property/house/options/buildings', HouseBuildingOptionsView.as_view(), name='house_buildings'),
     path('property/house/options/units', HouseUnitOptionsView.as_view(), name='house_units'), 
     path('property/house/options/rooms', HouseRoomOptionsView.as_view(), name='house_rooms'),
@@ -126,9 +134,6 @@ urlpatterns = [
     # 报修选项数据
     path('property/repair-orders/options', RepairOrderOptionsView.as_view(), name='repair_order_options'),
     
-    # Dashboard统计数据
-    path('property/dashboard/stats', DashboardStatsView.as_view(), name='dashboard_stats'),
-    
     # ===== 缴费管理相关路由 =====
     
     # 收费标准管理
@@ -137,6 +142,7 @@ urlpatterns = [
     # 账单管理
     path('property/bills/generate', BillBatchGenerateView.as_view(), name='bill_batch_generate'),
     path('property/bills', BillListView.as_view(), name='bill_list'),
+    path('property/bills/export', BillExportView.as_view(), name='bill_export'),
     path('property/bills/<int:bill_id>', BillDetailView.as_view(), name='bill_detail'),
     path('property/bills/<int:bill_id>/pay', BillPaymentView.as_view(), name='bill_payment'),
     path('property/bills/<int:bill_id>/receipt', BillReceiptView.as_view(), name='bill_receipt'),
@@ -147,11 +153,23 @@ urlpatterns = [
     # 账单统计
     path('property/bills/stats', BillStatsView.as_view(), name='bill_stats'),
 
+    # 缴费后台任务进度
+    path('property/jobs/<int:job_id>', BillingJobDetailView.as_view(), name='billing_job_detail'),
+
     # ===== 门禁日志相关路由 =====
 
     # 门禁日志基本操作（列表查看和记录创建）
     path('property/access-logs', AccessLogView.as_view(), name='access_log_list_create'),
 
+    # 门禁日志导出
+    path('property/access-logs/export', AccessLogExportView.as_view(), name='access_log_export'),
+
+    # 门禁设备批量上报
+    path('property/access-logs/batch', AccessLogBatchIngestView.as_view(), name='access_log_batch_ingest'),
+
+    # 门禁上报缓冲积压指标
+    path('property/access-logs/ingest/metrics', AccessLogIngestMetricsView.as_view(), name='access_log_ingest_metrics'),
+
     # 门禁日志统计
     path('property/access-logs/statistics', AccessLogStatisticsView.as_view(), name='access_log_statistics'),
 
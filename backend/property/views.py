@@ -2,12 +2,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.http import FileResponse
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from .models import (
     HouseBindingApplication, HouseUserBinding, House, Building, Visitor,
     ParkingBindingApplication, ParkingUserBinding, ParkingSpace, Announcement,
-    RepairOrder, RepairOrderImage, RepairEmployee, FeeStandard, Bill, AccessLog
+    RepairOrder, RepairOrderImage, RepairEmployee, FeeStandard, Bill, BillingJob, AccessLog
 )
 from .serializers import (
     HouseBindingApplicationSerializer, HouseUserBindingSerializer,
@@ -19,8 +21,18 @@ from .serializers import (
     RepairOrderAssignSerializer, RepairOrderCompleteSerializer, RepairOrderRatingSerializer,
     RepairEmployeeSerializer
 )
+from common.pagination import ListPaginator, InvalidCursor
+from .access_log_service import AccessLogService, AccessLogIngestService, AccessLogCounterService
+from .access_log_buffer import AccessLogBufferService
+from .export_service import BillExportService, AccessLogExportService
+from .inventory_service import HouseListService, ParkingSpaceListService
+from .property_tree_service import PropertyTreeService
+from .binding_audit_service import HouseBindingAuditService, ParkingBindingAuditService
+from .import_service import ASSET_IMPORT_SERVICES, ImportErrorReport
+from common.importer import TabularReader, ImportFileError
 import logging
 import json
+import os
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -94,6 +106,75 @@ class ParkingSpaceCreateView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AssetImportView(APIView):
+    """楼栋/房屋/车位批量导入接口"""
+    permission_classes = []
+
+    def post(self, request, asset_type):
+        """
+        上传 CSV/XLSX 文件批量导入（asset_type=buildings|houses|parking-spaces）
+
+        已存在的记录按唯一键更新，出错的行不影响其他行，汇总结果附带错误报告下载地址。
+        """
+        service = ASSET_IMPORT_SERVICES.get(asset_type)
+        if service is None:
+            return Response({
+                "code": 404,
+                "message": "不支持的导入类型"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                "code": 400,
+                "message": "请上传导入文件"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            file_type = TabularReader.infer_file_type(upload.name, request.data.get('file_type'))
+            summary = service.run(upload, file_type)
+        except ImportFileError as e:
+            return Response({
+                "code": 400,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"批量导入失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"批量导入失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        token = summary['error_report']
+        summary['error_report_url'] = f"/api/property/import/reports/{token}" if token else None
+        return Response({
+            "code": 200,
+            "message": "导入完成",
+            "data": summary
+        })
+
+
+class ImportErrorReportView(APIView):
+    """导入错误报告下载接口"""
+    permission_classes = []
+
+    def get(self, request, token):
+        """下载导入时生成的错误报告（CSV）"""
+        path = ImportErrorReport.get_path(token)
+        if path is None or not os.path.exists(path):
+            return Response({
+                "code": 404,
+                "message": "错误报告不存在"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f'import-errors-{token[:8]}.csv',
+            content_type='text/csv; charset=utf-8',
+        )
+
+
 class HouseBindingApplicationView(APIView):
     """房屋绑定申请接口"""
     permission_classes = []  # 暂时不需要权限认证
@@ -666,6 +747,47 @@ class ParkingBindingStatsView(APIView):
         })
 
 
+def _request_user(request):
+    """已登录时返回当前用户，否则返回 None"""
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+class BindingAuditBatchView(APIView):
+    """绑定申请批量审核接口基类，子类指定 audit_service"""
+    permission_classes = []
+    audit_service = None
+    
+    def post(self, request):
+        """
+        批量审核绑定申请
+        
+        请求体为 {"items": [{"id", "action", "remark", "reject_reason"}]}，
+        或 {"ids": [...], "action", "remark", "reject_reason"}；返回每条申请的审核结果。
+        """
+        items, error = self.audit_service.parse_items(request.data)
+        if error:
+            return Response({
+                "code": 400,
+                "message": error
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            results = self.audit_service.audit(items, auditor=_request_user(request))
+        except Exception as e:
+            logger.error(f"批量审核绑定申请失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"批量审核失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            "code": 200,
+            "message": "审核完成",
+            "data": self.audit_service.summarize(results)
+        })
+
+
 class HouseBindingAuditView(APIView):
     """房屋绑定审核接口"""
     permission_classes = []
@@ -684,88 +806,22 @@ class HouseBindingAuditView(APIView):
     
     def patch(self, request, application_id):
         """审核房屋绑定申请"""
-        try:
-            application = HouseBindingApplication.objects.get(id=application_id)
-        except HouseBindingApplication.DoesNotExist:
-            return Response({
-                "code": 404,
-                "message": "申请记录不存在"
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        action = request.data.get('action')
-        
-        if action == 'approve':
-            # 通过申请
-            application.status = 1
-            application.audit_time = timezone.now()
-            # application.auditor = request.user
-            application.audit_remark = request.data.get('remark', '')
-            application.save()
-            
-            # 查找对应的House记录
-            try:
-                from .models import Building, House
-                building = Building.objects.get(name=application.building_name)
-                house = House.objects.get(
-                    building=building,
-                    unit=application.unit_name,
-                    room_number=application.room_number
-                )
-                
-                # 更新房屋状态为已绑定（1=自住, 2=出租）
-                house.status = 1 if application.identity == 1 else 2  # 业主=自住，其他=出租
-                house.save()
-                
-                # 创建正式绑定关系，关联House记录
-                HouseUserBinding.objects.create(
-                    user=application.user,
-                    house=house,
-                    application=application,
-                    identity=application.identity
-                )
-                
-                logger.info(f"房屋绑定申请 {application_id} 已通过审核，房屋 {house} 状态已更新")
-                
-            except (Building.DoesNotExist, House.DoesNotExist):
-                # 如果找不到对应的House记录，仍然创建绑定关系但不关联house
-                HouseUserBinding.objects.create(
-                    user=application.user,
-                    application=application,
-                    identity=application.identity
-                )
-                logger.warning(f"房屋绑定申请 {application_id} 已通过审核，但找不到对应的House记录：{application.building_name}{application.unit_name}{application.room_number}")
-            
-            return Response({
-                "code": 200,
-                "message": "审核通过"
-            })
-        
-        elif action == 'reject':
-            # 拒绝申请
-            reject_reason = request.data.get('reject_reason')
-            if not reject_reason:
-                return Response({
-                    "code": 400,
-                    "message": "请输入拒绝原因"
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            application.status = 2
-            application.audit_time = timezone.now()
-            # application.auditor = request.user
-            application.reject_reason = reject_reason
-            application.save()
-            
-            logger.info(f"房屋绑定申请 {application_id} 已拒绝，原因：{reject_reason}")
-            
-            return Response({
-                "code": 200,
-                "message": "已拒绝申请"
-            })
+        result = HouseBindingAuditService.audit([{
+            'id': application_id,
+            'action': request.data.get('action'),
+            'remark': request.data.get('remark', ''),
+            'reject_reason': request.data.get('reject_reason'),
+        }], auditor=_request_user(request))[0]
         
         return Response({
-            "code": 400,
-            "message": "无效的操作"
-        }, status=status.HTTP_400_BAD_REQUEST)
+            "code": result['code'],
+            "message": result['message']
+        }, status=result['code'])
+
+
+class HouseBindingAuditBatchView(BindingAuditBatchView):
+    """房屋绑定申请批量审核接口"""
+    audit_service = HouseBindingAuditService
 
 
 class ParkingBindingAuditView(APIView):
@@ -786,88 +842,22 @@ class ParkingBindingAuditView(APIView):
     
     def patch(self, request, application_id):
         """审核车位绑定申请"""
-        try:
-            application = ParkingBindingApplication.objects.get(id=application_id)
-        except ParkingBindingApplication.DoesNotExist:
-            return Response({
-                "code": 404,
-                "message": "申请记录不存在"
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        action = request.data.get('action')
-        
-        if action == 'approve':
-            # 通过申请
-            application.status = 1
-            application.audit_time = timezone.now()
-            # application.auditor = request.user
-            application.audit_remark = request.data.get('remark', '')
-            application.save()
-            
-            # 查找对应的ParkingSpace记录
-            try:
-                from .models import ParkingSpace
-                parking_space = ParkingSpace.objects.get(
-                    area_name=application.parking_area,
-                    space_number=application.parking_no
-                )
-                
-                # 更新车位状态为已占用
-                parking_space.status = 1  # 已占用
-                parking_space.save()
-                
-                # 创建正式绑定关系，关联ParkingSpace记录
-                ParkingUserBinding.objects.create(
-                    user=application.user,
-                    parking_space=parking_space,
-                    application=application,
-                    identity=application.identity
-                )
-                
-                logger.info(f"车位绑定申请 {application_id} 已通过审核，车位 {parking_space} 状态已更新")
-                
-            except ParkingSpace.DoesNotExist:
-                # 如果找不到对应的ParkingSpace记录，仍然创建绑定关系但不关联parking_space
-                ParkingUserBinding.objects.create(
-                    user=application.user,
-                    application=application,
-                    identity=application.identity
-                )
-                logger.warning(f"车位绑定申请 {application_id} 已通过审核，但找不到对应的ParkingSpace记录：{application.parking_area}-{application.parking_no}")
-            
-            logger.info(f"车位绑定申请 {application_id} 已通过审核")
-            
-            return Response({
-                "code": 200,
-                "message": "审核通过"
-            })
-        
-        elif action == 'reject':
-            # 拒绝申请
-            reject_reason = request.data.get('reject_reason')
-            if not reject_reason:
-                return Response({
-                    "code": 400,
-                    "message": "请输入拒绝原因"
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            application.status = 2
-            application.audit_time = timezone.now()
-            # application.auditor = request.user
-            application.reject_reason = reject_reason
-            application.save()
-            
-            logger.info(f"车位绑定申请 {application_id} 已拒绝，原因：{reject_reason}")
-            
-            return Response({
-                "code": 200,
-                "message": "已拒绝申请"
-            })
+        result = ParkingBindingAuditService.audit([{
+            'id': application_id,
+            'action': request.data.get('action'),
+            'remark': request.data.get('remark', ''),
+            'reject_reason': request.data.get('reject_reason'),
+        }], auditor=_request_user(request))[0]
         
         return Response({
-            "code": 400,
-            "message": "无效的操作"
-        }, status=status.HTTP_400_BAD_REQUEST)
+            "code": result['code'],
+            "message": result['message']
+        }, status=result['code'])
+
+
+class ParkingBindingAuditBatchView(BindingAuditBatchView):
+    """车位绑定申请批量审核接口"""
+    audit_service = ParkingBindingAuditService
 
 
 class HouseBindingUnbindView(APIView):
@@ -939,48 +929,16 @@ class HouseListView(APIView):
     permission_classes = []  # 暂时不需要权限认证
 
     def get(self, request):
-        """获取所有房屋列表，包含绑定信息"""
+        """
+        获取房屋列表，包含绑定信息
+
+        支持 building/building_id/unit/status 筛选；带 page 参数时分页，layout=columns 时返回列式结构。
+        """
         try:
-            from .models import House, Building
-            
-            houses = House.objects.select_related('building').all()
-            house_list = []
-            
-            for house in houses:
-                # 获取绑定信息
-                binding = HouseUserBinding.objects.filter(
-                    house=house, 
-                    status=1  # 已绑定状态
-                ).select_related('application', 'user').first()
-                
-                # 构建房屋数据
-                house_data = {
-                    'id': house.id,
-                    'building': house.building.name,
-                    'unit': house.unit,
-                    'room': house.room_number,
-                    'floor': house.floor,
-                    'area': str(house.area),
-                    'status': 'self' if house.status == 1 else ('rent' if house.status == 2 else 'empty'),
-                    'ownerName': None,
-                    'ownerPhone': None,
-                    'bindingId': None
-                }
-                
-                # 如果有绑定关系，添加绑定信息
-                if binding and binding.application:
-                    house_data.update({
-                        'ownerName': binding.application.applicant_name,
-                        'ownerPhone': binding.application.applicant_phone,
-                        'bindingId': binding.id
-                    })
-                
-                house_list.append(house_data)
-            
             return Response({
                 "code": 200,
                 "message": "获取成功",
-                "data": house_list
+                "data": HouseListService.list(request)
             })
             
         except Exception as e:
@@ -996,52 +954,16 @@ class ParkingSpaceListView(APIView):
     permission_classes = []  # 暂时不需要权限认证
 
     def get(self, request):
-        """获取所有车位列表，包含绑定信息"""
+        """
+        获取车位列表，包含绑定信息
+
+        支持 area/type/status 筛选；带 page 参数时分页，layout=columns 时返回列式结构。
+        """
         try:
-            from .models import ParkingSpace
-            
-            parking_spaces = ParkingSpace.objects.all()
-            parking_list = []
-            
-            for space in parking_spaces:
-                # 获取绑定信息
-                binding = ParkingUserBinding.objects.filter(
-                    parking_space=space,
-                    status=1  # 已绑定状态
-                ).select_related('application', 'user').first()
-                
-                # 构建车位数据
-                parking_data = {
-                    'id': space.id,
-                    'area': space.area_name,
-                    'parkingNo': space.space_number,
-                    'type': space.parking_type,
-                    'status': 'active' if space.status == 1 else ('expired' if space.status == 2 else 'empty'),
-                    'carNo': None,
-                    'carBrand': None,
-                    'carColor': None,
-                    'ownerName': None,
-                    'ownerPhone': None,
-                    'bindingId': None
-                }
-                
-                # 如果有绑定关系，添加绑定信息
-                if binding and binding.application:
-                    parking_data.update({
-                        'carNo': binding.application.car_no,
-                        'carBrand': binding.application.car_brand,
-                        'carColor': binding.application.car_color,
-                        'ownerName': binding.application.owner_name,
-                        'ownerPhone': binding.application.owner_phone,
-                        'bindingId': binding.id
-                    })
-                
-                parking_list.append(parking_data)
-            
             return Response({
                 "code": 200,
                 "message": "获取成功", 
-                "data": parking_list
+                "data": ParkingSpaceListService.list(request)
             })
             
         except Exception as e:
@@ -1052,93 +974,6 @@ class ParkingSpaceListView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class DashboardStatsView(APIView):
-    """工作台统计数据接口"""
-    permission_classes = []  # 暂时不需要权限认证
-
-    def get(self, request):
-        """获取工作台统计数据"""
-        try:
-            from .models import House, ParkingSpace, RepairOrder
-            from users.models import User
-            from datetime import date, timedelta
-            from django.utils import timezone
-            from django.db.models import Count
-            
-            # 计算统计数据
-            total_houses = House.objects.count()
-            occupied_houses = HouseUserBinding.objects.filter(status=1).count()
-            total_residents = occupied_houses  # 简化：每个绑定房屋算一户
-            
-            total_parking_spaces = ParkingSpace.objects.count()
-            occupied_parking_spaces = ParkingUserBinding.objects.filter(status=1).count()
-            
-            # 从数据库获取真实的工单数据
-            pending_work_orders = RepairOrder.objects.filter(status='pending').count()
-            
-            today = date.today()
-            today_repairs = RepairOrder.objects.filter(
-                created_at__date=today
-            ).count()
-            
-            fee_collection_rate = round((occupied_houses / total_houses if total_houses > 0 else 0) * 0.85, 3)
-            
-            # 近7天数据（从数据库获取）
-            work_order_trend = []
-            for i in range(6, -1, -1):
-                target_date = today - timedelta(days=i)
-                count = RepairOrder.objects.filter(
-                    created_at__date=target_date
-                ).count()
-                work_order_trend.append({
-                    'date': target_date.strftime('%m-%d'),
-                    'count': count
-                })
-            
-            # 报修类型分布（从数据库获取）
-            repair_type_distribution = []
-            type_choices = dict(RepairOrder.TYPE_CHOICES)
-            for type_value, type_name in type_choices.items():
-                count = RepairOrder.objects.filter(repair_type=type_value).count()
-                if count > 0:
-                    repair_type_distribution.append({
-                        'type': type_name,
-                        'value': count
-                    })
-            
-            # 如果没有数据，返回空列表
-            if not repair_type_distribution:
-                repair_type_distribution = [
-                    {'type': '暂无数据', 'value': 0}
-                ]
-            
-            stats = {
-                'pendingWorkOrders': pending_work_orders,
-                'todayRepairs': today_repairs,
-                'totalResidents': total_residents,
-                'feeCollectionRate': fee_collection_rate,
-                'totalHouses': total_houses,
-                'occupiedHouses': occupied_houses,
-                'totalParkingSpaces': total_parking_spaces,
-                'occupiedParkingSpaces': occupied_parking_spaces,
-                'workOrderTrend': work_order_trend,
-                'repairTypeDistribution': repair_type_distribution
-            }
-            
-            return Response({
-                "code": 200,
-                "message": "获取成功",
-                "data": stats
-            })
-            
-        except Exception as e:
-            logger.error(f"获取统计数据失败: {e}")
-            return Response({
-                "code": 500,
-                "message": f"获取统计数据失败: {str(e)}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
 class EmployeeListView(APIView):
     """员工管理接口"""
     permission_classes = []  # 暂时不需要权限认证
@@ -1241,6 +1076,34 @@ class EmployeeListView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PropertyTreeView(APIView):
+    """房产层级树接口：楼栋/单元/房号、停车区域/车位及可绑定状态，一次返回"""
+    permission_classes = []
+
+    def get(self, request):
+        """获取房产层级树，支持 If-None-Match 条件请求"""
+        try:
+            tree, etag = PropertyTreeService.get_tree()
+
+            if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response({
+                    "code": 200,
+                    "message": "获取成功",
+                    "data": tree
+                })
+            response['ETag'] = etag
+            response['Cache-Control'] = 'no-cache'
+            return response
+        except Exception as e:
+            logger.error(f"获取房产层级树失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"获取房产层级树失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class HouseBuildingOptionsView(APIView):
     """房屋绑定选项数据API - 获取楼栋列表"""
     permission_classes = []
@@ -1248,9 +1111,8 @@ class HouseBuildingOptionsView(APIView):
     def get(self, request):
         """获取所有楼栋列表"""
         try:
-            from .models import Building
-            buildings = Building.objects.all().order_by('id')
-            building_list = [building.name for building in buildings]
+            tree, _ = PropertyTreeService.get_tree()
+            building_list = [building['building'] for building in tree['buildings']]
             
             return Response({
                 "code": 200,
@@ -1279,23 +1141,21 @@ class HouseUnitOptionsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import House, Building
-            building = Building.objects.get(name=building_name)
+            tree, _ = PropertyTreeService.get_tree()
+            building = PropertyTreeService.find_building(tree, building_name)
+            if building is None:
+                return Response({
+                    "code": 404,
+                    "message": "楼栋不存在"
+                }, status=status.HTTP_404_NOT_FOUND)
             
-            # 获取该楼栋下的所有单元（去重）
-            units = House.objects.filter(building=building).values_list('unit', flat=True).distinct().order_by('unit')
-            unit_list = list(units)
+            unit_list = [unit['unit'] for unit in building['units']]
             
             return Response({
                 "code": 200,
                 "message": "获取成功",
                 "data": unit_list
             })
-        except Building.DoesNotExist:
-            return Response({
-                "code": 404,
-                "message": "楼栋不存在"
-            }, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"获取单元列表失败: {e}")
             return Response({
@@ -1320,28 +1180,26 @@ class HouseRoomOptionsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import House, Building
-            building = Building.objects.get(name=building_name)
+            tree, _ = PropertyTreeService.get_tree()
+            building = PropertyTreeService.find_building(tree, building_name)
+            if building is None:
+                return Response({
+                    "code": 404,
+                    "message": "楼栋不存在"
+                }, status=status.HTTP_404_NOT_FOUND)
             
-            # 获取该楼栋该单元下的所有房号（去重，并且只返回未绑定的房号）
-            rooms = House.objects.filter(
-                building=building, 
-                unit=unit_name
-            ).exclude(
-                user_bindings__status=1  # 排除已绑定的房屋
-            ).values_list('room_number', flat=True).order_by('room_number')
-            room_list = list(rooms)
+            # 只返回未绑定的房号
+            room_list = [
+                room['room']
+                for unit in building['units'] if unit['unit'] == unit_name
+                for room in unit['rooms'] if room['available']
+            ]
             
             return Response({
                 "code": 200,
                 "message": "获取成功",
                 "data": room_list
             })
-        except Building.DoesNotExist:
-            return Response({
-                "code": 404,
-                "message": "楼栋不存在"
-            }, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"获取房号列表失败: {e}")
             return Response({
@@ -1357,9 +1215,8 @@ class ParkingAreaOptionsView(APIView):
     def get(self, request):
         """获取所有停车区域列表"""
         try:
-            from .models import ParkingSpace
-            areas = ParkingSpace.objects.values_list('area_name', flat=True).distinct().order_by('area_name')
-            area_list = list(areas)
+            tree, _ = PropertyTreeService.get_tree()
+            area_list = [area['area'] for area in tree['parking_areas']]
             
             return Response({
                 "code": 200,
@@ -1388,15 +1245,14 @@ class ParkingSpaceOptionsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import ParkingSpace
+            tree, _ = PropertyTreeService.get_tree()
             
-            # 获取该区域下的所有车位号（只返回未绑定的车位）
-            spaces = ParkingSpace.objects.filter(
-                area_name=area_name
-            ).exclude(
-                user_bindings__status=1  # 排除已绑定的车位
-            ).values_list('space_number', flat=True).order_by('space_number')
-            space_list = list(spaces)
+            # 只返回未绑定的车位
+            space_list = [
+                space['space']
+                for area in tree['parking_areas'] if area['area'] == area_name
+                for space in area['spaces'] if space['available']
+            ]
             
             return Response({
                 "code": 200,
@@ -1924,17 +1780,8 @@ class RepairOrderView(APIView):
             if user_id:
                 queryset = queryset.filter(reporter_id=user_id)
             
-            # 排序
-            queryset = queryset.order_by('-created_at')
-            
-            # 分页
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            total = queryset.count()
-            orders = queryset[start:end]
+            # 排序和分页（支持 cursor 游标分页）
+            orders, pagination = ListPaginator.paginate(request, queryset, 'created_at', 10)
             
             serializer = RepairOrderListSerializer(orders, many=True)
             
@@ -1943,12 +1790,14 @@ class RepairOrderView(APIView):
                 "message": "获取成功",
                 "data": {
                     "list": serializer.data,
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": (total + page_size - 1) // page_size
+                    **pagination
                 }
             })
+        except InvalidCursor as e:
+            return Response({
+                "code": 400,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"获取报修工单列表失败: {e}")
             return Response({
@@ -2260,83 +2109,26 @@ class RepairOrderOptionsView(APIView):
 
 
 class DashboardStatsView(APIView):
-    """Dashboard统计数据接口"""
+    """工作台统计数据接口"""
     permission_classes = []
 
     def get(self, request):
-        """获取Dashboard统计数据"""
+        """获取工作台统计数据（可选参数 days 指定工单趋势天数，默认7天）"""
         try:
-            from datetime import datetime, timedelta
-            from django.db.models import Count, Q
-            from django.utils import timezone
-            
-            now = timezone.now()
-            today = now.date()
-            
-            # 1. 待处理工单数量
-            pending_work_orders = RepairOrder.objects.filter(status='pending').count()
-            
-            # 2. 今日报修数量
-            today_repairs = RepairOrder.objects.filter(
-                created_at__date=today
-            ).count()
-            
-            # 3. 总住户数量
-            from .models import HouseUserBinding
-            total_residents = HouseUserBinding.objects.filter(status=1).count()
-            
-            # 4. 物业费收缴率 (模拟数据，实际需要根据账单系统计算)
-            fee_collection_rate = 0.856  # 85.6%
-            
-            # 5. 近7天工单趋势
-            work_order_trend = []
-            for i in range(6, -1, -1):  # 从6天前到今天
-                date = today - timedelta(days=i)
-                count = RepairOrder.objects.filter(created_at__date=date).count()
-                work_order_trend.append({
-                    'date': date.strftime('%m-%d'),
-                    'count': count
-                })
-            
-            # 6. 报修类型分布
-            type_distribution = RepairOrder.objects.values('repair_type').annotate(
-                count=Count('id')
-            ).order_by('-count')
-            
-            # 转换为前端需要的格式
-            type_names = {
-                'water': '水电',
-                'electric': '电气', 
-                'door': '门窗',
-                'public': '公区',
-                'other': '其他'
-            }
-            
-            repair_type_distribution = []
-            for item in type_distribution:
-                repair_type_distribution.append({
-                    'type': type_names.get(item['repair_type'], item['repair_type']),
-                    'value': item['count']
-                })
-            
-            # 如果没有数据，提供默认值
-            if not repair_type_distribution:
-                repair_type_distribution = [
-                    {'type': '水电', 'value': 0},
-                    {'type': '电气', 'value': 0}, 
-                    {'type': '门窗', 'value': 0},
-                    {'type': '公区', 'value': 0},
-                    {'type': '其他', 'value': 0}
-                ]
-            
-            stats_data = {
-                'pendingWorkOrders': pending_work_orders,
-                'todayRepairs': today_repairs,
-                'totalResidents': total_residents,
-                'feeCollectionRate': fee_collection_rate,
-                'workOrderTrend': work_order_trend,
-                'repairTypeDistribution': repair_type_distribution
-            }
+            from .dashboard_service import DashboardService
+
+            # 趋势天数：1 ~ DashboardService.MAX_DAYS
+            try:
+                days = int(request.GET.get('days', 7))
+            except ValueError:
+                days = 0
+            if not 1 <= days <= DashboardService.MAX_DAYS:
+                return Response({
+                    "code": 400,
+                    "message": f"统计天数必须为 1-{DashboardService.MAX_DAYS} 的整数"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            stats_data = DashboardService.get_stats(days)
             
             return Response({
                 "code": 200,
@@ -2354,6 +2146,48 @@ class DashboardStatsView(APIView):
 
 # ===== 缴费管理相关视图 =====
 
+def _is_async_request(request, size):
+    """
+    是否以后台任务方式执行
+
+    请求体或查询参数带 async 时按其取值；未指定时账单数达到 BILLING_ASYNC_THRESHOLD 即提交后台任务。
+    """
+    value = request.data.get('async', request.GET.get('async'))
+    if value is None or value == '':
+        return size() >= settings.BILLING_ASYNC_THRESHOLD
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _filter_bills(params):
+    """按账单列表的筛选参数构建查询，列表和导出共用"""
+    fee_type = params.get('fee_type')
+    status_filter = params.get('status')
+    user_id = params.get('user_id')
+    building = params.get('building')
+    is_overdue = params.get('is_overdue')
+
+    queryset = Bill.objects.all()
+
+    if fee_type:
+        queryset = queryset.filter(fee_type=fee_type)
+
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+
+    if building:
+        queryset = queryset.filter(house__building__name=building)
+
+    if is_overdue == 'true':
+        queryset = queryset.filter(status='unpaid', due_date__lt=timezone.now().date())
+
+    return queryset
+
+
 class FeeStandardView(APIView):
     """收费标准管理接口"""
     permission_classes = []
@@ -2411,9 +2245,8 @@ class BillBatchGenerateView(APIView):
         """批量生成账单"""
         try:
             from .serializers import BillCreateSerializer
-            from datetime import date, timedelta
-            from decimal import Decimal
-            
+            from .billing_service import BillGenerationService, BillGenerationError
+
             serializer = BillCreateSerializer(data=request.data)
             if not serializer.is_valid():
                 return Response({
@@ -2438,149 +2271,40 @@ class BillBatchGenerateView(APIView):
                     "message": "收费标准不存在"
                 }, status=status.HTTP_404_NOT_FOUND)
 
-            # 计算计费周期
-            billing_period_start = date(billing_year, billing_month, 1)
-            # 计算月末日期
-            if billing_month == 12:
-                next_month = date(billing_year + 1, 1, 1)
-            else:
-                next_month = date(billing_year, billing_month + 1, 1)
-            billing_period_end = next_month - timedelta(days=1)
-
-            # 设置缴费截止日期（次月15日）
-            if billing_month == 12:
-                due_date = date(billing_year + 1, 1, 15)
-            else:
-                due_date = date(billing_year, billing_month + 1, 15)
-
-            # 查询要生成账单的房屋
-            from .models import Building, House
-            houses_query = House.objects.all()
-            
-            # 如果指定了楼栋，只生成指定楼栋的账单
-            if target_buildings:
-                buildings = Building.objects.filter(name__in=target_buildings)
-                houses_query = houses_query.filter(building__in=buildings)
-            
-            # 只为已绑定业主的房屋生成账单
-            houses = houses_query.filter(
-                user_bindings__status=1,  # 已绑定状态
-                user_bindings__identity=1  # 业主身份
-            ).distinct()
-
-            # 检查是否已经生成过该期间的账单
-            existing_bills = Bill.objects.filter(
-                house__in=houses,
-                fee_type=fee_type,
-                billing_period_start=billing_period_start,
-                billing_period_end=billing_period_end
-            )
-            if existing_bills.exists():
+            # 异步模式：提交后台任务，由 run_billing_jobs 工作进程执行
+            if _is_async_request(request, lambda: BillGenerationService.count_targets(target_buildings)):
+                from .billing_job_service import BillingJobService
+                from .serializers import BillingJobSerializer
+                job, created = BillingJobService.submit_generate(
+                    fee_standard, fee_type, billing_year, billing_month, target_buildings, request.user
+                )
                 return Response({
-                    "code": 400,
-                    "message": f"{billing_year}年{billing_month}月的{fee_standard.get_fee_type_display()}账单已存在"
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # 批量创建账单
-            bills_to_create = []
-            generated_bill_nos = set()  # 用于确保账单号不重复
-            
-            for house in houses:
-                # 获取该房屋的业主
-                binding = house.user_bindings.filter(status=1, identity=1).first()
-                if not binding:
-                    continue
-                
-                user = binding.user
-                
-                # 计算费用
-                if fee_standard.billing_unit == 'per_sqm_month':
-                    quantity = house.area
-                    amount = quantity * fee_standard.unit_price
-                elif fee_standard.billing_unit == 'per_month':
-                    quantity = Decimal('1')
-                    amount = fee_standard.unit_price
-                else:
-                    # 其他计费方式暂时按固定金额处理
-                    quantity = Decimal('1')
-                    amount = fee_standard.unit_price
+                    "code": 202,
+                    "message": "账单生成任务已提交" if created else "账单生成任务已存在",
+                    "data": BillingJobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED)
 
-                # 生成账单号（因为bulk_create不会调用save方法）
-                import datetime
-                import random
-                today = datetime.date.today()
-                date_str = today.strftime('%Y%m%d')
-                
-                # 生成唯一账单号
-                bill_no = None
-                max_attempts = 100  # 防止无限循环
-                attempts = 0
-                
-                while attempts < max_attempts:
-                    random_num = random.randint(10000000, 99999999)
-                    bill_no = f'BILL{date_str}{random_num}'
-                    
-                    # 检查数据库和当前批次中是否重复
-                    if (not Bill.objects.filter(bill_no=bill_no).exists() and 
-                        bill_no not in generated_bill_nos):
-                        generated_bill_nos.add(bill_no)
-                        break
-                    attempts += 1
-                
-                if attempts >= max_attempts:
-                    logger.error(f"生成账单号失败，超过最大尝试次数")
-                    continue
-
-                bill = Bill(
-                    bill_no=bill_no,
-                    title=f"{billing_year}年{billing_month}月{fee_standard.get_fee_type_display()}",
-                    fee_type=fee_type,
-                    house=house,
-                    user=user,
-                    fee_standard=fee_standard,
-                    billing_period_start=billing_period_start,
-                    billing_period_end=billing_period_end,
-                    unit_price=fee_standard.unit_price,
-                    quantity=quantity,
-                    amount=amount,
-                    due_date=due_date,
-                    description=f"房屋地址：{house}，计费面积：{quantity}平米"
+            try:
+                result = BillGenerationService.generate(
+                    fee_standard, fee_type, billing_year, billing_month, target_buildings
                 )
-                bills_to_create.append(bill)
-
-            # 批量创建
-            if bills_to_create:
-                print(f"准备批量创建{len(bills_to_create)}张账单")
-                
-                # 验证所有账单号都不为空且唯一
-                bill_nos = [bill.bill_no for bill in bills_to_create]
-                print(f"生成的账单号样例: {bill_nos[:5]}")
-                
-                if '' in bill_nos or None in bill_nos:
-                    logger.error("发现空账单号，取消批量创建")
-                    return Response({
-                        "code": 500,
-                        "message": "账单号生成失败"
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-                Bill.objects.bulk_create(bills_to_create)
-                logger.info(f"成功生成{len(bills_to_create)}张{fee_standard.get_fee_type_display()}账单")
-                
-                return Response({
-                    "code": 200,
-                    "message": f"成功生成{len(bills_to_create)}张账单",
-                    "data": {
-                        "generated_count": len(bills_to_create),
-                        "fee_type": fee_standard.get_fee_type_display(),
-                        "period": f"{billing_year}年{billing_month}月"
-                    }
-                })
-            else:
+            except BillGenerationError as e:
                 return Response({
                     "code": 400,
-                    "message": "没有符合条件的房屋可以生成账单"
+                    "message": str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
 
+            return Response({
+                "code": 200,
+                "message": f"成功生成{result['generated_count']}张账单",
+                "data": {
+                    "generated_count": result['generated_count'],
+                    "building_counts": result['building_counts'],
+                    "fee_type": fee_standard.get_fee_type_display(),
+                    "period": f"{billing_year}年{billing_month}月"
+                }
+            })
+
         except Exception as e:
             logger.error(f"批量生成账单失败: {e}")
             return Response({
@@ -2596,62 +2320,10 @@ class BillListView(APIView):
     def get(self, request):
         """获取账单列表"""
         try:
-            # 获取筛选参数
-            fee_type = request.GET.get('fee_type')
-            status_filter = request.GET.get('status')
-            user_id = request.GET.get('user_id')
-            building = request.GET.get('building')
-            is_overdue = request.GET.get('is_overdue')
-            
-            # 添加调试日志
-            print(f"=== 账单筛选参数 ===")
-            print(f"fee_type: '{fee_type}'")
-            print(f"status_filter: '{status_filter}'")
-            print(f"user_id: {user_id}")
-            print(f"building: {building}")
-            print(f"is_overdue: {is_overdue}")
-            
-            # 构建查询条件
-            queryset = Bill.objects.select_related('house__building', 'user', 'fee_standard').all()
-            
-            print(f"初始查询数量: {queryset.count()}")
-            
-            # 查看数据库中实际的fee_type值
-            all_fee_types = Bill.objects.values_list('fee_type', flat=True).distinct()
-            print(f"数据库中的所有fee_type值: {list(all_fee_types)}")
-            
-            if fee_type:
-                queryset = queryset.filter(fee_type=fee_type)
-                print(f"fee_type='{fee_type}'筛选后数量: {queryset.count()}")
-            
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-                print(f"status='{status_filter}'筛选后数量: {queryset.count()}")
-                # 调试：查看所有可能的status值
-                all_statuses = Bill.objects.values_list('status', flat=True).distinct()
-                print(f"数据库中的所有status值: {list(all_statuses)}")
-            
-            if user_id:
-                queryset = queryset.filter(user_id=user_id)
-                print(f"user_id筛选后数量: {queryset.count()}")
-            
-            if building:
-                queryset = queryset.filter(house__building__name=building)
-                print(f"building筛选后数量: {queryset.count()}")
-            
-            if is_overdue == 'true':
-                from django.utils import timezone
-                queryset = queryset.filter(status='unpaid', due_date__lt=timezone.now().date())
-                print(f"overdue筛选后数量: {queryset.count()}")
-            
-            # 分页
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 20))
-            start = (page - 1) * page_size
-            end = start + page_size
+            queryset = _filter_bills(request.GET).select_related('house__building', 'user', 'fee_standard')
             
-            total = queryset.count()
-            bills = queryset.order_by('-created_at')[start:end]
+            # 分页（支持 cursor 游标分页）
+            bills, pagination = ListPaginator.paginate(request, queryset, 'created_at', 20)
             
             from .serializers import BillListSerializer
             serializer = BillListSerializer(bills, many=True)
@@ -2661,13 +2333,15 @@ class BillListView(APIView):
                 "message": "获取成功",
                 "data": {
                     "list": serializer.data,
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": (total + page_size - 1) // page_size
+                    **pagination
                 }
             })
             
+        except InvalidCursor as e:
+            return Response({
+                "code": 400,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"获取账单列表失败: {e}")
             return Response({
@@ -2676,6 +2350,22 @@ class BillListView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BillExportView(APIView):
+    """账单导出接口"""
+    permission_classes = []
+
+    def get(self, request):
+        """按账单列表的筛选条件流式导出 CSV/XLSX（file_type=csv|xlsx，默认 csv）"""
+        try:
+            return BillExportService.response(_filter_bills(request.GET), request.GET.get('file_type'))
+        except Exception as e:
+            logger.error(f"导出账单失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"导出账单失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class BillDetailView(APIView):
     """账单详情接口"""
     permission_classes = []
@@ -2782,8 +2472,8 @@ class BillReminderView(APIView):
         """批量发送催缴通知"""
         try:
             from .serializers import ReminderBatchSerializer
-            from users.models import Notification
-            
+            from .billing_service import BillReminderService
+
             serializer = ReminderBatchSerializer(data=request.data)
             if not serializer.is_valid():
                 return Response({
@@ -2794,35 +2484,24 @@ class BillReminderView(APIView):
 
             bill_ids = serializer.validated_data['bill_ids']
             message_template = serializer.validated_data['message_template']
-            
-            # 获取未支付的账单
-            bills = Bill.objects.filter(id__in=bill_ids, status='unpaid').select_related('user', 'house')
-            
-            notifications_to_create = []
-            for bill in bills:
-                # 构建催缴消息内容
-                house_info = f"{bill.house}" if bill.house else "您的房屋"
-                content = f"尊敬的业主，{house_info}的{bill.get_fee_type_display()}（{bill.get_period_display()}）尚未缴费，" \
-                         f"金额￥{bill.amount}，请于{bill.due_date}前完成缴费。{message_template}"
-                
-                notification = Notification(
-                    title="缴费催收通知",
-                    content=content,
-                    notification_type='bill_reminder',
-                    recipient=bill.user,
-                    related_object_type='bill',
-                    related_object_id=bill.id
-                )
-                notifications_to_create.append(notification)
-            
-            # 批量创建通知
-            if notifications_to_create:
-                Notification.objects.bulk_create(notifications_to_create)
-                logger.info(f"成功发送{len(notifications_to_create)}条催缴通知")
-                
+
+            # 异步模式：提交后台任务，由 run_billing_jobs 工作进程执行
+            if _is_async_request(request, lambda: len(bill_ids)):
+                from .billing_job_service import BillingJobService
+                from .serializers import BillingJobSerializer
+                job, created = BillingJobService.submit_reminders(bill_ids, message_template, request.user)
+                return Response({
+                    "code": 202,
+                    "message": "催缴任务已提交" if created else "催缴任务已存在",
+                    "data": BillingJobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED)
+
+            sent_count = BillReminderService.send(bill_ids, message_template)
+
+            if sent_count:
                 return Response({
                     "code": 200,
-                    "message": f"成功发送{len(notifications_to_create)}条催缴通知"
+                    "message": f"成功发送{sent_count}条催缴通知"
                 })
             else:
                 return Response({
@@ -2838,6 +2517,34 @@ class BillReminderView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BillingJobDetailView(APIView):
+    """缴费后台任务进度查询接口"""
+    permission_classes = []
+
+    def get(self, request, job_id):
+        """获取任务进度、计数和错误信息"""
+        try:
+            from .serializers import BillingJobSerializer
+            job = BillingJob.objects.get(id=job_id)
+
+            return Response({
+                "code": 200,
+                "message": "获取成功",
+                "data": BillingJobSerializer(job).data
+            })
+        except BillingJob.DoesNotExist:
+            return Response({
+                "code": 404,
+                "message": "任务不存在"
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.error(f"获取任务进度失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"获取任务进度失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class BillReceiptView(APIView):
     """电子缴费凭证接口"""
     permission_classes = []
@@ -2908,66 +2615,11 @@ class BillStatsView(APIView):
     permission_classes = []
 
     def get(self, request):
-        """获取账单统计数据"""
+        """获取账单统计数据（读取 BillStatsRollup 汇总表）"""
         try:
-            from django.db.models import Sum, Count, Q
-            from django.utils import timezone
-            
-            # 基础统计
-            total_bills = Bill.objects.count()
-            paid_bills = Bill.objects.filter(status='paid').count()
-            unpaid_bills = Bill.objects.filter(status='unpaid').count()
-            overdue_bills = Bill.objects.filter(
-                status='unpaid', 
-                due_date__lt=timezone.now().date()
-            ).count()
-            
-            # 金额统计
-            total_amount = Bill.objects.aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            paid_amount = Bill.objects.filter(status='paid').aggregate(
-                total=Sum('paid_amount')
-            )['total'] or 0
-            
-            unpaid_amount = Bill.objects.filter(status='unpaid').aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            # 按费用类型统计
-            type_stats = Bill.objects.values('fee_type').annotate(
-                total_count=Count('id'),
-                paid_count=Count('id', filter=Q(status='paid')),
-                total_amount=Sum('amount'),
-                paid_amount=Sum('paid_amount', filter=Q(status='paid'))
-            )
-            
-            # 转换为前端需要的格式
-            fee_type_distribution = []
-            for stat in type_stats:
-                fee_type_display = dict(Bill.FEE_TYPE_CHOICES).get(stat['fee_type'], stat['fee_type'])
-                fee_type_distribution.append({
-                    'type': fee_type_display,
-                    'total_count': stat['total_count'],
-                    'paid_count': stat['paid_count'] or 0,
-                    'unpaid_count': stat['total_count'] - (stat['paid_count'] or 0),
-                    'total_amount': float(stat['total_amount'] or 0),
-                    'paid_amount': float(stat['paid_amount'] or 0),
-                    'collection_rate': round((stat['paid_count'] or 0) / stat['total_count'] * 100, 2) if stat['total_count'] > 0 else 0
-                })
-            
-            stats_data = {
-                'total_bills': total_bills,
-                'paid_bills': paid_bills,
-                'unpaid_bills': unpaid_bills,
-                'overdue_bills': overdue_bills,
-                'total_amount': float(total_amount),
-                'paid_amount': float(paid_amount),
-                'unpaid_amount': float(unpaid_amount),
-                'collection_rate': round(paid_bills / total_bills * 100, 2) if total_bills > 0 else 0,
-                'fee_type_distribution': fee_type_distribution
-            }
+            from .billing_service import BillStatsService
+
+            stats_data = BillStatsService.get_summary(timezone.now().date())
             
             return Response({
                 "code": 200,
@@ -2985,61 +2637,51 @@ class BillStatsView(APIView):
 
 # ===== 门禁日志相关视图 =====
 
-class AccessLogView(APIView):
-    """门禁日志接口"""
-    permission_classes = []  # 暂时不需要权限认证
-
-    def get(self, request):
-        """获取门禁日志列表"""
-        try:
-            # 获取筛选参数
-            method_filter = request.GET.get('method')  # 开门方式筛选
-            location_filter = request.GET.get('location')  # 位置筛选
-            keyword = request.GET.get('keyword', '').strip()  # 人员姓名搜索
-            start_date = request.GET.get('start_date')  # 开始日期
-            end_date = request.GET.get('end_date')  # 结束日期
-            person_type = request.GET.get('person_type')  # 人员类型
+def _filter_access_logs(params):
+    """按门禁日志列表的筛选参数构建查询，列表和导出共用"""
+    method_filter = params.get('method')  # 开门方式筛选
+    location_filter = params.get('location')  # 位置筛选
+    keyword = params.get('keyword', '').strip()  # 人员姓名搜索
+    start_date = params.get('start_date')  # 开始日期
+    end_date = params.get('end_date')  # 结束日期
+    person_type = params.get('person_type')  # 人员类型
 
-            # 构建查询条件
-            queryset = AccessLog.objects.all()
+    # 只显示成功的记录
+    queryset = AccessLog.objects.filter(success=True)
 
-            # 开门方式筛选
-            if method_filter:
-                queryset = queryset.filter(method=method_filter)
+    # 开门方式筛选
+    if method_filter:
+        queryset = queryset.filter(method=method_filter)
 
-            # 位置筛选
-            if location_filter:
-                queryset = queryset.filter(location=location_filter)
+    # 位置筛选
+    if location_filter:
+        queryset = queryset.filter(location=location_filter)
 
-            # 人员姓名搜索
-            if keyword:
-                queryset = queryset.filter(person_name__icontains=keyword)
+    # 人员姓名搜索
+    if keyword:
+        queryset = queryset.filter(person_name__icontains=keyword)
 
-            # 日期范围筛选
-            if start_date:
-                queryset = queryset.filter(timestamp__date__gte=start_date)
+    # 日期范围筛选（半开区间，可走 timestamp 索引和分区裁剪）
+    queryset = AccessLogService.filter_by_date(queryset, start_date, end_date)
 
-            if end_date:
-                queryset = queryset.filter(timestamp__date__lte=end_date)
+    # 人员类型筛选
+    if person_type:
+        queryset = queryset.filter(person_type=person_type)
 
-            # 人员类型筛选
-            if person_type:
-                queryset = queryset.filter(person_type=person_type)
+    return queryset
 
-            # 只显示成功的记录
-            queryset = queryset.filter(success=True)
 
-            # 排序（最新的在前）
-            queryset = queryset.order_by('-timestamp')
+class AccessLogView(APIView):
+    """门禁日志接口"""
+    permission_classes = []  # 暂时不需要权限认证
 
-            # 分页
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 50))
-            start = (page - 1) * page_size
-            end = start + page_size
+    def get(self, request):
+        """获取门禁日志列表"""
+        try:
+            queryset = _filter_access_logs(request.GET)
 
-            total = queryset.count()
-            logs = queryset[start:end]
+            # 按时间倒序分页（最新的在前，支持 cursor 游标分页）
+            logs, pagination = ListPaginator.paginate(request, queryset, 'timestamp', 50)
 
             # 使用前端期望的序列化器
             from .serializers import AccessLogListSerializer
@@ -3050,13 +2692,15 @@ class AccessLogView(APIView):
                 "message": "获取成功",
                 "data": {
                     "list": serializer.data,
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": (total + page_size - 1) // page_size
+                    **pagination
                 }
             })
 
+        except InvalidCursor as e:
+            return Response({
+                "code": 400,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"获取门禁日志列表失败: {e}")
             return Response({
@@ -3071,7 +2715,9 @@ class AccessLogView(APIView):
             serializer = AccessLogCreateSerializer(data=request.data)
 
             if serializer.is_valid():
-                access_log = serializer.save()
+                with transaction.atomic():
+                    access_log = serializer.save()
+                    AccessLogCounterService.record([access_log])
 
                 # 返回创建成功的日志信息
                 from .serializers import AccessLogListSerializer
@@ -3099,6 +2745,107 @@ class AccessLogView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AccessLogExportView(APIView):
+    """门禁日志导出接口"""
+    permission_classes = []
+
+    def get(self, request):
+        """按门禁日志列表的筛选条件流式导出 CSV/XLSX（file_type=csv|xlsx，默认 csv）"""
+        try:
+            return AccessLogExportService.response(_filter_access_logs(request.GET), request.GET.get('file_type'))
+        except Exception as e:
+            logger.error(f"导出门禁日志失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"导出门禁日志失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AccessLogBatchIngestView(APIView):
+    """门禁设备批量上报接口"""
+    permission_classes = []  # 设备端上报，暂时不需要权限认证
+
+    def post(self, request):
+        """
+        批量上报门禁事件
+
+        请求体为事件数组、{"events": [...]} 或 NDJSON（Content-Type: application/x-ndjson），
+        每个事件需包含 device_id、timestamp，可选 sequence。返回与请求顺序一致的逐条状态码：
+        201 新写入、200 重复上报已忽略、400 校验失败；开启写后缓冲时校验通过的事件返回 202。
+        """
+        try:
+            if request.content_type.startswith('application/x-ndjson'):
+                events = AccessLogIngestService.parse_ndjson(request.body)
+            else:
+                events = request.data
+                if isinstance(events, dict):
+                    events = events.get('events')
+
+            if not isinstance(events, list) or not events:
+                return Response({
+                    "code": 400,
+                    "message": "请提交门禁事件列表"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            if len(events) > AccessLogIngestService.MAX_EVENTS:
+                return Response({
+                    "code": 413,
+                    "message": f"单次最多上报 {AccessLogIngestService.MAX_EVENTS} 条事件"
+                }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+            if AccessLogBufferService.is_enabled():
+                # 写后缓冲模式：只写入缓冲队列，不等待数据库提交
+                if AccessLogBufferService.is_overloaded():
+                    response = Response({
+                        "code": 503,
+                        "message": "上报积压过多，请稍后重试"
+                    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                    response['Retry-After'] = '5'
+                    return response
+
+                result = AccessLogBufferService.ingest(events)
+                return Response({
+                    "code": 202,
+                    "message": f"已接收 {result['queued']} 条，失败 {result['rejected']} 条",
+                    "data": result
+                }, status=status.HTTP_202_ACCEPTED)
+
+            result = AccessLogIngestService.ingest(events)
+
+            return Response({
+                "code": 200,
+                "message": f"写入 {result['created']} 条，重复 {result['duplicates']} 条，失败 {result['rejected']} 条",
+                "data": result
+            })
+
+        except Exception as e:
+            logger.error(f"批量上报门禁日志失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"批量上报门禁日志失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AccessLogIngestMetricsView(APIView):
+    """门禁上报缓冲积压指标接口"""
+    permission_classes = []
+
+    def get(self, request):
+        """获取写后缓冲的积压情况"""
+        try:
+            return Response({
+                "code": 200,
+                "message": "获取成功",
+                "data": AccessLogBufferService.get_metrics()
+            })
+        except Exception as e:
+            logger.error(f"获取门禁上报缓冲指标失败: {e}")
+            return Response({
+                "code": 500,
+                "message": f"获取门禁上报缓冲指标失败: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class AccessLogStatisticsView(APIView):
     """门禁日志统计接口"""
     permission_classes = []
@@ -3107,8 +2854,6 @@ class AccessLogStatisticsView(APIView):
         """获取门禁日志统计数据"""
         try:
             from datetime import datetime, timedelta
-            from django.db.models import Count
-            from django.utils import timezone
 
             # 获取统计参数
             days = int(request.GET.get('days', 7))  # 默认统计最近7天
@@ -3122,130 +2867,11 @@ class AccessLogStatisticsView(APIView):
                 end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
             else:
                 # 使用最近N天
-                end_date = timezone.now().date()
+                end_date = timezone.localdate()
                 start_date = end_date - timedelta(days=days-1)
 
-            # 1. 今日记录数
-            today = timezone.now().date()
-            today_count = AccessLog.objects.filter(
-                timestamp__date=today,
-                success=True
-            ).count()
-
-            # 2. 总记录数（在统计范围内）
-            total_count = AccessLog.objects.filter(
-                timestamp__date__gte=start_date,
-                timestamp__date__lte=end_date,
-                success=True
-            ).count()
-
-            # 3. 按开门方式统计
-            method_stats = AccessLog.objects.filter(
-                timestamp__date__gte=start_date,
-                timestamp__date__lte=end_date,
-                success=True
-            ).values('method').annotate(count=Count('id')).order_by('-count')
-
-            method_distribution = []
-            method_names = {
-                'face': '人脸识别',
-                'qrcode': '二维码',
-                'card': '刷卡',
-                'password': '密码'
-            }
-
-            for stat in method_stats:
-                method_distribution.append({
-                    'method': method_names.get(stat['method'], stat['method']),
-                    'count': stat['count'],
-                    'percentage': round(stat['count'] / total_count * 100, 2) if total_count > 0 else 0
-                })
-
-            # 4. 按位置统计
-            location_stats = AccessLog.objects.filter(
-                timestamp__date__gte=start_date,
-                timestamp__date__lte=end_date,
-                success=True
-            ).values('location').annotate(count=Count('id')).order_by('-count')[:10]  # 只取前10个位置
-
-            location_distribution = []
-            for stat in location_stats:
-                location_distribution.append({
-                    'location': stat['location'],
-                    'count': stat['count'],
-                    'percentage': round(stat['count'] / total_count * 100, 2) if total_count > 0 else 0
-                })
-
-            # 5. 按人员类型统计
-            person_type_stats = AccessLog.objects.filter(
-                timestamp__date__gte=start_date,
-                timestamp__date__lte=end_date,
-                success=True
-            ).values('person_type').annotate(count=Count('id')).order_by('-count')
-
-            person_type_distribution = []
-            person_type_names = {
-                'resident': '业主',
-                'visitor': '访客',
-                'delivery': '配送员',
-                'staff': '工作人员',
-                'other': '其他'
-            }
-
-            for stat in person_type_stats:
-                person_type_distribution.append({
-                    'type': person_type_names.get(stat['person_type'], stat['person_type']),
-                    'count': stat['count'],
-                    'percentage': round(stat['count'] / total_count * 100, 2) if total_count > 0 else 0
-                })
-
-            # 6. 每日统计趋势
-            daily_trend = []
-            current_date = start_date
-            while current_date <= end_date:
-                count = AccessLog.objects.filter(
-                    timestamp__date=current_date,
-                    success=True
-                ).count()
-
-                daily_trend.append({
-                    'date': current_date.strftime('%m-%d'),
-                    'count': count
-                })
-                current_date += timedelta(days=1)
-
-            # 7. 高峰时段统计（小时）
-            hourly_stats = AccessLog.objects.filter(
-                timestamp__date__gte=start_date,
-                timestamp__date__lte=end_date,
-                success=True
-            ).extra(
-                select={'hour': 'timestamp_hour'}
-            ).values('hour').annotate(count=Count('id')).order_by('hour')
-
-            hourly_distribution = []
-            for hour in range(24):
-                count = 0
-                for stat in hourly_stats:
-                    if stat['hour'] == hour:
-                        count = stat['count']
-                        break
-
-                hourly_distribution.append({
-                    'hour': f"{hour:02d}:00",
-                    'count': count
-                })
-
-            stats_data = {
-                'today_count': today_count,
-                'total_count': total_count,
-                'date_range': f"{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}",
-                'method_distribution': method_distribution,
-                'location_distribution': location_distribution,
-                'person_type_distribution': person_type_distribution,
-                'daily_trend': daily_trend,
-                'hourly_distribution': hourly_distribution
-            }
+            # 从小时汇总表一次分组查询得到全部统计
+            stats_data = AccessLogCounterService.get_statistics(start_date, end_date)
 
             return Response({
                 "code": 200,
@@ -3,6 +3,8 @@ ASGI config for smart_community project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+HTTP 请求交给 Django 处理，WebSocket 连接（私聊消息推送）交给 Channels 路由。
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +15,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "smart_community.settings")
 
-application = get_asgi_application()
+# 必须先初始化 Django，再导入依赖模型的路由和中间件
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from community.routing import websocket_urlpatterns  # noqa: E402
+from users.middleware import TokenAuthMiddleware  # noqa: E402
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    # 使用 token 认证而非 cookie，不需要校验 Origin（小程序连接不带 Origin 头）
+    "websocket": TokenAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
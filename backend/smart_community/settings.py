@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 
     'corsheaders',  # 添加CORS支持
+    'channels',  # WebSocket 消息推送
     'rest_framework',
     'drf_spectacular',
     'users',
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
     'merchant',
 ]
 
+# 中间件需支持异步（ASGI 下同步中间件会让长轮询等待期间占用线程）
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS中间件，必须放在最前面
     "django.middleware.security.SecurityMiddleware",
@@ -66,6 +68,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "users.middleware.AuthQueryMetricsMiddleware",
 ]
 
 ROOT_URLCONF = "smart_community.urls"
@@ -104,6 +107,18 @@ DATABASES = {
 }
 
 # Redis
+# ASGI / Channels：私聊消息通过 Redis channel layer 在进程间广播
+ASGI_APPLICATION = "smart_community.asgi.application"
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": [f"redis://{os.getenv('REDIS_HOST', '127.0.0.1')}:{os.getenv('REDIS_PORT', '16379')}/2"],
+        },
+    }
+}
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -286,3 +301,24 @@ LOGGING = {
         },
     },
 }
+
+# 批量出账、催缴的账单数达到该值时默认提交后台任务（由 run_billing_jobs 执行），请求可用 async 参数显式指定
+BILLING_ASYNC_THRESHOLD = int(os.getenv('BILLING_ASYNC_THRESHOLD', '2000'))
+
+# 门禁日志写后缓冲：开启后设备批量上报先写入 Redis Stream（Redis 不可用时写本地暂存文件），
+# 由 flush_access_logs 进程批量入库
+ACCESS_LOG_WRITE_BEHIND = os.getenv('ACCESS_LOG_WRITE_BEHIND', 'False').lower() == 'true'
+ACCESS_LOG_SPOOL_DIR = os.getenv('ACCESS_LOG_SPOOL_DIR', os.path.join(BASE_DIR, 'spool', 'access_logs'))
+ACCESS_LOG_MAX_BACKLOG = int(os.getenv('ACCESS_LOG_MAX_BACKLOG', '500000'))
+
+# 登录 token：签名 JWT，认证时用户对象从进程内 LRU + Redis 两级缓存读取
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', str(7 * 24 * 60 * 60)))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '600'))
+AUTH_USER_CACHE_LOCAL_TTL = int(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', '30'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '4096'))
+# 过渡期接受旧版固定格式 token（可被猜测，默认关闭）
+AUTH_ALLOW_LEGACY_TOKENS = os.getenv('AUTH_ALLOW_LEGACY_TOKENS', 'False').lower() == 'true'
+# 在响应头 X-Auth-Queries 中返回认证阶段的 SQL 条数（排查认证缓存是否生效）
+AUTH_QUERY_METRICS = os.getenv('AUTH_QUERY_METRICS', str(DEBUG)).lower() == 'true'
+# 聊天长轮询单次最长等待秒数（WebSocket 不可用时的降级方案）
+CHAT_LONG_POLL_MAX_WAIT = int(os.getenv('CHAT_LONG_POLL_MAX_WAIT', '25'))
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from django.db import connection
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AuthQueryMetrics:
+    """
+    认证查询计数
+
+    统计每个请求在认证阶段执行的 SQL 条数，记录在 request.auth_query_count 上，
+    并累计到进程级汇总中；缓存命中时应为 0。
+    AUTH_QUERY_METRICS 开启时由 AuthQueryMetricsMiddleware 写入 X-Auth-Queries 响应头。
+    """
+
+    _lock = threading.Lock()
+    _totals = {'requests': 0, 'queries': 0, 'max_queries': 0}
+
+    @classmethod
+    @contextmanager
+    def track(cls, request):
+        """统计代码块内执行的 SQL 条数，累加到 request.auth_query_count"""
+        executed = []
+
+        def counter(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            yield
+
+        count = len(executed)
+        request.auth_query_count = getattr(request, 'auth_query_count', 0) + count
+        with cls._lock:
+            cls._totals['requests'] += 1
+            cls._totals['queries'] += count
+            cls._totals['max_queries'] = max(cls._totals['max_queries'], count)
+        if count:
+            logger.debug(f"认证执行了 {count} 条 SQL: {request.path}")
+
+    @classmethod
+    def snapshot(cls):
+        """进程启动以来的认证次数、认证 SQL 总数和单次最大 SQL 数"""
+        with cls._lock:
+            return dict(cls._totals)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._totals.update(requests=0, queries=0, max_queries=0)
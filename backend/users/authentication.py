@@ -1,14 +1,26 @@
 from rest_framework import authentication
 from rest_framework import exceptions
+from django.conf import settings
 from django.contrib.auth import get_user_model
 import re
 
+from .token_service import TokenService, AuthUserCache, InvalidToken
+from .auth_metrics import AuthQueryMetrics
+
 User = get_user_model()
 
+# 旧版 token 格式：wechat_token_{user_id}_xyz789 / sms_token_{user_id}_abc123 / merchant_token_{user_id}_verified
+LEGACY_TOKEN_PATTERN = re.compile(r'^(?:wechat_token|sms_token|merchant_token)_(\d+)_(?:xyz789|abc123|verified)$')
+# Mock token格式（开发环境）: mock-token-{timestamp}
+MOCK_TOKEN_PATTERN = re.compile(r'^mock-token-\d+$')
+
 
 class CustomTokenAuthentication(authentication.BaseAuthentication):
     """
-    自定义Token认证类，支持微信和短信登录产生的token
+    自定义Token认证类，支持微信、短信和商户登录签发的token
+
+    token 为签名 JWT，校验不查库；用户对象从 AuthUserCache 两级缓存读取，
+    缓存命中时整个认证过程没有数据库查询。
     """
     
     def authenticate(self, request):
@@ -22,55 +34,50 @@ class CustomTokenAuthentication(authentication.BaseAuthentication):
             
         token = auth_header.split(' ')[1]
         
-        return self.authenticate_token(token)
+        # 统计认证阶段的 SQL 条数，记录在底层 HttpRequest 上供中间件读取
+        with AuthQueryMetrics.track(getattr(request, '_request', request)):
+            return self.authenticate_token(token)
     
     def authenticate_token(self, token):
         """
-        根据token格式验证并返回用户
+        校验token并返回 (用户, token)
         """
-        # 微信token格式: wechat_token_{user_id}_xyz789
-        wechat_pattern = r'^wechat_token_(\d+)_xyz789$'
-        # 短信token格式: sms_token_{user_id}_abc123  
-        sms_pattern = r'^sms_token_(\d+)_abc123$'
-        # 商户token格式: merchant_token_{user_id}_verified
-        merchant_pattern = r'^merchant_token_(\d+)_verified$'
-        # Mock token格式（开发环境）: mock-token-{timestamp}
-        mock_pattern = r'^mock-token-\d+$'
-        
-        user_id = None
-        
-        # 匹配微信token
-        wechat_match = re.match(wechat_pattern, token)
-        if wechat_match:
-            user_id = wechat_match.group(1)
+        role = None
+        if token.count('.') == 2:
+            try:
+                claims = TokenService.decode(token)
+            except InvalidToken as e:
+                raise exceptions.AuthenticationFailed(str(e))
+            user_id = claims['sub']
+            role = claims.get('role')
         else:
-            # 匹配短信token
-            sms_match = re.match(sms_pattern, token)
-            if sms_match:
-                user_id = sms_match.group(1)
-            else:
-                # 匹配商户token
-                merchant_match = re.match(merchant_pattern, token)
-                if merchant_match:
-                    user_id = merchant_match.group(1)
-                else:
-                    # 匹配Mock token（开发环境）
-                    mock_match = re.match(mock_pattern, token)
-                    if mock_match:
-                        # Mock token场景：根据用户角色返回对应的测试用户
-                        # 这里可以根据需要创建或获取测试用户
-                        return self.get_mock_user(token)
-        
-        if not user_id:
-            raise exceptions.AuthenticationFailed('无效的token格式')
+            user_id = self.parse_legacy_token(token)
+            if user_id is None:
+                if MOCK_TOKEN_PATTERN.match(token):
+                    # Mock token场景：根据用户角色返回对应的测试用户
+                    return self.get_mock_user(token)
+                raise exceptions.AuthenticationFailed('无效的token格式')
         
-        try:
-            user = User.objects.get(id=user_id, is_active=True)
-        except User.DoesNotExist:
+        user = AuthUserCache.get(user_id)
+        if user is None or user.is_banned:
             raise exceptions.AuthenticationFailed('用户不存在或已被禁用')
+        if role is not None and role != user.role:
+            # 角色变更后旧 token 失效，需要重新登录
+            raise exceptions.AuthenticationFailed('账号权限已变更，请重新登录')
         
         return (user, token)
     
+    def parse_legacy_token(self, token):
+        """
+        解析旧版固定格式 token，返回用户ID
+
+        旧版 token 可被猜测，仅在 AUTH_ALLOW_LEGACY_TOKENS 开启时（过渡期）接受。
+        """
+        if not getattr(settings, 'AUTH_ALLOW_LEGACY_TOKENS', False):
+            return None
+        match = LEGACY_TOKEN_PATTERN.match(token)
+        return match.group(1) if match else None
+    
     def get_mock_user(self, token):
         """
         获取或创建Mock测试用户（仅开发环境）
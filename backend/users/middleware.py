@@ -0,0 +1,39 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import AuthenticationFailed
+from urllib.parse import parse_qs
+
+
+class AuthQueryMetricsMiddleware(MiddlewareMixin):
+    """AUTH_QUERY_METRICS 开启时，在响应头 X-Auth-Queries 中返回本次请求认证阶段的 SQL 条数"""
+
+    def process_response(self, request, response):
+        if getattr(settings, 'AUTH_QUERY_METRICS', False) and hasattr(request, 'auth_query_count'):
+            response['X-Auth-Queries'] = str(request.auth_query_count)
+        return response
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    WebSocket 认证中间件
+
+    浏览器和小程序建立 WebSocket 时无法设置 Authorization 头，token 通过查询参数 token 传入，
+    校验逻辑与 HTTP 接口的 CustomTokenAuthentication 相同；认证失败时 scope['user'] 为匿名用户。
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+        scope['user'] = await self.authenticate(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+    @database_sync_to_async
+    def authenticate(self, token):
+        from .authentication import CustomTokenAuthentication
+        try:
+            user, _ = CustomTokenAuthentication().authenticate_token(token)
+        except AuthenticationFailed:
+            return AnonymousUser()
+        return user
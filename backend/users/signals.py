@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .token_service import AuthUserCache
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    """用户信息变更（封禁、改角色、停用等）后，在事务提交时使认证缓存失效"""
+    transaction.on_commit(lambda: AuthUserCache.invalidate(instance.pk))
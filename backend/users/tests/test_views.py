@@ -6,7 +6,10 @@ import pytest
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import CustomTokenAuthentication
 from users.models import Notification
+from users.token_service import TokenService, AuthUserCache
 from users.tests.fixtures import UserFactory, NotificationFactory
 
 User = get_user_model()
@@ -156,3 +159,71 @@ class TestIdentityCodeView:
         response = api_client.get(f'/api/user/identity-code?user_id={user.id}')
 
         assert response.status_code == status.HTTP_200_OK
+
+
+class TestTokenAuthentication:
+    """签名 token 认证测试"""
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_cache(self):
+        cache.clear()
+        AuthUserCache.clear_local()
+
+    @pytest.mark.django_db
+    def test_signed_token_authenticates_without_queries(self, api_client, django_assert_num_queries):
+        """测试签名 token 认证，缓存命中后认证不查库"""
+        user = UserFactory()
+        token = TokenService.issue(user, 'sms')
+
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = api_client.get('/api/profile', {'user_id': user.id})
+        assert response.status_code == status.HTTP_200_OK
+
+        with django_assert_num_queries(0):
+            authenticated, _ = CustomTokenAuthentication().authenticate_token(token)
+        assert authenticated.id == user.id
+
+        AuthUserCache.clear_local()
+        with django_assert_num_queries(0):
+            CustomTokenAuthentication().authenticate_token(token)
+
+    @pytest.mark.django_db
+    def test_ban_and_role_change_invalidate_cache(self, django_capture_on_commit_callbacks):
+        """测试封禁和角色变更后缓存失效，旧 token 不再可用"""
+        user = UserFactory(role=0)
+        token = TokenService.issue(user, 'wechat')
+        CustomTokenAuthentication().authenticate_token(token)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.role = 1
+            user.save()
+        with pytest.raises(AuthenticationFailed, match='权限已变更'):
+            CustomTokenAuthentication().authenticate_token(token)
+
+        token = TokenService.issue(user, 'wechat')
+        CustomTokenAuthentication().authenticate_token(token)
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_banned = True
+            user.save()
+        with pytest.raises(AuthenticationFailed, match='已被禁用'):
+            CustomTokenAuthentication().authenticate_token(token)
+
+    @pytest.mark.django_db
+    def test_rejects_expired_forged_and_legacy_tokens(self, settings):
+        """测试过期、伪造和旧版 token"""
+        user = UserFactory()
+
+        settings.AUTH_TOKEN_TTL = -1
+        with pytest.raises(AuthenticationFailed, match='过期'):
+            CustomTokenAuthentication().authenticate_token(TokenService.issue(user, 'sms'))
+
+        settings.AUTH_TOKEN_TTL = 3600
+        header, payload, _ = TokenService.issue(user, 'sms').split('.')
+        with pytest.raises(AuthenticationFailed, match='无效'):
+            CustomTokenAuthentication().authenticate_token(f'{header}.{payload}.forged')
+
+        legacy = f'sms_token_{user.id}_abc123'
+        with pytest.raises(AuthenticationFailed):
+            CustomTokenAuthentication().authenticate_token(legacy)
+        settings.AUTH_ALLOW_LEGACY_TOKENS = True
+        assert CustomTokenAuthentication().authenticate_token(legacy)[0].id == user.id
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+import copy
+import jwt
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidToken(Exception):
+    """token 无效或已过期"""
+    pass
+
+
+class TokenService:
+    """
+    登录 token 签发与校验
+
+    token 为 HS256 签名的 JWT，携带用户ID、角色、登录渠道和过期时间，
+    校验只做签名和有效期检查，不需要查询数据库。
+    """
+
+    ALGORITHM = 'HS256'
+    CHANNELS = ('sms', 'wechat', 'merchant')
+
+    @classmethod
+    def get_secret(cls):
+        return getattr(settings, 'AUTH_TOKEN_SECRET', None) or settings.SECRET_KEY
+
+    @classmethod
+    def issue(cls, user, channel):
+        """为用户签发 token，channel 为登录渠道（sms/wechat/merchant）"""
+        now = timezone.now()
+        payload = {
+            'sub': str(user.id),
+            'role': user.role,
+            'chn': channel,
+            'iat': now,
+            'exp': now + timedelta(seconds=settings.AUTH_TOKEN_TTL),
+        }
+        return jwt.encode(payload, cls.get_secret(), algorithm=cls.ALGORITHM)
+
+    @classmethod
+    def decode(cls, token):
+        """校验签名和有效期，返回 token 中的声明"""
+        try:
+            claims = jwt.decode(
+                token, cls.get_secret(), algorithms=[cls.ALGORITHM],
+                options={'require': ['sub', 'exp']},
+            )
+        except jwt.ExpiredSignatureError:
+            raise InvalidToken('登录已过期，请重新登录')
+        except jwt.InvalidTokenError:
+            raise InvalidToken('无效的token')
+
+        if not claims['sub'].isdigit():
+            raise InvalidToken('无效的token')
+        return claims
+
+
+class AuthUserCache:
+    """
+    认证用户缓存：进程内 LRU + Redis 两级
+
+    进程内缓存命中时不访问 Redis 和数据库，条目在 AUTH_USER_CACHE_LOCAL_TTL 秒后过期；
+    Redis 缓存由所有进程共享。用户信息保存时（封禁、改角色等）两级缓存都会失效，
+    其他进程的进程内缓存最多在本地有效期内继续使用旧数据。
+    """
+
+    CACHE_KEY = 'auth:user:{user_id}'
+
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_cache_key(cls, user_id):
+        return cls.CACHE_KEY.format(user_id=user_id)
+
+    @classmethod
+    def get(cls, user_id):
+        """
+        返回有效用户，用户不存在或已停用时返回 None
+
+        每次返回缓存对象的副本，请求中修改 request.user 不会影响其他请求。
+        """
+        user_id = int(user_id)
+        user = cls._get_local(user_id)
+        if user is not None:
+            return copy.copy(user)
+
+        user = cache.get(cls.get_cache_key(user_id))
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User.objects.get(id=user_id, is_active=True)
+            except User.DoesNotExist:
+                return None
+            cache.set(cls.get_cache_key(user_id), user, settings.AUTH_USER_CACHE_TTL)
+
+        cls._set_local(user_id, user)
+        return copy.copy(user)
+
+    @classmethod
+    def invalidate(cls, user_id):
+        with cls._lock:
+            cls._local.pop(user_id, None)
+        cache.delete(cls.get_cache_key(user_id))
+
+    @classmethod
+    def clear_local(cls):
+        with cls._lock:
+            cls._local.clear()
+
+    @classmethod
+    def _get_local(cls, user_id):
+        with cls._lock:
+            entry = cls._local.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del cls._local[user_id]
+                return None
+            cls._local.move_to_end(user_id)
+            return user
+
+    @classmethod
+    def _set_local(cls, user_id, user):
+        with cls._lock:
+            cls._local[user_id] = (user, time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_TTL)
+            cls._local.move_to_end(user_id)
+            while len(cls._local) > settings.AUTH_USER_CACHE_SIZE:
+                cls._local.popitem(last=False)
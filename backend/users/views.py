@@ -9,6 +9,7 @@ from .serializers import (
     UserInfoSerializer, AvatarUploadSerializer, WeChatLoginSerializer, WeChatRegisterSerializer
 )
 from .sms_service import SMSService
+from .token_service import TokenService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -145,7 +146,7 @@ class SMSLoginView(APIView):
                 "code": 200,
                 "message": "登录成功",
                 "data": {
-                    "token": f"sms_token_{user.id}_abc123",
+                    "token": TokenService.issue(user, 'sms'),
                     "user_id": user.id,
                     "phone": user.phone,
                     "role": user.role
@@ -216,7 +217,7 @@ class SMSRegisterView(APIView):
                 "code": 200,
                 "message": "注册成功",
                 "data": {
-                    "token": f"sms_token_{user.id}_abc123",  # 模拟token
+                    "token": TokenService.issue(user, 'sms'),
                     "user_id": user.id,
                     "phone": user.phone,
                     "nickname": user.nickname,
@@ -265,7 +266,7 @@ class WeChatLoginView(APIView):
                     "code": 200,
                     "message": "登录成功",
                     "data": {
-                        "token": f"wechat_token_{user.id}_xyz789",
+                        "token": TokenService.issue(user, 'wechat'),
                         "user_id": user.id,
                         "role": user.role,
                         "avatar": avatar_url,
@@ -339,7 +340,7 @@ class WeChatRegisterView(APIView):
                 "code": 200,
                 "message": "注册成功",
                 "data": {
-                    "token": f"wechat_token_{user.id}_xyz789",
+                    "token": TokenService.issue(user, 'wechat'),
                     "user_id": user.id,
                     "role": user.role,
                     "avatar": avatar_url,